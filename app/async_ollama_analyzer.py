@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Moduł z asynchronicznym klientem Ollama
+=======================================
+
+Zawiera:
+- Wariant OllamaAnalyzer oparty na asyncio (własna pętla w wątku tła)
+- Limit równoczesnych zapytań w locie (OLLAMA_MAX_IN_FLIGHT)
+- Odbiór odpowiedzi strumieniowo i limit czasu na każde zapytanie
+- Synchroniczne analyze_content jako cienką nakładkę dla pipeline
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import OLLAMA_MAX_IN_FLIGHT, OLLAMA_REQUEST_DEADLINE
+from .ollama_analyzer import OllamaAnalyzer, _AnalysisRequest
+from .ollama_endpoints import OllamaEndpoint
+from .result_cache import ResultCache
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOllamaAnalyzer(OllamaAnalyzer):
+    """Klient Ollama z wieloma analizami w locie (asyncio + strumień odpowiedzi)"""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = "gemma3:12b",
+        cache: Optional[ResultCache] = None,
+        endpoints: Optional[List[str]] = None,
+        max_in_flight: int = OLLAMA_MAX_IN_FLIGHT,
+        deadline_seconds: float = OLLAMA_REQUEST_DEADLINE,
+    ):
+        super().__init__(base_url=base_url, model=model, cache=cache, endpoints=endpoints)
+        self.max_in_flight = max(1, max_in_flight)
+        self.deadline_seconds = max(0.0, deadline_seconds)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client = None
+        # Pula wątków dla blokujących kroków (cache na dysku, /api/tokenize);
+        # bez httpx także zapytania idą przez wspólną sesję requests w jej wątkach
+        self._executor: Optional[ThreadPoolExecutor] = None
+        logger.info(
+            "Klient asynchroniczny Ollama: do %d zapytań w locie, limit czasu %s (%s)",
+            self.max_in_flight,
+            f"{self.deadline_seconds:.0f} s" if self.deadline_seconds else "brak",
+            "httpx" if HTTPX_AVAILABLE else "requests w puli wątków",
+        )
+
+    def analyze_content(
+        self,
+        text: str,
+        analysis_type: str = "general",
+        use_cache: bool = True,
+        template: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Synchroniczna nakładka – zleca analizę w pętli asyncio i czeka na wynik"""
+        return self.submit(text, analysis_type, use_cache, template).result()
+
+    def submit(
+        self,
+        text: str,
+        analysis_type: str = "general",
+        use_cache: bool = True,
+        template: Optional[str] = None,
+    ) -> Future:
+        """Zleca analizę bez blokowania; zwraca Future z wynikiem analyze_content"""
+        return asyncio.run_coroutine_threadsafe(
+            self.analyze_content_async(text, analysis_type, use_cache, template),
+            self._ensure_loop(),
+        )
+
+    async def analyze_content_async(
+        self,
+        text: str,
+        analysis_type: str = "general",
+        use_cache: bool = True,
+        template: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Analiza treści w pętli klienta (wywoływana przez submit/analyze_content)"""
+        request: Optional[_AnalysisRequest] = None
+        try:
+            # Odczyt cache i liczenie tokenów blokują – poza pętlą, by nie wstrzymywać innych analiz
+            loop = asyncio.get_running_loop()
+            request, cached = await loop.run_in_executor(
+                self._executor, self._prepare_request, text, analysis_type, use_cache, template
+            )
+            if cached is not None:
+                return cached
+            if self.deadline_seconds:
+                return await asyncio.wait_for(self._send_limited(request), self.deadline_seconds)
+            return await self._send_limited(request)
+        except asyncio.TimeoutError:
+            error = TimeoutError(
+                f"Przekroczono limit czasu analizy ({self.deadline_seconds:.0f} s)"
+            )
+            return self._exception_result(request, analysis_type, error)
+        except Exception as e:
+            return self._exception_result(request, analysis_type, e)
+
+    def _analyze_many(
+        self, items: List[Tuple[str, str, bool, Optional[str]]]
+    ) -> List[Dict[str, Any]]:
+        # Fragmenty trafiają do pętli naraz – równoległość ogranicza limit zapytań w locie
+        futures = [self.submit(*item) for item in items]
+        return [future.result() for future in futures]
+
+    async def _send_limited(self, request: _AnalysisRequest) -> Dict[str, Any]:
+        async with self._semaphore:
+            if HTTPX_AVAILABLE:
+                return await self._send_with_failover(request)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._execute_request, request, True)
+
+    async def _send_with_failover(self, request: _AnalysisRequest) -> Dict[str, Any]:
+        """Odpowiednik _execute_request dla httpx – ponowienie na innym węźle po błędzie"""
+        tried: List[OllamaEndpoint] = []
+        while True:
+            endpoint = self.endpoint_pool.select(tried)
+            tried.append(endpoint)
+            start_time = time.monotonic()
+            try:
+                status_code, result = await self._stream_request(endpoint.url, request)
+            except httpx.HTTPError as e:
+                if self._attempt_failed(endpoint, start_time, tried, error=e):
+                    continue
+                raise
+            except (asyncio.CancelledError, Exception):
+                # Przekroczony limit czasu lub błąd przetwarzania odpowiedzi – węzeł nie jest winny,
+                # zwalniamy go bez oznaczania (inaczej zawyżone obciążenie zostałoby na stałe)
+                self.endpoint_pool.release(endpoint)
+                raise
+            if self._attempt_failed(endpoint, start_time, tried, status_code=status_code):
+                continue
+            return result
+
+    async def _stream_request(
+        self, base_url: str, request: _AnalysisRequest
+    ) -> Tuple[int, Dict[str, Any]]:
+        client = self._get_client()
+        logger.info(f"Wysyłanie zapytania do Ollama (typ: {request.analysis_type}, async)")
+        start_time = time.monotonic()
+        chunks: List[str] = []
+        final_payload: Dict[str, Any] = {}
+        tracker = self._create_stream_tracker()
+
+        payload = self._build_payload(request, True)
+        async with client.stream("POST", f"{base_url}/api/generate", json=payload) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                return response.status_code, self._http_error_result(request, response.status_code, body)
+            idx = 0
+            async for line in response.aiter_lines():
+                idx += 1
+                data = self._consume_stream_line(line, idx, request.request_id, chunks)
+                if data is None:
+                    continue
+                final_payload = data
+                if self._stream_complete(tracker, data, idx, request.request_id):
+                    break
+
+        final_payload, analysis_text = self._finish_stream(chunks, final_payload, tracker)
+        self._record_prompt_usage(request, final_payload)
+        self._emit_debug(
+            request.request_id,
+            "Request completed in %.2fs (status=%s, response_chars=%d)",
+            time.monotonic() - start_time,
+            response.status_code,
+            len(analysis_text),
+        )
+        return response.status_code, self._build_analysis_result(request, analysis_text)
+
+    def _get_client(self):
+        # Tworzony w pętli klienta – połączenia keep-alive współdzielone przez wszystkie zapytania
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.request_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_in_flight,
+                    max_keepalive_connections=self.max_in_flight,
+                ),
+            )
+        return self._client
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_in_flight)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_in_flight, thread_name_prefix="ollama-request"
+                )
+                thread = threading.Thread(
+                    target=self._run_loop, args=(loop,), name="ollama-async", daemon=True
+                )
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def close(self) -> None:
+        """Zamknięcie klienta HTTP i pętli asyncio (wywoływane po zatrzymaniu pipeline)"""
+        super().close()
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -8,11 +8,21 @@ Zawiera funkcje do:
 - Normalizacji głośności
 - Podbicia głośności (gain boost)
 - Poprawy jakości audio (compression, EQ)
+- Przetwarzania długich nagrań blokami (stan filtrów przenoszony między blokami)
+- Pracy w częstotliwości modeli (16 kHz mono) zamiast częstotliwości źródła
+- Cache profili szumu dla nagrań z tego samego źródła
+- Adaptacyjnego wyboru etapów na podstawie szybkich metryk jakości nagrania
 """
 
+import base64
+import binascii
+import hashlib
 import logging
+import re
+import tempfile
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import numpy as np
 
 try:
@@ -37,10 +47,111 @@ from .config import (
     AUDIO_PREPROCESS_GAIN_DB,
     AUDIO_PREPROCESS_COMPRESSOR,
     AUDIO_PREPROCESS_EQ,
+    AUDIO_PREPROCESS_STREAMING,
+    AUDIO_PREPROCESS_STREAMING_MIN_SECONDS,
+    AUDIO_PREPROCESS_BLOCK_SECONDS,
+    AUDIO_PREPROCESS_SAMPLE_RATE,
+    AUDIO_NOISE_PROFILE_CACHE_ENABLED,
+    AUDIO_NOISE_PROFILE_SOURCE_PATTERN,
+    AUDIO_NOISE_PROFILE_CACHE_DIR,
+    AUDIO_NOISE_PROFILE_MAX_ENTRIES,
+    AUDIO_NOISE_PROFILE_TTL_HOURS,
+    AUDIO_PREPROCESS_ADAPTIVE,
+    AUDIO_PREPROCESS_MIN_SNR_DB,
+    AUDIO_PREPROCESS_MIN_SPEECH_DBFS,
+    AUDIO_PREPROCESS_MAX_CREST_DB,
+    AUDIO_PREPROCESS_MAX_LOW_FREQ_RATIO,
 )
+from .decoded_audio import DecodedAudio, pcm_hash, spill_directory
+from .result_cache import ResultCache
 
 logger = logging.getLogger(__name__)
 
+# Długość profilu szumu (najcichsze ramki nagrania) i ramki używanej do jego wyboru
+NOISE_PROFILE_SECONDS = 2.0
+NOISE_FRAME_MS = 30
+
+# Częstotliwość sygnału analizowanego przez SignalQuality (decymacja) i poziom uznawany za przesterowanie
+ANALYSIS_SAMPLE_RATE = 8000
+CLIPPING_LEVEL = 0.99
+
+# Etapy łańcucha, które może pominąć preprocessing adaptacyjny
+STAGES = ("noise_reduce", "normalize", "gain", "compressor", "eq")
+
+
+@dataclass
+class _ChainState:
+    """Stan etapów przenoszony między blokami przy przetwarzaniu strumieniowym"""
+
+    # Wygładzone wzmocnienie kompresora na ostatniej próbce poprzedniego bloku
+    compressor_gain: Optional[float] = None
+    # Stany filtrów EQ (zi dla sosfilt)
+    eq_zi: Dict[str, np.ndarray] = field(default_factory=dict)
+
+
+class SignalQuality:
+    """Szybkie metryki jakości nagrania liczone blokami (szczyt i przesterowanie w oryginalnej
+    częstotliwości, poziomy i widmo na sygnale zdecymowanym z filtrem antyaliasingowym)"""
+
+    def __init__(self, sample_rate: int):
+        self.step = max(1, sample_rate // ANALYSIS_SAMPLE_RATE)
+        self.rate = sample_rate / self.step
+        self._frame_length = max(1, int(self.rate * NOISE_FRAME_MS / 1000))
+        self._levels: List[np.ndarray] = []
+        self._samples = 0
+        self._native_samples = 0
+        self._clipped = 0
+        self._peak = 0.0
+        self._energy = 0.0
+        self._low_power = 0.0
+        self._total_power = 0.0
+
+    def add(self, samples: np.ndarray) -> None:
+        """Dodaje kolejny fragment sygnału mono (w oryginalnej częstotliwości)"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if not len(samples):
+            return
+        from scipy import signal
+
+        magnitude = np.abs(samples)
+        self._native_samples += len(samples)
+        self._clipped += int(np.count_nonzero(magnitude >= CLIPPING_LEVEL))
+        self._peak = max(self._peak, float(magnitude.max()))
+
+        # Filtr polifazowy przed decymacją – szum spoza pasma nie nakłada się na pasmo analizy
+        decimated = signal.resample_poly(samples, 1, self.step).astype(np.float32) if self.step > 1 else samples
+        if not len(decimated):
+            return
+        self._samples += len(decimated)
+        self._energy += float(np.dot(decimated, decimated))
+
+        num_frames = len(decimated) // self._frame_length
+        if num_frames:
+            frames = decimated[: num_frames * self._frame_length].reshape(num_frames, self._frame_length)
+            rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / self._frame_length)
+            self._levels.append(20.0 * np.log10(np.maximum(rms, 1e-10)))
+
+        if len(decimated) >= 256:
+            freqs, power = signal.welch(decimated, fs=self.rate, nperseg=256)
+            self._low_power += float(power[freqs < 80].sum()) * len(decimated)
+            self._total_power += float(power.sum()) * len(decimated)
+
+    def metrics(self) -> Optional[Dict[str, float]]:
+        """SNR, poziom mowy, szczyt, przesterowanie i udział niskich częstotliwości (None – za mało danych)"""
+        if not self._levels or self._peak == 0:
+            return None
+        levels = np.concatenate(self._levels)
+        noise_floor = float(np.percentile(levels, 10))
+        speech_level = float(np.percentile(levels, 90))
+        return {
+            "snr_db": round(speech_level - noise_floor, 1),
+            "speech_level_dbfs": round(speech_level, 1),
+            "rms_dbfs": round(10.0 * np.log10(max(self._energy / self._samples, 1e-20)), 1),
+            "peak_dbfs": round(20.0 * np.log10(self._peak), 1),
+            "clipping_ratio": round(self._clipped / self._native_samples, 5),
+            "low_freq_ratio": round(self._low_power / self._total_power, 3) if self._total_power else 0.0,
+        }
+
 
 class AudioPreprocessor:
     """Klasa do wstępnego przetwarzania plików audio przed transkrypcją"""
@@ -53,6 +164,13 @@ class AudioPreprocessor:
         gain_db: float = 3.0,
         compressor: bool = True,
         eq: bool = True,
+        streaming: bool = AUDIO_PREPROCESS_STREAMING,
+        streaming_min_seconds: float = AUDIO_PREPROCESS_STREAMING_MIN_SECONDS,
+        block_seconds: float = AUDIO_PREPROCESS_BLOCK_SECONDS,
+        sample_rate: int = AUDIO_PREPROCESS_SAMPLE_RATE,
+        noise_profile_cache: Optional[ResultCache] = None,
+        noise_source_pattern: str = AUDIO_NOISE_PROFILE_SOURCE_PATTERN,
+        adaptive: bool = AUDIO_PREPROCESS_ADAPTIVE,
     ):
         self.enabled = enabled and AUDIO_LIBS_AVAILABLE
         self.noise_reduce = noise_reduce and NOISE_REDUCE_AVAILABLE
@@ -60,6 +178,32 @@ class AudioPreprocessor:
         self.gain_db = gain_db
         self.compressor = compressor
         self.eq = eq
+        self.streaming = streaming
+        self.streaming_min_seconds = streaming_min_seconds
+        self.block_seconds = block_seconds
+        # None – łańcuch w częstotliwości oryginalnego nagrania
+        self.sample_rate: Optional[int] = sample_rate or None
+        self.adaptive = adaptive
+        self.min_snr_db = AUDIO_PREPROCESS_MIN_SNR_DB
+        self.min_speech_dbfs = AUDIO_PREPROCESS_MIN_SPEECH_DBFS
+        self.max_crest_db = AUDIO_PREPROCESS_MAX_CREST_DB
+        self.max_low_freq_ratio = AUDIO_PREPROCESS_MAX_LOW_FREQ_RATIO
+        if noise_profile_cache is None and AUDIO_NOISE_PROFILE_CACHE_ENABLED and noise_source_pattern:
+            noise_profile_cache = ResultCache(
+                AUDIO_NOISE_PROFILE_CACHE_DIR,
+                max_entries=AUDIO_NOISE_PROFILE_MAX_ENTRIES,
+                ttl_seconds=AUDIO_NOISE_PROFILE_TTL_HOURS * 3600,
+                name="cache profili szumu",
+            )
+        self.noise_profile_cache = noise_profile_cache
+        try:
+            # Pusty wzorzec – brak wspólnych źródeł, profil szumu liczony z każdego pliku
+            self.noise_source_pattern: Optional[re.Pattern] = (
+                re.compile(noise_source_pattern) if noise_source_pattern else None
+            )
+        except re.error as e:
+            logger.warning(f"Niepoprawny AUDIO_NOISE_PROFILE_SOURCE_PATTERN ({e}) – cache profili szumu wyłączony")
+            self.noise_source_pattern = None
         
         if not AUDIO_LIBS_AVAILABLE:
             logger.warning("AudioPreprocessor: biblioteki audio nie są dostępne. Preprocessing wyłączony.")
@@ -79,13 +223,45 @@ class AudioPreprocessor:
         Returns:
             Ścieżka do przetworzonego pliku lub None w przypadku błędu
         """
+        processed_path, _ = self.process_with_buffer(input_path, output_path)
+        return processed_path
+
+    def process_with_buffer(
+        self, input_path: Path, output_path: Optional[Path] = None
+    ) -> Tuple[Optional[Path], Optional[DecodedAudio]]:
+        """
+        Przetwarza plik audio i zwraca także przetworzony sygnał jako DecodedAudio.
+        
+        Dzięki temu transkrypcja i rozpoznawanie mówców korzystają z bufora w pamięci
+        zamiast ponownie dekodować zapisany plik. Długie nagrania przetwarzane są blokami
+        i wtedy bufor nie jest zwracany (pipeline dekoduje zapisany plik).
+        
+        Returns:
+            Krotka (ścieżka do przetworzonego pliku, bufor 16 kHz lub None)
+        """
+        processed_path, decoded, _ = self.process_with_report(input_path, output_path)
+        return processed_path, decoded
+
+    def process_with_report(
+        self, input_path: Path, output_path: Optional[Path] = None
+    ) -> Tuple[Optional[Path], Optional[DecodedAudio], Dict[str, Any]]:
+        """
+        Jak process_with_buffer, dodatkowo zwraca raport: metryki jakości i uruchomione etapy.
+        
+        Gdy żaden etap nie jest potrzebny (czyste nagranie), plik nie jest przetwarzany
+        i zwracana jest ścieżka oryginału.
+        
+        Returns:
+            Krotka (ścieżka do pliku, bufor 16 kHz lub None, raport preprocessingu)
+        """
+        report: Dict[str, Any] = {"adaptive": self.adaptive, "skipped": True, "stages": [], "metrics": None}
         if not self.enabled:
             logger.debug("AudioPreprocessor: preprocessing wyłączony, zwracam oryginalny plik")
-            return input_path
+            return input_path, None, report
         
         if not AUDIO_LIBS_AVAILABLE:
             logger.warning("AudioPreprocessor: biblioteki nie są dostępne, zwracam oryginalny plik")
-            return input_path
+            return input_path, None, report
         
         try:
             logger.info(f"Rozpoczęcie preprocessing audio: {input_path.name}")
@@ -94,65 +270,36 @@ class AudioPreprocessor:
             if output_path is None:
                 output_path = self._generate_output_path(input_path)
             
-            # Wczytanie audio
-            y, sr = librosa.load(str(input_path), sr=None, mono=True)
+            source = self._noise_source(input_path)
+            if self._should_stream(input_path):
+                peak, metrics, report["input_hash"] = self._scan_file(input_path)
+                stages = self._plan_stages(metrics)
+                report.update(self._report(metrics, stages))
+                if report["skipped"]:
+                    return input_path, None, report
+                self._process_streaming(input_path, output_path, source, stages, peak)
+                logger.info(f"Preprocessing zakończony (blokami): {output_path.name}")
+                return output_path, None, report
+            
+            # Wczytanie audio (z resamplingiem do częstotliwości łańcucha już przy dekodowaniu)
+            y, sr = librosa.load(str(input_path), sr=self.sample_rate, mono=True)
             original_length = len(y)
             
             logger.debug(f"Wczytano audio: {original_length} próbek, {sr}Hz")
             
-            # Zastosowanie wszystkich włączonych funkcji
-            processed = y.copy()
-            
-            # 1. Odszumianie (delikatniejsze parametry dla lepszej jakości mowy)
-            if self.noise_reduce:
-                logger.debug("Stosowanie odszumiania...")
-                try:
-                    # Optymalne parametry dla transkrypcji mowy:
-                    # - prop_decrease=0.5: delikatniejsza redukcja (0.8 domyślnie)
-                    # - stationary=True: dla większości nagrań call center
-                    # - time_constant_s=0.01: szybsza adaptacja
-                    processed = nr.reduce_noise(
-                        y=processed, 
-                        sr=sr,
-                        stationary=True,
-                        prop_decrease=0.5,  # Delikatniejsza redukcja (domyślnie 0.8)
-                        time_constant_s=0.01,  # Szybsza adaptacja
-                        freq_mask_smooth_hz=500  # Wygładzenie maski
-                    )
-                except Exception as e:
-                    logger.warning(f"Błąd podczas odszumiania: {e}, kontynuuję bez odszumiania")
-                    # Kontynuuj bez odszumiania w przypadku błędu
-            
-            # 2. Normalizacja głośności
-            if self.normalize:
-                logger.debug("Stosowanie normalizacji...")
-                # Normalizacja do zakresu [-1, 1] z zachowaniem proporcji
-                max_val = np.abs(processed).max()
-                if max_val > 0:
-                    processed = processed / max_val * 0.95  # 0.95 aby uniknąć clippingu
+            report["input_hash"] = pcm_hash(y)
+            metrics = None
+            if self.adaptive:
+                quality = SignalQuality(sr)
+                quality.add(y)
+                metrics = quality.metrics()
+            stages = self._plan_stages(metrics)
+            report.update(self._report(metrics, stages))
+            if report["skipped"]:
+                # Czyste nagranie – zdekodowany sygnał trafia dalej bez zapisu pliku
+                return input_path, self._decoded_buffer(y, sr, input_path), report
             
-            # 3. Podbicie głośności (gain) - mniejsze wzmocnienie dla lepszej jakości
-            if self.gain_db != 0:
-                logger.debug(f"Stosowanie gain: {self.gain_db}dB...")
-                gain_linear = 10 ** (self.gain_db / 20)
-                processed = processed * gain_linear
-                # Obcięcie do zakresu [-1, 1] - delikatne clipping
-                processed = np.clip(processed, -0.98, 0.98)  # Zostawiamy margines
-            
-            # 4. Kompresor (dynamic range compression)
-            if self.compressor:
-                logger.debug("Stosowanie kompresora...")
-                processed = self._apply_compressor(processed, sr)
-            
-            # 5. EQ (equalizer) - wzmocnienie średnich częstotliwości (mowa)
-            if self.eq:
-                logger.debug("Stosowanie EQ...")
-                processed = self._apply_eq(processed, sr)
-            
-            # Ostateczna normalizacja po wszystkich operacjach
-            max_val = np.abs(processed).max()
-            if max_val > 0:
-                processed = processed / max_val * 0.95
+            processed = self._apply_chain(y, sr, source, stages)
             
             # Zapisanie przetworzonego pliku
             sf.write(str(output_path), processed, sr)
@@ -160,17 +307,374 @@ class AudioPreprocessor:
             logger.info(f"Preprocessing zakończony: {output_path.name}")
             logger.debug(f"Długość audio: {original_length} -> {len(processed)} próbek")
             
-            return output_path
+            return output_path, self._decoded_buffer(processed, sr, output_path), report
             
         except Exception as e:
             logger.error(f"Błąd podczas preprocessing audio {input_path.name}: {e}", exc_info=True)
-            return input_path  # Zwróć oryginalny plik w przypadku błędu
+            report.update({"skipped": True, "stages": [], "error": str(e)})
+            return input_path, None, report  # Zwróć oryginalny plik w przypadku błędu
+
+    @staticmethod
+    def _decoded_buffer(samples: np.ndarray, sr: int, source_path: Path) -> Optional[DecodedAudio]:
+        try:
+            return DecodedAudio.from_array(samples, sr, source_path=source_path)
+        except Exception as e:
+            logger.warning(f"Nie udało się przygotować bufora 16 kHz: {e}")
+            return None
+
+    def settings_fingerprint(self) -> str:
+        """Ustawienia wpływające na wynik preprocessingu (część klucza cache transkrypcji)"""
+        return "|".join(
+            str(value)
+            for value in (
+                self.noise_reduce,
+                self.normalize,
+                self.gain_db,
+                self.compressor,
+                self.eq,
+                self.sample_rate,
+                self.adaptive,
+                self.min_snr_db,
+                self.min_speech_dbfs,
+                self.max_crest_db,
+                self.max_low_freq_ratio,
+                self.noise_source_pattern.pattern if self.noise_profile_cache and self.noise_source_pattern else "",
+            )
+        )
+
+    def _configured_stages(self) -> Dict[str, bool]:
+        return {
+            "noise_reduce": self.noise_reduce,
+            "normalize": self.normalize,
+            "gain": self.gain_db != 0,
+            "compressor": self.compressor,
+            "eq": self.eq,
+        }
+
+    def _plan_stages(self, metrics: Optional[Dict[str, float]]) -> Dict[str, bool]:
+        """Etapy do uruchomienia: włączone w konfiguracji i (w trybie adaptacyjnym) potrzebne wg metryk"""
+        stages = self._configured_stages()
+        if not self.adaptive or metrics is None:
+            return stages
+        quiet = metrics["speech_level_dbfs"] < self.min_speech_dbfs
+        needed = {
+            "noise_reduce": metrics["snr_db"] < self.min_snr_db,
+            "normalize": quiet,
+            "gain": quiet,
+            "compressor": metrics["peak_dbfs"] - metrics["speech_level_dbfs"] > self.max_crest_db,
+            "eq": metrics["low_freq_ratio"] > self.max_low_freq_ratio,
+        }
+        return {stage: enabled and needed[stage] for stage, enabled in stages.items()}
+
+    def _report(self, metrics: Optional[Dict[str, float]], stages: Dict[str, bool]) -> Dict[str, Any]:
+        selected = [stage for stage in STAGES if stages[stage]]
+        if self.adaptive:
+            logger.info(
+                "Preprocessing adaptacyjny: %s (metryki: %s)",
+                ", ".join(selected) if selected else "pominięty – nagranie czyste",
+                metrics,
+            )
+        return {"skipped": not selected, "stages": selected, "metrics": metrics}
+
+    def _apply_chain(
+        self,
+        y: np.ndarray,
+        sr: int,
+        source: Optional[str] = None,
+        stages: Optional[Dict[str, bool]] = None,
+    ) -> np.ndarray:
+        """Stosuje etapy przetwarzania do sygnału (source – źródło dla profilu szumu, stages – plan etapów)"""
+        stages = stages or self._configured_stages()
+        # Zastosowanie wszystkich włączonych funkcji
+        processed = y.copy()
+        
+        # 1. Odszumianie (delikatniejsze parametry dla lepszej jakości mowy)
+        if stages["noise_reduce"]:
+            logger.debug("Stosowanie odszumiania...")
+            noise = self._noise_profile(source, processed, sr)
+            processed = self._reduce_noise(processed, sr, noise)
+        
+        processed = self._apply_dynamics(processed, sr, stages=stages)
+        
+        # Ostateczna normalizacja po wszystkich operacjach
+        max_val = np.abs(processed).max()
+        if max_val > 0:
+            processed = processed / max_val * 0.95
+        
+        return processed
+    
+    def _reduce_noise(self, audio: np.ndarray, sr: int, noise: Optional[np.ndarray] = None) -> np.ndarray:
+        """Odszumianie stacjonarne (profil z ``noise`` lub z całego sygnału); w razie błędu zwraca sygnał bez zmian"""
+        try:
+            # Optymalne parametry dla transkrypcji mowy:
+            # - prop_decrease=0.5: delikatniejsza redukcja (0.8 domyślnie)
+            # - stationary=True: dla większości nagrań call center
+            # - time_constant_s=0.01: szybsza adaptacja
+            return nr.reduce_noise(
+                y=audio, 
+                sr=sr,
+                y_noise=noise,
+                stationary=True,
+                prop_decrease=0.5,  # Delikatniejsza redukcja (domyślnie 0.8)
+                time_constant_s=0.01,  # Szybsza adaptacja
+                freq_mask_smooth_hz=500  # Wygładzenie maski
+            )
+        except Exception as e:
+            logger.warning(f"Błąd podczas odszumiania: {e}, kontynuuję bez odszumiania")
+            # Kontynuuj bez odszumiania w przypadku błędu
+            return audio
+    
+    def _noise_source(self, input_path: Path) -> Optional[str]:
+        """Źródło nagrania wyznaczone z nazwy pliku (None – profil szumu nie jest zapamiętywany)"""
+        if not self.noise_reduce or self.noise_profile_cache is None or self.noise_source_pattern is None:
+            return None
+        match = self.noise_source_pattern.match(input_path.name)
+        if not match:
+            return None
+        return (match.group(1) if match.groups() else match.group(0)) or None
+    
+    def _noise_profile(self, source: Optional[str], audio: np.ndarray, sr: int) -> Optional[np.ndarray]:
+        """Profil szumu źródła z cache; przy braku wyznaczany z nagrania i zapisywany"""
+        if source is None:
+            return None
+        key = ResultCache.make_key("noise_profile", source, sr)
+        entry = self.noise_profile_cache.get(key)
+        if entry is not None:
+            try:
+                noise = np.frombuffer(base64.b64decode(entry["noise_f16"]), dtype=np.float16).astype(np.float32)
+            except (KeyError, TypeError, ValueError, binascii.Error) as e:
+                logger.warning(f"Uszkodzony profil szumu źródła '{source}': {e}")
+            else:
+                logger.debug(f"Profil szumu źródła '{source}' z cache – pominięto estymację")
+                return noise
+        
+        noise = self._estimate_noise(audio, sr)
+        if noise is None:
+            return None
+        self.noise_profile_cache.put(key, {
+            "source": source,
+            "sample_rate": sr,
+            "noise_f16": base64.b64encode(noise.astype(np.float16).tobytes()).decode("ascii"),
+        })
+        logger.info(f"Wyznaczono profil szumu źródła '{source}' ({len(noise) / sr:.1f} s)")
+        return noise
+    
+    @staticmethod
+    def _estimate_noise(audio: np.ndarray, sr: int, seconds: float = NOISE_PROFILE_SECONDS) -> Optional[np.ndarray]:
+        """
+        Profil szumu: najcichsze ramki nagrania (w kolejności czasowej), łącznie ``seconds`` sekund.
+        
+        Brane jest najwyżej 25% ramek, aby w profilu nie znalazła się mowa; dla zbyt
+        krótkich nagrań zwraca None (odszumianie liczy wtedy profil z całego sygnału).
+        """
+        frame_length = max(1, int(sr * NOISE_FRAME_MS / 1000))
+        num_frames = len(audio) // frame_length
+        frames = audio[: num_frames * frame_length].reshape(num_frames, frame_length)
+        energy = np.einsum("ij,ij->i", frames, frames)
+        # Cyfrowa cisza (same zera) nie opisuje szumu łącza
+        candidates = np.flatnonzero(energy > 0)
+        wanted = min(max(1, int(seconds * sr) // frame_length), len(candidates) // 4)
+        if wanted == 0:
+            return None
+        quietest = np.sort(candidates[np.argsort(energy[candidates])[:wanted]])
+        return frames[quietest].reshape(-1).astype(np.float32)
+    
+    def _apply_dynamics(
+        self,
+        processed: np.ndarray,
+        sr: int,
+        peak: Optional[float] = None,
+        state: Optional[_ChainState] = None,
+        stages: Optional[Dict[str, bool]] = None,
+    ) -> np.ndarray:
+        """
+        Etapy po odszumianiu: normalizacja, gain, kompresor i EQ.
+        
+        Args:
+            peak: Szczyt całego nagrania dla normalizacji (None = szczyt przekazanego sygnału)
+            state: Stan kompresora i EQ przenoszony między blokami (None = cały sygnał naraz)
+            stages: Plan etapów (None = etapy włączone w konfiguracji)
+        """
+        stages = stages or self._configured_stages()
+        # 2. Normalizacja głośności
+        if stages["normalize"]:
+            logger.debug("Stosowanie normalizacji...")
+            # Normalizacja do zakresu [-1, 1] z zachowaniem proporcji
+            max_val = np.abs(processed).max() if peak is None else peak
+            if max_val > 0:
+                processed = processed / max_val * 0.95  # 0.95 aby uniknąć clippingu
+        
+        # 3. Podbicie głośności (gain) - mniejsze wzmocnienie dla lepszej jakości
+        if stages["gain"]:
+            logger.debug(f"Stosowanie gain: {self.gain_db}dB...")
+            gain_linear = 10 ** (self.gain_db / 20)
+            processed = processed * gain_linear
+            # Obcięcie do zakresu [-1, 1] - delikatne clipping
+            processed = np.clip(processed, -0.98, 0.98)  # Zostawiamy margines
+        
+        # 4. Kompresor (dynamic range compression)
+        if stages["compressor"]:
+            logger.debug("Stosowanie kompresora...")
+            processed = self._apply_compressor(processed, sr, state=state)
+        
+        # 5. EQ (equalizer) - wzmocnienie średnich częstotliwości (mowa)
+        if stages["eq"]:
+            logger.debug("Stosowanie EQ...")
+            processed = self._apply_eq(processed, sr, state=state)
+        
+        return processed
+    
+    def _should_stream(self, input_path: Path) -> bool:
+        """Czy nagranie przetwarzać blokami (długie i czytelne przez soundfile)"""
+        if not self.streaming:
+            return False
+        try:
+            info = sf.info(str(input_path))
+        except Exception:
+            # Format nieobsługiwany przez libsndfile – wczytanie całości przez librosa
+            return False
+        return info.duration >= self.streaming_min_seconds
+    
+    def _scan_file(self, input_path: Path) -> Tuple[float, Optional[Dict[str, float]], str]:
+        """Pierwszy przebieg po pliku blokami: szczyt do normalizacji, metryki jakości i skrót wejścia"""
+        peak = 0.0
+        digest = hashlib.blake2b(digest_size=20)
+        with sf.SoundFile(str(input_path)) as audio_file:
+            quality = SignalQuality(audio_file.samplerate)
+            blocksize = max(1, int(self.block_seconds * audio_file.samplerate))
+            for chunk in audio_file.blocks(blocksize=blocksize, dtype="float32", always_2d=True):
+                if len(chunk):
+                    mono = chunk.mean(axis=1)
+                    digest.update(mono.data)
+                    peak = max(peak, float(np.abs(mono).max()))
+                    if self.adaptive:
+                        quality.add(mono)
+        return peak, quality.metrics() if self.adaptive else None, digest.hexdigest()
+    
+    def _process_streaming(
+        self,
+        input_path: Path,
+        output_path: Path,
+        source: Optional[str] = None,
+        stages: Optional[Dict[str, bool]] = None,
+        peak: Optional[float] = None,
+    ) -> None:
+        """
+        Przetwarza nagranie blokami o stałej długości z zapisem wyniku na bieżąco.
+        
+        Szczyt do normalizacji pochodzi z pierwszego przebiegu (_scan_file). Bloki czytane są
+        z resamplingiem strumieniowym do częstotliwości łańcucha i przetwarzane (odszumianie
+        z zakładką 1 s po obu stronach bloku, stan kompresora i EQ przenoszony między blokami)
+        do pliku tymczasowego, a ostatni przebieg skaluje wynik do ostatecznej normalizacji
+        i zapisuje plik wyjściowy.
+        """
+        stages = stages or self._configured_stages()
+        if peak is None and stages["normalize"]:
+            peak, _, _ = self._scan_file(input_path)
+        with sf.SoundFile(str(input_path)) as audio_file:
+            source_sr = audio_file.samplerate
+            sr = self.sample_rate or source_sr
+            # Blok to wielokrotność ramki kompresora – ramki nie przecinają granic bloków
+            frame_length = max(1, int(sr * 0.01))
+            block = max(frame_length, int(self.block_seconds * sr) // frame_length * frame_length)
+            padding = sr if stages["noise_reduce"] else 0
+            
+            logger.debug(
+                f"Preprocessing blokami: {audio_file.frames} próbek, {source_sr}Hz -> {sr}Hz, blok {block} próbek"
+            )
+            state = _ChainState()
+            output_peak = 0.0
+            with tempfile.TemporaryFile(dir=spill_directory()) as scratch:
+                # Blok przetwarzany jest po wczytaniu następnego (zakładka odszumiania po obu stronach)
+                before = np.zeros(0, dtype=np.float32)
+                current: Optional[np.ndarray] = None
+                noise: Optional[np.ndarray] = None
+                for upcoming in self._read_blocks(audio_file, sr, block):
+                    if current is None and stages["noise_reduce"]:
+                        # Profil szumu źródła z cache lub z pierwszego bloku (wspólny dla wszystkich bloków)
+                        noise = self._noise_profile(source, upcoming, sr)
+                    if current is not None:
+                        output_peak = max(
+                            output_peak,
+                            self._process_block(
+                                current, before, upcoming[:padding], sr, peak, state, scratch, noise, stages
+                            ),
+                        )
+                        before = np.concatenate((before, current))[-padding:] if padding else before
+                    current = upcoming
+                if current is not None:
+                    output_peak = max(
+                        output_peak,
+                        self._process_block(current, before, current[:0], sr, peak, state, scratch, noise, stages),
+                    )
+                
+                # Ostateczna normalizacja po wszystkich operacjach
+                scale = 0.95 / output_peak if output_peak > 0 else 1.0
+                scratch.seek(0)
+                with sf.SoundFile(str(output_path), "w", samplerate=sr, channels=1) as target:
+                    while True:
+                        chunk = np.frombuffer(scratch.read(block * 4), dtype=np.float32)
+                        if not len(chunk):
+                            break
+                        target.write(chunk * scale)
+    
+    def _process_block(
+        self,
+        samples: np.ndarray,
+        before: np.ndarray,
+        after: np.ndarray,
+        sr: int,
+        peak: Optional[float],
+        state: _ChainState,
+        scratch,
+        noise: Optional[np.ndarray] = None,
+        stages: Optional[Dict[str, bool]] = None,
+    ) -> float:
+        """Przetwarza blok (z kontekstem sąsiednich próbek dla odszumiania), zapisuje go i zwraca jego szczyt"""
+        stages = stages or self._configured_stages()
+        if stages["noise_reduce"]:
+            padded = self._reduce_noise(np.concatenate((before, samples, after)), sr, noise)
+            samples = padded[len(before):len(before) + len(samples)]
+        processed = self._apply_dynamics(samples, sr, peak=peak, state=state, stages=stages).astype(np.float32)
+        scratch.write(processed.tobytes())
+        return float(np.abs(processed).max()) if len(processed) else 0.0
+    
+    @staticmethod
+    def _read_blocks(audio_file, sr: int, block: int) -> Iterator[np.ndarray]:
+        """Kolejne bloki mono po ``block`` próbek w częstotliwości ``sr`` (resampling strumieniowy)"""
+        resampler = None
+        if audio_file.samplerate != sr:
+            import soxr
+            
+            resampler = soxr.ResampleStream(audio_file.samplerate, sr, 1, dtype="float32")
+        buffered = np.zeros(0, dtype=np.float32)
+        for chunk in audio_file.blocks(blocksize=block, dtype="float32", always_2d=True):
+            mono = chunk.mean(axis=1)
+            if resampler is not None:
+                mono = resampler.resample_chunk(mono)
+            buffered = np.concatenate((buffered, mono))
+            while len(buffered) >= block:
+                yield buffered[:block]
+                buffered = buffered[block:]
+        if resampler is not None:
+            buffered = np.concatenate((buffered, resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)))
+        if len(buffered):
+            yield buffered
     
     def _generate_output_path(self, input_path: Path) -> Path:
         """Generuje ścieżkę do pliku wyjściowego z dopiskiem '_processed'"""
         return input_path.parent / f"{input_path.stem}_processed{input_path.suffix}"
     
-    def _apply_compressor(self, audio: np.ndarray, sr: int, ratio: float = 2.0, threshold: float = 0.8, attack: float = 0.005, release: float = 0.1) -> np.ndarray:
+    def _apply_compressor(
+        self,
+        audio: np.ndarray,
+        sr: int,
+        ratio: float = 2.0,
+        threshold: float = 0.8,
+        attack: float = 0.005,
+        release: float = 0.1,
+        state: Optional[_ChainState] = None,
+    ) -> np.ndarray:
         """
         Stosuje kompresor dynamiki do audio.
         
@@ -181,54 +685,48 @@ class AudioPreprocessor:
             threshold: Próg kompresji (0-1)
             attack: Czas ataku w sekundach
             release: Czas zwolnienia w sekundach
+            state: Stan między blokami (wzmocnienie na końcu poprzedniego bloku)
         """
         try:
-            # Prostý kompresor implementacja
-            threshold_linear = threshold
             ratio_inv = 1.0 / ratio
             
-            # Envelope follower (RMS)
-            frame_length = int(sr * 0.01)  # 10ms frames
-            if frame_length < 1:
-                frame_length = 1
+            # Envelope follower (RMS) w ramkach 10 ms – widok (ramki, próbki) zamiast pętli
+            frame_length = max(1, int(sr * 0.01))
+            full_frames = len(audio) // frame_length
+            frames = audio[: full_frames * frame_length].reshape(full_frames, frame_length)
+            envelope = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_length).astype(np.float64)
+            tail = audio[full_frames * frame_length:]
+            if len(tail):
+                envelope = np.append(envelope, np.sqrt(np.mean(np.square(tail, dtype=np.float64))))
             
-            envelope = np.zeros_like(audio)
-            for i in range(0, len(audio), frame_length):
-                end = min(i + frame_length, len(audio))
-                rms = np.sqrt(np.mean(audio[i:end] ** 2))
-                envelope[i:end] = rms
-            
-            # Compression gain
-            gain = np.ones_like(audio)
-            over_threshold = envelope > threshold_linear
-            
-            # Dla sygnałów powyżej progu, zastosuj kompresję
-            excess = envelope - threshold_linear
-            compressed_excess = excess * ratio_inv
-            target_level = threshold_linear + compressed_excess
-            
-            gain[over_threshold] = np.where(
-                envelope[over_threshold] > 0,
-                target_level[over_threshold] / envelope[over_threshold],
-                1.0
-            )
+            # Wzmocnienie ramek: powyżej progu nadmiar skracany ratio razy
+            gain = np.ones_like(envelope)
+            over_threshold = (envelope > threshold) & (envelope > 0)
+            target_level = threshold + (envelope[over_threshold] - threshold) * ratio_inv
+            gain[over_threshold] = target_level / envelope[over_threshold]
             
             # Smoothing (attack/release)
-            smoothed_gain = self._smooth_envelope(gain, sr, attack, release)
+            initial_gain = state.compressor_gain if state is not None else None
+            smoothed_gain = self._smooth_gain(
+                gain, frame_length, len(audio), sr, attack, release, initial_gain
+            )
+            if state is not None and len(smoothed_gain):
+                state.compressor_gain = float(smoothed_gain[-1])
             
-            return audio * smoothed_gain
+            return audio * smoothed_gain.astype(audio.dtype, copy=False)
             
         except Exception as e:
             logger.warning(f"Błąd podczas kompresji: {e}, zwracam oryginalny audio")
             return audio
     
-    def _apply_eq(self, audio: np.ndarray, sr: int) -> np.ndarray:
+    def _apply_eq(self, audio: np.ndarray, sr: int, state: Optional[_ChainState] = None) -> np.ndarray:
         """
         Stosuje EQ wzmacniający zakres częstotliwości mowy (szerszy zakres dla lepszej jakości).
         
         Args:
             audio: Sygnał audio
             sr: Sample rate
+            state: Stan filtrów między blokami (None = cały sygnał naraz)
         """
         try:
             # Szerszy zakres częstotliwości mowy dla lepszej jakości:
@@ -242,13 +740,13 @@ class AudioPreprocessor:
             # Zamiast 300Hz dla zachowania naturalności głosu
             if nyquist > 80:
                 sos_high = signal.butter(2, 80 / nyquist, btype='high', output='sos')
-                audio = signal.sosfilt(sos_high, audio)
+                audio = self._sosfilt(sos_high, audio, state, "high")
             
             # Low-pass filter (8000Hz) - zachowanie wysokich częstotliwości dla klarowności
             # Zamiast 3400Hz dla lepszej jakości mowy
             if nyquist > 8000:
                 sos_low = signal.butter(2, 8000 / nyquist, btype='low', output='sos')
-                audio = signal.sosfilt(sos_low, audio)
+                audio = self._sosfilt(sos_low, audio, state, "low")
             
             # Delikatniejsze wzmocnienie (1dB zamiast 2dB) - mniej artefaktów
             audio = audio * (10 ** (1.0 / 20))
@@ -262,21 +760,75 @@ class AudioPreprocessor:
             logger.warning(f"Błąd podczas EQ: {e}, zwracam oryginalny audio")
             return audio
     
-    def _smooth_envelope(self, envelope: np.ndarray, sr: int, attack: float, release: float) -> np.ndarray:
-        """Wygładza envelope z czasami attack i release"""
-        smoothed = np.zeros_like(envelope)
-        smoothed[0] = envelope[0]
+    @staticmethod
+    def _sosfilt(sos: np.ndarray, audio: np.ndarray, state: Optional[_ChainState], key: str) -> np.ndarray:
+        """sosfilt z zachowaniem stanu filtra między blokami (stan początkowy zerowy jak bez bloków)"""
+        from scipy import signal
+        
+        if state is None:
+            return signal.sosfilt(sos, audio)
+        zi = state.eq_zi.get(key)
+        if zi is None:
+            zi = np.zeros((sos.shape[0], 2))
+        filtered, state.eq_zi[key] = signal.sosfilt(sos, audio, zi=zi)
+        return filtered
+    
+    def _smooth_gain(
+        self,
+        frame_gain: np.ndarray,
+        frame_length: int,
+        num_samples: int,
+        sr: int,
+        attack: float,
+        release: float,
+        initial: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Wygładza wzmocnienie ramek z czasami attack i release (wynik dla każdej próbki).
+        
+        Odpowiada jednobiegunowemu filtrowi liczonemu próbka po próbce: w obrębie ramki cel
+        jest stały, więc wygładzona wartość zbliża się do niego monotonicznie (jeden kierunek,
+        jeden współczynnik) i ma postać zamkniętą. Stan na granicach ramek liczony jest przez
+        lfilter na odcinkach o tym samym kierunku, a próbki z potęg współczynnika.
+        ``initial`` to wartość na próbce przed pierwszą ramką (kontynuacja poprzedniego bloku).
+        """
+        from scipy import signal
         
         attack_coeff = np.exp(-1.0 / (attack * sr))
         release_coeff = np.exp(-1.0 / (release * sr))
+        frame_coeffs = (attack_coeff ** frame_length, release_coeff ** frame_length)
+        num_frames = len(frame_gain)
+        if num_frames == 0:
+            return np.ones(num_samples)
         
-        for i in range(1, len(envelope)):
-            if envelope[i] > smoothed[i-1]:
-                # Attack
-                smoothed[i] = envelope[i] + (smoothed[i-1] - envelope[i]) * attack_coeff
-            else:
-                # Release
-                smoothed[i] = envelope[i] + (smoothed[i-1] - envelope[i]) * release_coeff
+        # previous[k] – wartość wygładzona na próbce tuż przed ramką k, rising[k] – kierunek w ramce
+        previous = np.empty(num_frames)
+        rising = np.zeros(num_frames, dtype=bool)
+        state = frame_gain[0] if initial is None else initial
+        index = 0
+        window = 64
+        while index < num_frames:
+            is_rising = bool(frame_gain[index] > state)
+            coeff = frame_coeffs[0] if is_rising else frame_coeffs[1]
+            targets = frame_gain[index:index + window]
+            states, _ = signal.lfilter([1.0 - coeff], [1.0, -coeff], targets, zi=[coeff * state])
+            before = np.concatenate(([state], states[:-1]))
+            # Odcinek kończy się na pierwszej ramce, w której zmienia się kierunek
+            changed = np.flatnonzero((targets > before) != is_rising)
+            accepted = int(changed[0]) if len(changed) else len(targets)
+            previous[index:index + accepted] = before[:accepted]
+            rising[index:index + accepted] = is_rising
+            state = states[accepted - 1]
+            index += accepted
+            window = window * 2 if accepted == len(targets) else 64
         
-        return smoothed
-
+        # Próbka n ramki k: cel + (stan przed ramką - cel) * współczynnik^(n + 1)
+        exponents = np.arange(1, frame_length + 1)
+        decay = np.where(
+            rising[:, None],
+            (attack_coeff ** exponents).astype(np.float32),
+            (release_coeff ** exponents).astype(np.float32),
+        )
+        targets = frame_gain.astype(np.float32)[:, None]
+        smoothed = targets + (previous.astype(np.float32)[:, None] - targets) * decay
+        return smoothed.reshape(-1)[:num_samples]
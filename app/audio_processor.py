@@ -12,9 +12,11 @@ Zawiera główną klasę AudioProcessor która:
 import logging
 import shutil
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 from .config import (
     INPUT_FOLDER,
@@ -23,17 +25,70 @@ from .config import (
     ENABLE_SPEAKER_DIARIZATION,
     ENABLE_OLLAMA_ANALYSIS,
     MAX_CONCURRENT_PROCESSES,
+    STAGE_CONCURRENCY_LIMITS,
+    PIPELINE_AUDIO_WORKERS,
+    PIPELINE_ANALYSIS_WORKERS,
+    PIPELINE_SAVE_WORKERS,
+    PIPELINE_STAGE_QUEUE_SIZE,
+    PARALLEL_DIARIZATION_MODE,
+    DIARIZATION_PROCESS_THREADS,
+    WHISPER_PROCESS_WORKERS,
+    WHISPER_THREADS_PER_WORKER,
+    WHISPER_BATCH_SIZE,
+    WHISPER_BATCH_MAX_WAIT_MS,
+    WHISPER_BATCH_MAX_SECONDS,
+    TRANSCRIPTION_CACHE_ENABLED,
+    TRANSCRIPTION_CACHE_DIR,
+    TRANSCRIPTION_CACHE_MAX_ENTRIES,
+    TRANSCRIPTION_CACHE_MAX_MB,
+    TRANSCRIPTION_CACHE_TTL_HOURS,
 )
 from .file_loader import AudioFileLoader, FileWatcherManager
-from .speech_transcriber import WhisperTranscriber
-from .speaker_diarizer import SpeakerDiarizer, SimpleSpeakerDiarizer
+from .speech_transcriber import ProcessPoolTranscriber, WhisperTranscriber
+from .speaker_diarizer import ProcessSpeakerDiarizer, SpeakerDiarizer, SimpleSpeakerDiarizer
 from .content_analyzer import ContentAnalyzer
 from .result_saver import ResultSaver
 from .processing_queue import ProcessingQueue
 from .audio_preprocessor import AudioPreprocessor
+from .decoded_audio import DecodedAudio, decode_audio_file
+from .pipeline import PipelineStage, StagePipeline
+from .http_client import close_session as close_http_session
+from .result_cache import ResultCache
+from .transcription_batcher import TranscriptionBatcher
+from .worker_pool import StageLimiter
 
 logger = logging.getLogger(__name__)
 
+
+def _new_timestamp() -> str:
+    return datetime.now().strftime("%Y%m%d%H%M%S")
+
+
+def _empty_result_summary() -> dict:
+    return {
+        "success": False,
+        "transcription_file": None,
+        "analysis_file": None,
+        "processed_audio": None,
+        "timestamp": None,
+    }
+
+
+@dataclass
+class ProcessingJob:
+    """Stan pojedynczego pliku przekazywany między etapami pipeline"""
+
+    original_path: Path
+    queue_item_id: Optional[str] = None
+    enable_preprocessing: bool = True
+    timestamp: str = field(default_factory=_new_timestamp)
+    processed_path: Optional[Path] = None
+    original_destination_name: Optional[str] = None
+    transcription_data: Optional[dict] = None
+    analysis_results: Optional[dict] = None
+    result_summary: dict = field(default_factory=_empty_result_summary)
+
+
 class AudioProcessor:
     """Główna klasa do przetwarzania plików audio z integracją wszystkich komponentów"""
     
@@ -47,8 +102,16 @@ class AudioProcessor:
         output_folder_path = Path(output_folder)
 
         self.file_loader = AudioFileLoader(input_folder_path)
-        self.transcriber = WhisperTranscriber()
-        self.speaker_diarizer = SpeakerDiarizer()
+        if WHISPER_PROCESS_WORKERS > 0:
+            self.transcriber = ProcessPoolTranscriber(WHISPER_PROCESS_WORKERS, WHISPER_THREADS_PER_WORKER)
+        else:
+            self.transcriber = WhisperTranscriber()
+        # W trybie "process" pyannote działa w osobnym procesie, równolegle z Whisper
+        self.parallel_diarization = PARALLEL_DIARIZATION_MODE
+        if self.parallel_diarization == "process":
+            self.speaker_diarizer = ProcessSpeakerDiarizer(DIARIZATION_PROCESS_THREADS)
+        else:
+            self.speaker_diarizer = SpeakerDiarizer()
         self.content_analyzer = ContentAnalyzer()
         self.audio_preprocessor = AudioPreprocessor()
         self._processed_folder = Path(PROCESSED_FOLDER)
@@ -62,9 +125,34 @@ class AudioProcessor:
         self.enable_ollama_analysis = enable_ollama_analysis
         self.use_simple_diarization = False
         
-        # Kontrola równoległości
+        # Kontrola równoległości: pipeline etapów (tworzony przy pierwszym użyciu)
+        # oraz limity równoległości poszczególnych operacji
         self.max_concurrent = MAX_CONCURRENT_PROCESSES
-        self.semaphore = threading.Semaphore(self.max_concurrent)
+        self.stage_limiter = StageLimiter(STAGE_CONCURRENCY_LIMITS)
+        self._pipeline: Optional[StagePipeline] = None
+        self._pipeline_lock = threading.Lock()
+        self._diarization_executor: Optional[ThreadPoolExecutor] = None
+        # Cache transkrypcji adresowany treścią audio (ponowne wrzucenie pliku nie wymaga Whisper)
+        self.transcription_cache: Optional[ResultCache] = None
+        if TRANSCRIPTION_CACHE_ENABLED:
+            self.transcription_cache = ResultCache(
+                TRANSCRIPTION_CACHE_DIR,
+                max_entries=TRANSCRIPTION_CACHE_MAX_ENTRIES,
+                max_bytes=int(TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024),
+                ttl_seconds=TRANSCRIPTION_CACHE_TTL_HOURS * 3600,
+                name="cache transkrypcji",
+            )
+        # Wsadowa transkrypcja krótkich nagrań z plików przetwarzanych jednocześnie
+        self._audio_jobs = 0
+        self._audio_jobs_lock = threading.Lock()
+        self.transcription_batcher = TranscriptionBatcher(
+            self.transcriber,
+            max_batch_size=WHISPER_BATCH_SIZE,
+            max_wait_seconds=WHISPER_BATCH_MAX_WAIT_MS / 1000.0,
+            max_audio_seconds=WHISPER_BATCH_MAX_SECONDS,
+            model_limit=lambda: self.stage_limiter.limit("transcribe"),
+            active_jobs=lambda: self._audio_jobs,
+        )
         
         logger.info(f"AudioProcessor zainicjalizowany")
         logger.info(f"Rozpoznawanie mówców: {'Włączone' if enable_speaker_diarization else 'Wyłączone'}")
@@ -111,20 +199,49 @@ class AudioProcessor:
             logger.error(f"Błąd podczas inicjalizacji komponentów: {e}")
             raise
     
-    def transcribe_audio_with_speakers(self, audio_file_path: Path) -> Optional[dict]:
-        """Transkrypcja pliku audio z rozpoznawaniem mówców"""
+    def transcribe_audio_with_speakers(
+        self,
+        audio_file_path: Path,
+        decoded_audio: Optional[DecodedAudio] = None,
+        input_key: Optional[str] = None,
+    ) -> Optional[dict]:
+        """Transkrypcja pliku audio z rozpoznawaniem mówców
+
+        Jeśli przekazano ``decoded_audio``, Whisper i pyannote pracują na tym samym
+        buforze PCM zamiast dekodować plik każdy osobno. Rozpoznawanie mówców
+        startuje przed transkrypcją i działa równolegle – wyniki łączone są na końcu.
+        ``input_key`` identyfikuje nagranie w cache transkrypcji, gdy bufor pochodzi
+        z preprocessingu (domyślnie skrót PCM bufora).
+        """
+        speakers_future: Optional[Future] = None
         try:
+            if (
+                self.enable_speaker_diarization
+                and not self.use_simple_diarization
+                and self.parallel_diarization != "off"
+            ):
+                speakers_future = self._get_diarization_executor().submit(
+                    self._diarize, audio_file_path, decoded_audio
+                )
+
             # Transkrypcja audio na tekst
-            transcription_data = self.transcriber.transcribe_audio(audio_file_path)
+            transcription_data = self._transcribe(audio_file_path, decoded_audio, input_key)
+
+            # Wynik rozpoznawania mówców odbieramy zawsze – bufor audio jest
+            # zwalniany dopiero po zakończeniu obu operacji
+            speakers_data = None
+            if speakers_future is not None:
+                speakers_data = speakers_future.result()
+                speakers_future = None
+
             if not transcription_data:
                 return None
             
             # Rozpoznawanie mówców (jeśli włączone)
-            speakers_data = None
             segments = transcription_data.get("segments", [])
             if self.enable_speaker_diarization:
-                if not self.use_simple_diarization:
-                    speakers_data = self.speaker_diarizer.diarize_speakers(audio_file_path)
+                if not self.use_simple_diarization and self.parallel_diarization == "off":
+                    speakers_data = self._diarize(audio_file_path, decoded_audio)
                 
                 # Jeśli zaawansowane rozpoznawanie nie działa, użyj prostego algorytmu
                 if not speakers_data:
@@ -139,117 +256,232 @@ class AudioProcessor:
         except Exception as e:
             logger.error(f"Błąd podczas transkrypcji z mówcami: {e}")
             return None
+        finally:
+            if speakers_future is not None:
+                try:
+                    speakers_future.result()
+                except Exception:
+                    pass
+
+    def _transcribe(
+        self,
+        audio_file_path: Path,
+        decoded_audio: Optional[DecodedAudio],
+        input_key: Optional[str] = None,
+    ) -> Optional[dict]:
+        """Transkrypcja z użyciem cache (klucz: skrót nagrania wejściowego + ustawienia modelu)"""
+        cache_key = None
+        if input_key is None and decoded_audio is not None:
+            input_key = decoded_audio.content_hash()
+        if self.transcription_cache is not None and input_key is not None:
+            cache_key = ResultCache.make_key(input_key, self.transcriber.settings_fingerprint())
+            cached = self.transcription_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Transkrypcja z cache (identyczne audio): {audio_file_path.name}")
+                return cached
+
+        pcm = decoded_audio.samples if decoded_audio is not None else None
+        transcription_data = self.transcription_batcher.transcribe(audio_file_path, audio=pcm)
+        if transcription_data and cache_key is not None:
+            self.transcription_cache.put(
+                cache_key,
+                {"text": transcription_data.get("text", ""), "segments": transcription_data.get("segments", [])},
+            )
+        return transcription_data
+
+    def _diarize(self, audio_file_path: Path, decoded_audio: Optional[DecodedAudio]):
+        """Rozpoznawanie mówców z uwzględnieniem limitu równoległości etapu"""
+        with self.stage_limiter.limit("diarize"):
+            return self.speaker_diarizer.diarize_speakers(audio_file_path, audio=decoded_audio)
+
+    def _get_diarization_executor(self) -> ThreadPoolExecutor:
+        with self._pipeline_lock:
+            if self._diarization_executor is None:
+                self._diarization_executor = ThreadPoolExecutor(
+                    max_workers=PIPELINE_AUDIO_WORKERS, thread_name_prefix="diarize"
+                )
+            return self._diarization_executor
     
     def process_audio_file(self, audio_file_path: Path, queue_item_id: Optional[str] = None, enable_preprocessing: bool = True) -> dict:
-        """Przetwarzanie pojedynczego pliku audio z pełnym pipeline"""
-        with self.semaphore:  # Ograniczenie liczby równoczesnych przetwarzań
-            result_summary: dict = {
-                "success": False,
-                "transcription_file": None,
-                "analysis_file": None,
-                "processed_audio": None,
-                "timestamp": None,
-            }
-            if self.processing_queue and queue_item_id:
-                self.processing_queue.mark_processing(queue_item_id)
-            try:
-                logger.info(f"Rozpoczęcie przetwarzania: {audio_file_path.name}")
-                
-                # Preprocessing audio (jeśli włączony)
-                original_file_path = audio_file_path
-                processed_file_path = None
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                
-                if enable_preprocessing and self.audio_preprocessor.enabled:
-                    logger.info("Wstępne przetwarzanie audio...")
-                    temp_processed = self.audio_preprocessor.process(audio_file_path)
-                    if temp_processed and temp_processed != audio_file_path:
-                        processed_file_path = temp_processed
-                        audio_file_path = temp_processed  # Używamy przetworzonego pliku do transkrypcji
-                        logger.info(f"Audio przetworzone: {processed_file_path.name}")
-                
-                # Kopiowanie oryginalnego pliku do processed
-                original_destination_name = f"{original_file_path.stem} {timestamp}{original_file_path.suffix}"
-                original_destination = self.processed_folder / original_destination_name
-                original_destination.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(str(original_file_path), str(original_destination))
-                logger.debug(f"Skopiowano oryginalny plik do: {original_destination_name}")
-                
-                # Transkrypcja z rozpoznawaniem mówców (na przetworzonym lub oryginalnym pliku)
-                transcription_data = self.transcribe_audio_with_speakers(audio_file_path)
-                if transcription_data:
-                    # Analiza treści za pomocą Ollama (jeśli włączona)
-                    analysis_results = None
-                    if self.enable_ollama_analysis:
-                        analysis_results = self.content_analyzer.analyze_transcription_content(transcription_data)
-                        logger.info(f"Analiza Ollama zakończona dla: {audio_file_path.name}")
-                    else:
-                        logger.info(f"Analiza Ollama wyłączona, pominięto analizę treści.")
-                    
-                    # Zapisanie wyników (używamy oryginalnej nazwy pliku)
-                    self.result_saver.save_transcription_with_speakers(
-                        original_file_path,
-                        transcription_data,
-                        analysis_results,
-                        timestamp=timestamp,
+        """Przetwarzanie pojedynczego pliku audio z pełnym pipeline (synchronicznie, etap po etapie)"""
+        job = ProcessingJob(
+            original_path=audio_file_path,
+            queue_item_id=queue_item_id,
+            enable_preprocessing=enable_preprocessing,
+        )
+        for stage in self._build_stages():
+            if stage.handler(job) is None:
+                break
+        return job.result_summary
+
+    def _build_stages(self) -> List[PipelineStage]:
+        """Etapy przetwarzania pliku: audio (preprocessing, transkrypcja, mówcy) → analiza → zapis"""
+        return [
+            PipelineStage("audio", self._stage_audio, PIPELINE_AUDIO_WORKERS, PIPELINE_STAGE_QUEUE_SIZE),
+            PipelineStage("analysis", self._stage_analysis, PIPELINE_ANALYSIS_WORKERS, PIPELINE_STAGE_QUEUE_SIZE),
+            PipelineStage("save", self._stage_save, PIPELINE_SAVE_WORKERS, PIPELINE_STAGE_QUEUE_SIZE),
+        ]
+
+    def _fail_job(self, job: ProcessingJob, message: str) -> None:
+        if self.processing_queue and job.queue_item_id:
+            self.processing_queue.mark_failed(job.queue_item_id, message)
+
+    def _stage_audio(self, job: ProcessingJob) -> Optional[ProcessingJob]:
+        """Etap 1: preprocessing, dekodowanie, transkrypcja i rozpoznawanie mówców"""
+        if self.processing_queue and job.queue_item_id:
+            self.processing_queue.mark_processing(job.queue_item_id)
+        decoded_audio: Optional[DecodedAudio] = None
+        original_file_path = job.original_path
+        audio_file_path = original_file_path
+        input_key: Optional[str] = None
+        # Zadania w tym etapie mogą jeszcze dołączyć do wsadu transkrypcji
+        with self._audio_jobs_lock:
+            self._audio_jobs += 1
+        try:
+            logger.info(f"Rozpoczęcie przetwarzania: {original_file_path.name}")
+            
+            # Preprocessing audio (jeśli włączony)
+            if job.enable_preprocessing and self.audio_preprocessor.enabled:
+                logger.info("Wstępne przetwarzanie audio...")
+                with self.stage_limiter.limit("preprocess"):
+                    temp_processed, decoded_audio, preprocessing = self.audio_preprocessor.process_with_report(
+                        audio_file_path
                     )
-                    transcription_filename = f"{original_file_path.stem} {timestamp}.txt"
-                    analysis_filename = f"{original_file_path.stem} ANALIZA {timestamp}.txt"
-                    
-                    # Przeniesienie przetworzonego pliku do folderu processed (jeśli istnieje)
-                    processed_destination_name = None
-                    if processed_file_path and processed_file_path.exists():
-                        processed_destination_name = f"{original_file_path.stem} processed {timestamp}{processed_file_path.suffix}"
-                        processed_destination = self.processed_folder / processed_destination_name
-                        processed_destination.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.move(str(processed_file_path), str(processed_destination))
-                        logger.debug(f"Przeniesiono przetworzony plik do: {processed_destination_name}")
-                    
-                    # Usunięcie oryginalnego pliku z input folderu (już skopiowany do processed)
-                    if original_file_path.exists() and original_file_path.parent == self.file_loader.input_folder:
-                        original_file_path.unlink()
-                        logger.debug(f"Usunięto oryginalny plik z folderu input: {original_file_path.name}")
-                    logger.success(
-                        "Przetwarzanie zakończone pomyślnie: %s (plik do: %s)",
-                        original_file_path.name,
-                        self.processed_folder,
+                job.result_summary["preprocessing"] = preprocessing
+                if not preprocessing.get("skipped") and preprocessing.get("input_hash"):
+                    # Wynik preprocessingu zależy od stanu cache profili szumu i planu etapów –
+                    # cache transkrypcji adresujemy oryginałem i ustawieniami preprocessingu
+                    input_key = ResultCache.make_key(
+                        preprocessing["input_hash"], self.audio_preprocessor.settings_fingerprint()
                     )
-                    result_summary.update(
-                        {
-                            "success": True,
-                            "timestamp": timestamp,
-                            "transcription_file": transcription_filename,
-                            "analysis_file": analysis_filename,
-                            "processed_audio": original_destination_name,
-                            "processed_audio_enhanced": processed_destination_name,
-                        }
+                if temp_processed and temp_processed != audio_file_path:
+                    job.processed_path = temp_processed
+                    audio_file_path = temp_processed  # Używamy przetworzonego pliku do transkrypcji
+                    logger.info(f"Audio przetworzone: {temp_processed.name}")
+            
+            # Jednorazowe dekodowanie do wspólnego bufora 16 kHz (jeśli preprocessing go nie dostarczył)
+            if decoded_audio is None:
+                decoded_audio = decode_audio_file(audio_file_path)
+            if decoded_audio is not None and self.processing_queue and job.queue_item_id:
+                self.processing_queue.update_duration(job.queue_item_id, decoded_audio.duration_seconds)
+            
+            # Kopiowanie oryginalnego pliku do processed
+            original_destination_name = f"{original_file_path.stem} {job.timestamp}{original_file_path.suffix}"
+            original_destination = self.processed_folder / original_destination_name
+            original_destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(str(original_file_path), str(original_destination))
+            job.original_destination_name = original_destination_name
+            logger.debug(f"Skopiowano oryginalny plik do: {original_destination_name}")
+            
+            # Transkrypcja z rozpoznawaniem mówców (na przetworzonym lub oryginalnym pliku)
+            job.transcription_data = self.transcribe_audio_with_speakers(audio_file_path, decoded_audio, input_key)
+            if not job.transcription_data:
+                logger.error(f"Nie udało się przetworzyć pliku: {audio_file_path.name}")
+                self._fail_job(job, "Nie udało się przetworzyć pliku – brak danych transkrypcji.")
+                return None
+            return job
+        
+        except Exception as e:
+            logger.error(f"Błąd podczas przetwarzania {audio_file_path.name}: {e}")
+            self._fail_job(job, str(e))
+            return None
+        finally:
+            with self._audio_jobs_lock:
+                self._audio_jobs -= 1
+            if decoded_audio is not None:
+                decoded_audio.close()
+
+    def _stage_analysis(self, job: ProcessingJob) -> Optional[ProcessingJob]:
+        """Etap 2: analiza treści za pomocą Ollama (jeśli włączona)"""
+        try:
+            if self.enable_ollama_analysis:
+                with self.stage_limiter.limit("analysis"):
+                    job.analysis_results = self.content_analyzer.analyze_transcription_content(
+                        job.transcription_data,
+                        speaker_turns=self.result_saver.build_speaker_turns(job.transcription_data),
                     )
-                    if self.processing_queue and queue_item_id:
-                        result_files = {
-                            "transcription": transcription_filename,
-                            "analysis": analysis_filename,
-                            "processed_audio": original_destination_name,
-                        }
-                        if processed_destination_name:
-                            result_files["processed_audio_enhanced"] = processed_destination_name
-                        self.processing_queue.mark_completed(
-                            queue_item_id,
-                            result_files,
-                        )
-                else:
-                    logger.error(f"Nie udało się przetworzyć pliku: {audio_file_path.name}")
-                    if self.processing_queue and queue_item_id:
-                        self.processing_queue.mark_failed(
-                            queue_item_id,
-                            "Nie udało się przetworzyć pliku – brak danych transkrypcji.",
-                        )
-                
-            except Exception as e:
-                logger.error(f"Błąd podczas przetwarzania {audio_file_path.name}: {e}")
-                if self.processing_queue and queue_item_id:
-                    self.processing_queue.mark_failed(queue_item_id, str(e))
-            finally:
-                return result_summary
+                logger.info(f"Analiza Ollama zakończona dla: {job.original_path.name}")
+            else:
+                logger.info(f"Analiza Ollama wyłączona, pominięto analizę treści.")
+            return job
+        except Exception as e:
+            logger.error(f"Błąd podczas analizy {job.original_path.name}: {e}")
+            self._fail_job(job, str(e))
+            return None
+
+    def _stage_save(self, job: ProcessingJob) -> None:
+        """Etap 3: zapis wyników i porządkowanie plików"""
+        original_file_path = job.original_path
+        timestamp = job.timestamp
+        try:
+            # Zapisanie wyników (używamy oryginalnej nazwy pliku)
+            self.result_saver.save_transcription_with_speakers(
+                original_file_path,
+                job.transcription_data,
+                job.analysis_results,
+                timestamp=timestamp,
+                preprocessing=job.result_summary.get("preprocessing"),
+            )
+            transcription_filename = f"{original_file_path.stem} {timestamp}.txt"
+            analysis_filename = f"{original_file_path.stem} ANALIZA {timestamp}.txt"
+            
+            # Przeniesienie przetworzonego pliku do folderu processed (jeśli istnieje)
+            processed_file_path = job.processed_path
+            processed_destination_name = None
+            if processed_file_path and processed_file_path.exists():
+                processed_destination_name = f"{original_file_path.stem} processed {timestamp}{processed_file_path.suffix}"
+                processed_destination = self.processed_folder / processed_destination_name
+                processed_destination.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(processed_file_path), str(processed_destination))
+                logger.debug(f"Przeniesiono przetworzony plik do: {processed_destination_name}")
+            
+            # Usunięcie oryginalnego pliku z input folderu (już skopiowany do processed)
+            if original_file_path.exists() and original_file_path.parent == self.file_loader.input_folder:
+                original_file_path.unlink()
+                logger.debug(f"Usunięto oryginalny plik z folderu input: {original_file_path.name}")
+            logger.success(
+                "Przetwarzanie zakończone pomyślnie: %s (plik do: %s)",
+                original_file_path.name,
+                self.processed_folder,
+            )
+            job.result_summary.update(
+                {
+                    "success": True,
+                    "timestamp": timestamp,
+                    "transcription_file": transcription_filename,
+                    "analysis_file": analysis_filename,
+                    "processed_audio": job.original_destination_name,
+                    "processed_audio_enhanced": processed_destination_name,
+                }
+            )
+            if self.processing_queue and job.queue_item_id:
+                result_files = {
+                    "transcription": transcription_filename,
+                    "analysis": analysis_filename,
+                    "processed_audio": job.original_destination_name,
+                }
+                if processed_destination_name:
+                    result_files["processed_audio_enhanced"] = processed_destination_name
+                self.processing_queue.mark_completed(
+                    job.queue_item_id,
+                    result_files,
+                    preprocessing=job.result_summary.get("preprocessing"),
+                )
+        except Exception as e:
+            logger.error(f"Błąd podczas zapisywania wyników {original_file_path.name}: {e}")
+            self._fail_job(job, str(e))
+        return None
+
+    @property
+    def transcriber(self) -> WhisperTranscriber:
+        return self._transcriber
+
+    @transcriber.setter
+    def transcriber(self, value: WhisperTranscriber) -> None:
+        self._transcriber = value
+        batcher = getattr(self, "transcription_batcher", None)
+        if batcher is not None:
+            batcher.transcriber = value
 
     @property
     def processed_folder(self) -> Path:
@@ -261,6 +493,29 @@ class AudioProcessor:
         new_path.mkdir(parents=True, exist_ok=True)
         self._processed_folder = new_path
     
+    @property
+    def pipeline(self) -> StagePipeline:
+        """Wieloetapowy pipeline z osobną kolejką i pulą wątków dla każdego etapu"""
+        with self._pipeline_lock:
+            if self._pipeline is None:
+                self._pipeline = StagePipeline(self._build_stages(), name="audio")
+            return self._pipeline
+
+    def submit_file(
+        self,
+        audio_file_path: Path,
+        queue_item_id: Optional[str] = None,
+        enable_preprocessing: bool = True,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """Dodanie pliku do pierwszego etapu pipeline (blokuje przy pełnej kolejce)"""
+        job = ProcessingJob(
+            original_path=audio_file_path,
+            queue_item_id=queue_item_id,
+            enable_preprocessing=enable_preprocessing,
+        )
+        return self.pipeline.submit(job, timeout=timeout)
+
     def process_all_files(self) -> None:
         """Przetwarzanie wszystkich obsługiwanych plików audio w folderze wejściowym."""
         try:
@@ -273,24 +528,36 @@ class AudioProcessor:
             
             logger.info("Znaleziono %d plików audio do przetworzenia", len(unprocessed_files))
             
-            # Przetwarzanie plików w puli wątków
-            threads = []
+            # Przekazanie plików do pipeline – przy pełnej kolejce dodawanie czeka,
+            # więc liczba wątków nie rośnie wraz z zaległościami
             for audio_file in unprocessed_files:
-                thread = threading.Thread(
-                    target=self.process_audio_file,
-                    args=(audio_file,)
-                )
-                threads.append(thread)
-                thread.start()
+                self.submit_file(audio_file)
             
-            # Oczekiwanie na zakończenie wszystkich wątków
-            for thread in threads:
-                thread.join()
+            # Oczekiwanie na przejście wszystkich plików przez wszystkie etapy
+            self.pipeline.wait_idle()
             
             logger.success("Przetwarzanie wszystkich plików zakończone")
             
         except Exception as e:
             logger.error(f"Błąd podczas przetwarzania plików: {e}")
+
+    def shutdown(self, drain: bool = True) -> None:
+        """Zatrzymanie pipeline (domyślnie po dokończeniu zadań z kolejek)"""
+        with self._pipeline_lock:
+            pipeline, self._pipeline = self._pipeline, None
+        if pipeline is not None:
+            pipeline.shutdown(drain=drain)
+        self.transcription_batcher.shutdown()
+        with self._pipeline_lock:
+            executor, self._diarization_executor = self._diarization_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if isinstance(self.speaker_diarizer, ProcessSpeakerDiarizer):
+            self.speaker_diarizer.shutdown()
+        if isinstance(self.transcriber, ProcessPoolTranscriber):
+            self.transcriber.shutdown()
+        self.content_analyzer.close()
+        close_http_session()
     
     def start_file_watcher(self) -> None:
         """Uruchomienie obserwatora folderu"""
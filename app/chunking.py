@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Moduł dzielenia długich nagrań na fragmenty
+===========================================
+
+Zawiera funkcje do:
+- Planowania podziału nagrania w pauzach wykrytych przez VAD
+- Twardego cięcia z zakładką, gdy w pobliżu nie ma pauzy
+- Sklejania segmentów z fragmentów z usuwaniem duplikatów na łączeniach
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .vad import SpeechTimeline, detect_speech
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AudioChunk:
+    """Fragment nagrania (w próbkach) z zakresem, z którego zachowujemy segmenty"""
+
+    index: int
+    start: int
+    end: int
+    # Segmenty, których środek wypada poza [keep_start, keep_end), należą do sąsiedniego fragmentu
+    keep_start: int
+    keep_end: int
+
+
+def _pause_midpoints(timeline: SpeechTimeline) -> np.ndarray:
+    """Środki przerw między regionami mowy (kandydaci na miejsca cięcia)"""
+    points: List[int] = []
+    previous_end = 0
+    for start, end in timeline.regions:
+        if start > previous_end:
+            points.append((previous_end + start) // 2)
+        previous_end = end
+    if previous_end < timeline.total_samples:
+        points.append((previous_end + timeline.total_samples) // 2)
+    return np.array(points, dtype=np.int64)
+
+
+def plan_chunks(
+    samples: np.ndarray,
+    sample_rate: int,
+    chunk_seconds: float,
+    overlap_seconds: float = 2.0,
+    timeline: Optional[SpeechTimeline] = None,
+) -> List[AudioChunk]:
+    """Podział nagrania na fragmenty około ``chunk_seconds`` cięte w pauzach
+
+    Miejsce cięcia wybierane jest spośród pauz w zakresie 50–125% docelowej
+    długości (najbliżej docelowej). Bez pauzy fragmenty tnie się na sztywno
+    z zakładką ``overlap_seconds`` po obu stronach łączenia.
+    """
+    total = len(samples)
+    target = max(1, int(chunk_seconds * sample_rate))
+    if total <= target + target // 4:
+        return [AudioChunk(0, 0, total, 0, total)]
+
+    if timeline is None:
+        timeline = detect_speech(samples, sample_rate)
+    pauses = _pause_midpoints(timeline)
+    overlap = int(overlap_seconds * sample_rate)
+
+    cuts: List[tuple] = []  # (miejsce cięcia, czy twarde)
+    position = 0
+    while total - position > target + target // 4:
+        ideal = position + target
+        candidates = pauses[(pauses >= position + target // 2) & (pauses <= position + target + target // 4)]
+        if len(candidates):
+            cut = int(candidates[np.argmin(np.abs(candidates - ideal))])
+            cuts.append((cut, False))
+        else:
+            cut = ideal
+            cuts.append((cut, True))
+        position = cut
+
+    chunks: List[AudioChunk] = []
+    boundaries = [(0, False)] + cuts + [(total, False)]
+    for index in range(len(boundaries) - 1):
+        keep_start, hard_start = boundaries[index]
+        keep_end, hard_end = boundaries[index + 1]
+        start = max(0, keep_start - overlap) if hard_start else keep_start
+        end = min(total, keep_end + overlap) if hard_end else keep_end
+        chunks.append(AudioChunk(index, start, end, keep_start, keep_end))
+
+    logger.info(
+        "Podział nagrania %.0f s na %d fragmentów (%d cięć w pauzach)",
+        total / sample_rate,
+        len(chunks),
+        sum(1 for _, hard in cuts if not hard),
+    )
+    return chunks
+
+
+def stitch_segments(
+    chunks: Sequence[AudioChunk],
+    chunk_segments: Sequence[List[Dict]],
+    sample_rate: int,
+) -> List[Dict]:
+    """Sklejenie segmentów z fragmentów w jedną listę z czasami całego nagrania
+
+    Z każdego fragmentu zostają segmenty, których środek leży w jego zakresie
+    ``keep``; segmenty z zakładki powtarzające tekst poprzedniego są pomijane.
+    """
+    stitched: List[Dict] = []
+    for chunk, segments in zip(chunks, chunk_segments):
+        offset = chunk.start / sample_rate
+        keep_start = chunk.keep_start / sample_rate
+        keep_end = chunk.keep_end / sample_rate
+        for segment in segments:
+            segment = dict(segment)
+            segment["start"] = segment.get("start", 0.0) + offset
+            segment["end"] = segment.get("end", 0.0) + offset
+            if segment.get("words"):
+                segment["words"] = [
+                    dict(word, start=word["start"] + offset, end=word["end"] + offset)
+                    for word in segment["words"]
+                ]
+            middle = (segment["start"] + segment["end"]) / 2
+            if not keep_start <= middle < keep_end and not (chunk is chunks[-1] and middle >= keep_end):
+                continue
+            if stitched:
+                previous = stitched[-1]
+                if (
+                    segment["start"] < previous["end"]
+                    and segment.get("text", "").strip() == previous.get("text", "").strip()
+                ):
+                    continue
+            segment["id"] = len(stitched)
+            stitched.append(segment)
+    return stitched
@@ -12,12 +12,16 @@ Zawiera funkcje do:
 
 import logging
 import sys
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 
 from .config import (
     OLLAMA_MODEL,
     OLLAMA_BASE_URL,
+    OLLAMA_BASE_URLS,
     CONTENT_ANALYSIS_TYPE,
+    MAX_TRANSCRIPT_LENGTH,
+    OLLAMA_ASYNC_ENABLED,
+    OLLAMA_CHUNKED_ANALYSIS,
     OLLAMA_PROMPTS,
 )
 from .reasoning_filter import ReasoningFilter
@@ -26,6 +30,7 @@ from .colored_logging import print_colored
 # Import OllamaAnalyzer
 try:
     from .ollama_analyzer import OllamaAnalyzer
+    from .async_ollama_analyzer import AsyncOllamaAnalyzer
     OLLAMA_AVAILABLE = True
 except ImportError:
     OLLAMA_AVAILABLE = False
@@ -40,6 +45,8 @@ class ContentAnalyzer:
         self.ollama_analyzer = None
         self.model = model
         self.base_url = base_url
+        # Lista węzłów z konfiguracji dotyczy tylko domyślnego adresu
+        self.endpoints = OLLAMA_BASE_URLS if base_url == OLLAMA_BASE_URL else [base_url]
         self.initialized = False
         self.reasoning_filter = ReasoningFilter()
         logger.info("ContentAnalyzer zainicjalizowany")
@@ -51,9 +58,13 @@ class ContentAnalyzer:
             return False
         
         try:
-            self.ollama_analyzer = OllamaAnalyzer(base_url=self.base_url, model=self.model)
+            analyzer_class = AsyncOllamaAnalyzer if OLLAMA_ASYNC_ENABLED else OllamaAnalyzer
+            self.ollama_analyzer = analyzer_class(
+                base_url=self.base_url, model=self.model, endpoints=self.endpoints
+            )
             if self.ollama_analyzer.test_connection():
                 logger.info(f"Analiza Ollama zainicjalizowana z modelem: {self.model}")
+                self.ollama_analyzer.endpoint_pool.start_health_checks()
                 self.initialized = True
                 return True
             else:
@@ -86,8 +97,14 @@ class ContentAnalyzer:
             logger.error(f"Błąd podczas inicjalizacji Ollama: {e}")
             return False
     
-    def analyze_transcription_content(self, transcription_data: Dict) -> Dict[str, Any]:
-        """Kompleksowa analiza treści transkrypcji z analizą wzorców mówców i sentymentu"""
+    def analyze_transcription_content(
+        self, transcription_data: Dict, speaker_turns: Optional[List[Dict]] = None
+    ) -> Dict[str, Any]:
+        """Kompleksowa analiza treści transkrypcji z analizą wzorców mówców i sentymentu
+
+        Transkrypt dłuższy niż MAX_TRANSCRIPT_LENGTH analizowany jest fragmentami
+        ciętymi na granicach wypowiedzi ``speaker_turns`` (map-reduce).
+        """
         if not self.initialized or not self.ollama_analyzer:
             return {"error": "Analiza Ollama nie jest dostępna"}
         
@@ -99,9 +116,18 @@ class ContentAnalyzer:
             
             # Analiza treści rozmowy (z wyborem typu z konfiguracji)
             logger.info(f"Rozpoczęcie analizy treści przez Ollama (typ: {CONTENT_ANALYSIS_TYPE})...")
-            content_analysis = self.ollama_analyzer.analyze_content(
-                text, CONTENT_ANALYSIS_TYPE
-            )
+            if OLLAMA_CHUNKED_ANALYSIS and len(text) > MAX_TRANSCRIPT_LENGTH:
+                if speaker_turns:
+                    turns = [f"{turn['speaker']}: {turn['text']}" for turn in speaker_turns if turn.get("text")]
+                else:
+                    turns = [text]
+                content_analysis = self.ollama_analyzer.analyze_long_content(
+                    turns, CONTENT_ANALYSIS_TYPE
+                )
+            else:
+                content_analysis = self.ollama_analyzer.analyze_content(
+                    text, CONTENT_ANALYSIS_TYPE
+                )
             if not content_analysis.get("success"):
                 logger.warning(
                     "Analiza treści nie powiodła się: %s",
@@ -135,6 +161,11 @@ class ContentAnalyzer:
             logger.error(f"Błąd podczas analizy treści: {e}")
             return {"error": str(e)}
     
+    def close(self) -> None:
+        """Zamknięcie klienta Ollama (sprawdzanie węzłów, pętla klienta asynchronicznego)"""
+        if self.ollama_analyzer is not None:
+            self.ollama_analyzer.close()
+    
     def is_available(self) -> bool:
         """Sprawdzenie czy analiza Ollama jest dostępna"""
         return self.initialized and OLLAMA_AVAILABLE 
\ No newline at end of file
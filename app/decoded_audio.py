@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Moduł ze wspólnym buforem zdekodowanego audio
+=============================================
+
+Zawiera funkcje do:
+- Jednorazowego dekodowania nagrania do PCM float32 (16 kHz, mono)
+- Mapowania dużych buforów na plik tymczasowy (np.memmap)
+- Przekazywania tego samego bufora do Whisper i pyannote
+- Udostępniania bufora innym procesom przez pamięć współdzieloną
+"""
+
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from .config import DECODED_AUDIO_MMAP_THRESHOLD_MB, DECODED_AUDIO_SPILL_DIR
+
+logger = logging.getLogger(__name__)
+
+# Częstotliwość próbkowania oczekiwana przez Whisper i pyannote
+TARGET_SAMPLE_RATE = 16000
+
+
+def pcm_hash(samples: np.ndarray) -> str:
+    """Skrót treści bufora PCM (niezależny od nazwy i formatu pliku źródłowego)"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(np.ascontiguousarray(samples, dtype=np.float32).data)
+    return digest.hexdigest()
+
+
+def spill_directory() -> Path:
+    """Katalog aplikacji (0700) na pliki tymczasowe z surowym PCM – zamiast systemowego /tmp"""
+    DECODED_AUDIO_SPILL_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    os.chmod(DECODED_AUDIO_SPILL_DIR, 0o700)
+    return DECODED_AUDIO_SPILL_DIR
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class DecodedAudio:
+    """Bufor PCM float32 16 kHz mono współdzielony przez wszystkie etapy zadania"""
+
+    def __init__(
+        self,
+        samples: np.ndarray,
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        source_path: Optional[Path] = None,
+        mmap_threshold_mb: float = DECODED_AUDIO_MMAP_THRESHOLD_MB,
+    ):
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim != 1:
+            raise ValueError("DecodedAudio oczekuje sygnału mono (tablica 1D)")
+
+        self.sample_rate = sample_rate
+        self.source_path = Path(source_path) if source_path else None
+        self._mmap_path: Optional[str] = None
+        self._finalizer = None
+        self._content_hash: Optional[str] = None
+
+        if mmap_threshold_mb > 0 and samples.nbytes > mmap_threshold_mb * 1024 * 1024:
+            samples = self._spill_to_memmap(samples)
+        self.samples: np.ndarray = np.ascontiguousarray(samples)
+
+    @classmethod
+    def from_file(cls, audio_file_path: Path, **kwargs) -> "DecodedAudio":
+        """Dekoduje plik tym samym dekoderem co Whisper (ffmpeg, 16 kHz mono)"""
+        import whisper
+
+        samples = whisper.load_audio(str(audio_file_path))
+        return cls(samples, TARGET_SAMPLE_RATE, source_path=audio_file_path, **kwargs)
+
+    @classmethod
+    def from_array(
+        cls,
+        samples: np.ndarray,
+        sample_rate: int,
+        source_path: Optional[Path] = None,
+        **kwargs,
+    ) -> "DecodedAudio":
+        """Tworzy bufor z sygnału w pamięci (z downmiksem i resamplingiem do 16 kHz)"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=0)
+        if sample_rate != TARGET_SAMPLE_RATE:
+            import librosa
+
+            samples = librosa.resample(
+                samples, orig_sr=sample_rate, target_sr=TARGET_SAMPLE_RATE
+            ).astype(np.float32, copy=False)
+        return cls(samples, TARGET_SAMPLE_RATE, source_path=source_path, **kwargs)
+
+    def _spill_to_memmap(self, samples: np.ndarray) -> np.ndarray:
+        """Przenosi bufor do pliku tymczasowego (0600, katalog DECODED_AUDIO_SPILL_DIR) i zwraca widok np.memmap"""
+        fd, path = tempfile.mkstemp(prefix="decoded_audio_", suffix=".f32", dir=spill_directory())
+        os.close(fd)
+        mapped = np.memmap(path, dtype=np.float32, mode="w+", shape=samples.shape)
+        mapped[:] = samples
+        mapped.flush()
+        self._mmap_path = path
+        self._finalizer = weakref.finalize(self, _remove_file, path)
+        logger.debug(
+            "Bufor audio (%.1f MB) zmapowany do pliku tymczasowego",
+            samples.nbytes / (1024 * 1024),
+        )
+        return mapped
+
+    @property
+    def is_memory_mapped(self) -> bool:
+        return self._mmap_path is not None
+
+    @property
+    def num_samples(self) -> int:
+        return int(self.samples.shape[0])
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.num_samples / float(self.sample_rate)
+
+    def content_hash(self) -> str:
+        """Skrót PCM (obliczany raz) – klucz dla checkpointów i cache wyników"""
+        if self._content_hash is None:
+            self._content_hash = pcm_hash(self.samples)
+        return self._content_hash
+
+    def as_pyannote_input(self) -> Dict[str, Any]:
+        """Słownik {"waveform", "sample_rate"} akceptowany przez pipeline pyannote"""
+        import torch
+
+        waveform = torch.from_numpy(self.samples).unsqueeze(0)
+        return {"waveform": waveform, "sample_rate": self.sample_rate}
+
+    def close(self) -> None:
+        """Zwalnia bufor i usuwa ewentualny plik memmap"""
+        self.samples = np.zeros(0, dtype=np.float32)
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._mmap_path = None
+
+    def __enter__(self) -> "DecodedAudio":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def decode_audio_file(audio_file_path: Union[str, Path]) -> Optional[DecodedAudio]:
+    """Dekoduje plik do DecodedAudio; zwraca None jeśli dekodowanie się nie powiodło"""
+    path = Path(audio_file_path)
+    try:
+        return DecodedAudio.from_file(path)
+    except Exception as e:
+        logger.warning(f"Nie udało się zdekodować audio {path.name} do pamięci: {e}")
+        return None
+
+
+_ATTACH_LOCK = threading.Lock()
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """Podłączenie do istniejącego segmentu bez rejestracji w resource_tracker
+
+    Segment należy do procesu, który go utworzył. Przed Pythonem 3.13 każde podłączenie
+    rejestruje segment w trackerze, który po zakończeniu procesu roboczego zgłasza
+    "wyciek" i usuwa segment wciąż używany przez właściciela.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    if os.name != "posix":
+        # Poza POSIX segmenty nie są rejestrowane w trackerze
+        return shared_memory.SharedMemory(name=name)
+    with _ATTACH_LOCK:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+@dataclass(frozen=True)
+class SharedAudioHandle:
+    """Opis bufora PCM w pamięci współdzielonej (przekazywany do procesu roboczego)"""
+
+    name: str
+    num_samples: int
+    sample_rate: int
+
+    def attach(self) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+        """Podłącza się do bufora bez kopiowania; wywołujący zamyka zwrócony segment (bez usuwania)"""
+        shm = _attach_untracked(self.name)
+        samples = np.ndarray((self.num_samples,), dtype=np.float32, buffer=shm.buf)
+        return shm, samples
+
+
+@contextmanager
+def shared_audio(
+    audio: Union[DecodedAudio, np.ndarray], sample_rate: int = TARGET_SAMPLE_RATE
+) -> Iterator[SharedAudioHandle]:
+    """Kopiuje bufor (DecodedAudio lub tablicę PCM) do pamięci współdzielonej na czas trwania bloku"""
+    if isinstance(audio, DecodedAudio):
+        samples, sample_rate = audio.samples, audio.sample_rate
+    else:
+        samples = np.asarray(audio, dtype=np.float32)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, samples.nbytes))
+    try:
+        view = np.ndarray(samples.shape, dtype=np.float32, buffer=shm.buf)
+        view[:] = samples
+        del view
+        yield SharedAudioHandle(shm.name, int(samples.shape[0]), sample_rate)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def release_shared_segment(shm: shared_memory.SharedMemory) -> None:
+    """Zamyka podłączony segment (ignoruje bufory wciąż używane przez inne obiekty)"""
+    try:
+        shm.close()
+    except BufferError:
+        logger.debug("Segment pamięci współdzielonej %s wciąż w użyciu", shm.name)
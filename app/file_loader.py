@@ -13,7 +13,6 @@ Zawiera funkcje do:
 import os
 import logging
 import time
-import threading
 from pathlib import Path
 from typing import Iterable, List, Optional, Union
 from watchdog.observers import Observer
@@ -99,7 +98,9 @@ class AudioFileLoader:
 
         W aktualnym podejściu zawsze zwracamy wszystkie pliki znajdujące się w folderze
         wejściowym – nawet jeśli wcześniej istniały już wyniki dla tej samej nazwy.
-        Dzięki temu użytkownik może świadomie ponownie przetworzyć plik.
+        Dzięki temu użytkownik może świadomie ponownie przetworzyć plik. Transkrypcja
+        identycznego audio jest wtedy pobierana z cache (TRANSCRIPTION_CACHE_ENABLED),
+        więc ponowne przetworzenie kosztuje głównie analizę Ollama.
         """
         audio_files = self.get_audio_files()
         logger.info(
@@ -125,10 +126,8 @@ class FileWatcher(FileSystemEventHandler):
                 # Krótkie opóźnienie aby plik został w pełni zapisany
                 time.sleep(1)
                 if AudioFileValidator.is_valid_audio_file(file_path):
-                    threading.Thread(
-                        target=self.processor.process_audio_file,
-                        args=(file_path,),
-                    ).start()
+                    # Przekazanie do puli roboczej procesora (bez tworzenia wątku na plik)
+                    self.processor.submit_file(file_path)
                 else:
                     logger.warning("Pominięto niepoprawny plik audio: %s", file_path.name)
             else:
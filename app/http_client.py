@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Moduł ze wspólną sesją HTTP
+===========================
+
+Zawiera:
+- Jedną sesję requests (keep-alive) współdzieloną przez cały ruch do Ollama
+- Pulę połączeń dopasowaną do liczby zapytań analizy w locie (wątki × fragmenty)
+- Zamykanie sesji przy zatrzymaniu aplikacji
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import OLLAMA_HTTP_POOL_CONNECTIONS, OLLAMA_HTTP_POOL_MAXSIZE
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=OLLAMA_HTTP_POOL_CONNECTIONS,
+        pool_maxsize=OLLAMA_HTTP_POOL_MAXSIZE,
+        # Nadmiarowe wątki czekają na wolne połączenie zamiast otwierać nowe
+        pool_block=True,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    logger.debug(
+        "Sesja HTTP utworzona (hosty: %d, połączenia na host: %d)",
+        OLLAMA_HTTP_POOL_CONNECTIONS,
+        OLLAMA_HTTP_POOL_MAXSIZE,
+    )
+    return session
+
+
+def get_session() -> requests.Session:
+    """Wspólna sesja HTTP z pulą połączeń keep-alive (tworzona przy pierwszym użyciu)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _create_session()
+        return _session
+
+
+def close_session() -> None:
+    """Zamknięcie wspólnej sesji i jej połączeń"""
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
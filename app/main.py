@@ -85,8 +85,8 @@ def main():
         if ENABLE_OLLAMA_ANALYSIS:
             if not processor.content_analyzer or not processor.content_analyzer.initialized:
                 try:
-                    import requests
-                    response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
+                    from .http_client import get_session
+                    response = get_session().get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
                     if response.status_code == 200:
                         models = response.json().get("models", [])
                         available_models = [model["name"] for model in models]
@@ -113,6 +113,7 @@ def main():
         run_once = os.getenv("APP_RUN_ONCE", "false").lower() == "true"
         if run_once:
             logger.success("Tryb jednorazowy aktywny (APP_RUN_ONCE=1) – kończę po pierwszym przebiegu.")
+            processor.shutdown()
             return
         
         # Uruchomienie obserwatora folderu
@@ -130,6 +131,7 @@ def main():
         except KeyboardInterrupt:
             logger.info("Otrzymano sygnał zatrzymania...")
             processor.stop_file_watcher()
+            processor.shutdown()
             logger.success("Aplikacja zatrzymana")
         
     except Exception as e:
@@ -64,8 +64,8 @@ def check_pyannote_model(model_name: str, cache_dir: Path) -> Tuple[bool, str]:
 def check_ollama_model(model_name: str, base_url: str) -> Tuple[bool, str]:
     """Sprawdzenie czy model Ollama jest dostępny na serwerze"""
     try:
-        import requests
-        response = requests.get(f"{base_url}/api/tags", timeout=5)
+        from .http_client import get_session
+        response = get_session().get(f"{base_url}/api/tags", timeout=5)
         if response.status_code == 200:
             models = response.json().get("models", [])
             available_models = [model["name"] for model in models]
@@ -5,20 +5,102 @@ Moduł do integracji z Ollama dla analizy treści
 
 import json
 import logging
+import math
 import re
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
 
+from .http_client import get_session
+from .ollama_endpoints import EndpointPool, OllamaEndpoint
+from .result_cache import ResultCache
+from .streaming_json import StreamingJsonTracker
+from .token_budget import TokenBudget
+
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class _AnalysisRequest:
+    """Przygotowane zapytanie analizy (prompt, metadane bezpieczeństwa, klucz cache)"""
+
+    request_id: str
+    analysis_type: str
+    sanitized_text: str
+    injection_matches: List[str]
+    prompt: str
+    payload_preview: str
+    generation_params: Dict[str, Any]
+    # Stała część instrukcji wysyłana w polu "system" (wspólny początek w cache KV Ollama)
+    system: str = ""
+    cache_key: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+
+
+def split_transcript(turns: List[str], max_chars: int) -> List[str]:
+    """Łączy kolejne wypowiedzi w fragmenty do ``max_chars`` znaków, tnąc tylko między nimi
+
+    Wypowiedź dłuższa niż limit dzielona jest na zdaniach, a w ostateczności na słowach.
+    """
+    units: List[str] = []
+    for turn in turns:
+        turn = turn.strip()
+        if not turn:
+            continue
+        if len(turn) <= max_chars:
+            units.append(turn)
+            continue
+        for sentence in re.split(r"(?<=[.!?…])\s+", turn):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                units.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if sentence:
+                units.append(sentence)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_length = 0
+    for unit in units:
+        added = len(unit) + (1 if current else 0)
+        if current and current_length + added > max_chars:
+            chunks.append("\n".join(current))
+            current, current_length = [], 0
+            added = len(unit)
+        current.append(unit)
+        current_length += added
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _shrink_value(value: Any, text_limit: int, list_limit: int) -> Any:
+    """Skraca teksty do ``text_limit`` znaków i listy do ``list_limit`` elementów (rekurencyjnie)"""
+    if isinstance(value, dict):
+        return {key: _shrink_value(item, text_limit, list_limit) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shrink_value(item, text_limit, list_limit) for item in value[:list_limit]]
+    if isinstance(value, str) and len(value) > text_limit:
+        return value[:text_limit].rstrip() + "…"
+    return value
+
+
 class OllamaAnalyzer:
     """Klasa do analizy treści za pomocą Ollama"""
     
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "gemma3:12b"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = "gemma3:12b",
+        cache: Optional[ResultCache] = None,
+        endpoints: Optional[List[str]] = None,
+    ):
         self.base_url = base_url
         self.model = model
         self.api_url = f"{base_url}/api/generate"
@@ -32,6 +114,22 @@ class OllamaAnalyzer:
             OLLAMA_STREAM_RESPONSES,
             OLLAMA_PROMPT_LOG_MAX_CHARS,
             OLLAMA_STREAM_LOG_CHUNK_LIMIT,
+            OLLAMA_STREAM_STOP_ON_JSON,
+            OLLAMA_CHARS_PER_TOKEN,
+            OLLAMA_MAX_NUM_CTX,
+            OLLAMA_MIN_NUM_CTX,
+            OLLAMA_NUM_CTX_AUTO,
+            OLLAMA_NUM_PREDICT,
+            OLLAMA_RESPONSE_TOKENS,
+            OLLAMA_TOKENIZE_API,
+            OLLAMA_KEEP_ALIVE,
+            OLLAMA_ANALYSIS_CACHE_ENABLED,
+            OLLAMA_ANALYSIS_CACHE_DIR,
+            OLLAMA_ANALYSIS_CACHE_MAX_ENTRIES,
+            OLLAMA_ANALYSIS_CACHE_MAX_MB,
+            OLLAMA_ANALYSIS_CACHE_TTL_HOURS,
+            OLLAMA_FAILOVER_ATTEMPTS,
+            OLLAMA_HEALTH_CHECK_INTERVAL,
         )
 
         self.connect_timeout = OLLAMA_CONNECT_TIMEOUT
@@ -40,10 +138,42 @@ class OllamaAnalyzer:
         self.stream_responses = OLLAMA_STREAM_RESPONSES
         self.prompt_log_max_chars = OLLAMA_PROMPT_LOG_MAX_CHARS
         self.stream_log_chunk_limit = OLLAMA_STREAM_LOG_CHUNK_LIMIT
+        self.stream_stop_on_json = OLLAMA_STREAM_STOP_ON_JSON
+        self.keep_alive = OLLAMA_KEEP_ALIVE
         self.payload_preview_max_lines = 40
+        if cache is None and OLLAMA_ANALYSIS_CACHE_ENABLED:
+            cache = ResultCache(
+                OLLAMA_ANALYSIS_CACHE_DIR,
+                max_entries=OLLAMA_ANALYSIS_CACHE_MAX_ENTRIES,
+                max_bytes=int(OLLAMA_ANALYSIS_CACHE_MAX_MB * 1024 * 1024),
+                ttl_seconds=OLLAMA_ANALYSIS_CACHE_TTL_HOURS * 3600,
+                name="cache analiz Ollama",
+            )
+        self.cache = cache
+        self.endpoint_pool = EndpointPool(
+            endpoints or [base_url],
+            probe=self._probe_endpoint,
+            health_check_interval=OLLAMA_HEALTH_CHECK_INTERVAL,
+        )
+        self.failover_attempts = max(1, min(OLLAMA_FAILOVER_ATTEMPTS, len(self.endpoint_pool)))
+        self.token_budget: Optional[TokenBudget] = None
+        if OLLAMA_NUM_CTX_AUTO:
+            self.token_budget = TokenBudget(
+                tokenize=self._tokenize_remote if OLLAMA_TOKENIZE_API else None,
+                chars_per_token=OLLAMA_CHARS_PER_TOKEN,
+                min_context=OLLAMA_MIN_NUM_CTX,
+                max_context=OLLAMA_MAX_NUM_CTX,
+                response_tokens=OLLAMA_NUM_PREDICT if OLLAMA_NUM_PREDICT > 0 else OLLAMA_RESPONSE_TOKENS,
+            )
         
         logger.info(f"OllamaAnalyzer zainicjalizowany z modelem: {model}")
-        logger.info(f"API URL: {self.api_url}")
+        if len(self.endpoint_pool) > 1:
+            logger.info(
+                "Węzły Ollama: %s",
+                ", ".join(endpoint.url for endpoint in self.endpoint_pool.endpoints),
+            )
+        else:
+            logger.info(f"API URL: {self.api_url}")
 
     @staticmethod
     def _truncate_for_log(text: str, limit: int) -> str:
@@ -79,284 +209,700 @@ class OllamaAnalyzer:
             preview,
         )
 
-    def _collect_streaming_response(
-        self, response: requests.Response, request_id: str
-    ) -> Tuple[Dict[str, Any], str]:
-        chunks: List[str] = []
-        final_payload: Dict[str, Any] = {}
+    def _consume_stream_line(
+        self, line: str, idx: int, request_id: str, chunks: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Przetwarza jedną linię strumienia NDJSON; zwraca jej dane lub None"""
+        if not line:
+            return None
 
-        for idx, line in enumerate(response.iter_lines(decode_unicode=True), start=1):
-            if not line:
-                continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            self._emit_debug(
+                request_id,
+                "Chunk %d could not be parsed as JSON: %s",
+                idx,
+                line,
+            )
+            return None
 
-            try:
-                data = json.loads(line)
-            except json.JSONDecodeError:
+        chunk_text = data.get("response", "")
+        if chunk_text:
+            chunks.append(chunk_text)
+            if self.stream_log_chunk_limit:
+                preview = self._truncate_for_log(chunk_text, self.stream_log_chunk_limit)
                 self._emit_debug(
                     request_id,
-                    "Chunk %d could not be parsed as JSON: %s",
+                    "Chunk %d received (%d chars): %s",
                     idx,
-                    line,
+                    len(chunk_text),
+                    preview,
                 )
-                continue
+        return data
 
-            chunk_text = data.get("response", "")
-            if chunk_text:
-                chunks.append(chunk_text)
-                if self.stream_log_chunk_limit:
-                    preview = self._truncate_for_log(chunk_text, self.stream_log_chunk_limit)
-                    self._emit_debug(
-                        request_id,
-                        "Chunk %d received (%d chars): %s",
-                        idx,
-                        len(chunk_text),
-                        preview,
-                    )
+    def _create_stream_tracker(self) -> Optional[StreamingJsonTracker]:
+        if not self.stream_stop_on_json:
+            return None
+        from .config import REASONING_TAGS
 
-            final_payload = data
-            if data.get("done"):
-                break
+        return StreamingJsonTracker(REASONING_TAGS)
 
-        aggregated = "".join(chunks).strip()
+    def _stream_complete(
+        self, tracker: Optional[StreamingJsonTracker], data: Dict[str, Any], idx: int, request_id: str
+    ) -> bool:
+        """Czy zakończyć odbiór: koniec generowania lub kompletny obiekt JSON w odpowiedzi"""
+        if data.get("done"):
+            return True
+        if tracker is not None and tracker.feed(data.get("response", "")):
+            # Przerwany strumień nie ma końcowego fragmentu z prompt_eval_count –
+            # kalibracja i log prefill korzystają tylko ze strumieni zakończonych przez Ollama
+            data["done_reason"] = "json_complete"
+            self._emit_debug(
+                request_id,
+                "Complete JSON object after %d chunks – closing stream",
+                idx,
+            )
+            return True
+        return False
+
+    @staticmethod
+    def _finish_stream(
+        chunks: List[str],
+        final_payload: Dict[str, Any],
+        tracker: Optional[StreamingJsonTracker] = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        aggregated = "".join(chunks)
+        if tracker is not None and tracker.complete:
+            # Tekst po zamknięciu obiektu JSON (w tym samym fragmencie) jest pomijany
+            aggregated = aggregated[: tracker.end]
+        aggregated = aggregated.strip()
         if final_payload:
             final_payload["response"] = aggregated
         else:
             final_payload = {"response": aggregated, "done": True}
-
         return final_payload, aggregated
+
+    def _collect_streaming_response(
+        self, response: requests.Response, request_id: str
+    ) -> Tuple[Dict[str, Any], str]:
+        chunks: List[str] = []
+        final_payload: Dict[str, Any] = {}
+        tracker = self._create_stream_tracker()
+
+        for idx, line in enumerate(response.iter_lines(decode_unicode=True), start=1):
+            data = self._consume_stream_line(line, idx, request_id, chunks)
+            if data is None:
+                continue
+            final_payload = data
+            # Po przerwaniu pętli wywołujący zamyka odpowiedź, co przerywa generowanie w Ollama
+            if self._stream_complete(tracker, data, idx, request_id):
+                break
+
+        return self._finish_stream(chunks, final_payload, tracker)
     
     def test_connection(self) -> bool:
-        """Test połączenia z serwerem Ollama"""
+        """Test połączenia z serwerami Ollama (wystarczy jeden węzeł z modelem)"""
+        connected = False
+        errors: List[str] = []
+        available_models: List[str] = []
+        for endpoint in self.endpoint_pool.endpoints:
+            healthy, error, models = self._check_endpoint(endpoint.url)
+            self.endpoint_pool.set_health(endpoint, healthy)
+            available_models.extend(name for name in models if name not in available_models)
+            if healthy:
+                connected = True
+            elif error:
+                errors.append(error)
+        self.last_available_models = available_models
+        self.last_connection_error = None if connected else (errors[0] if errors else "exception")
+        return connected
+
+    def _check_endpoint(self, base_url: str) -> Tuple[bool, Optional[str], List[str]]:
+        """Sprawdzenie węzła przez /api/tags: (czy dostępny z modelem, kod błędu, modele)"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=10)
+            response = get_session().get(f"{base_url}/api/tags", timeout=10)
             if response.status_code == 200:
                 models = response.json().get("models", [])
                 available_models = [model["name"] for model in models]
-                logger.info(f"Dostępne modele Ollama: {available_models}")
-                self.last_available_models = available_models
+                logger.info(f"Dostępne modele Ollama ({base_url}): {available_models}")
                 
                 if self.model in available_models:
                     logger.info(f"Model {self.model} jest dostępny")
-                    self.last_connection_error = None
-                    return True
+                    return True, None, available_models
                 else:
                     logger.warning(f"Model {self.model} nie jest dostępny. Dostępne: {available_models}")
-                    self.last_connection_error = "model_not_found"
-                    return False
+                    return False, "model_not_found", available_models
             else:
-                logger.error(f"Błąd połączenia z Ollama: {response.status_code}")
-                self.last_connection_error = f"http_{response.status_code}"
-                return False
+                logger.error(f"Błąd połączenia z Ollama ({base_url}): {response.status_code}")
+                return False, f"http_{response.status_code}", []
         except Exception as e:
-            logger.error(f"Błąd podczas testowania połączenia z Ollama: {e}")
-            self.last_connection_error = "exception"
-            return False
+            logger.error(f"Błąd podczas testowania połączenia z Ollama ({base_url}): {e}")
+            return False, "exception", []
+
+    def _probe_endpoint(self, base_url: str) -> bool:
+        return self._check_endpoint(base_url)[0]
+
+    def close(self) -> None:
+        """Zatrzymanie sprawdzania węzłów w tle"""
+        self.endpoint_pool.stop_health_checks()
     
-    def analyze_content(self, text: str, analysis_type: str = "general") -> Dict[str, Any]:
+    def analyze_content(
+        self,
+        text: str,
+        analysis_type: str = "general",
+        use_cache: bool = True,
+        template: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         Analiza treści za pomocą Ollama
         
         Args:
             text: Tekst do analizy
             analysis_type: Typ analizy ("general", "sentiment", "content_quality", "call_center", "custom")
+            use_cache: False wymusza zapytanie do Ollama z pominięciem cache analiz
+            template: Własny szablon promptu z {text} (fragmenty i łączenie analizy map-reduce)
         
         Returns:
             Słownik z wynikami analizy
         """
+        request: Optional[_AnalysisRequest] = None
         try:
-            # Import konfiguracji
-            from .config import (
-                MAX_TRANSCRIPT_LENGTH,
-                OLLAMA_GENERATION_PARAMS,
-                OLLAMA_PROMPTS,
-                OLLAMA_SYSTEM_PROMPT,
-                PROMPT_INJECTION_PATTERNS,
+            request, cached = self._prepare_request(text, analysis_type, use_cache, template)
+            if cached is not None:
+                return cached
+            return self._execute_request(request, self.stream_responses)
+        except Exception as e:
+            return self._exception_result(request, analysis_type, e)
+
+    def analyze_long_content(
+        self, turns: List[str], analysis_type: str = "general", use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Analiza map-reduce transkryptu dłuższego niż MAX_TRANSCRIPT_LENGTH
+        
+        Args:
+            turns: Kolejne wypowiedzi ("MÓWCA: tekst") – fragmenty cięte są na ich granicach
+            analysis_type: Typ analizy; wynik końcowy ma schemat tego typu
+            use_cache: False wymusza zapytania do Ollama z pominięciem cache analiz
+        
+        Returns:
+            Słownik z wynikami analizy (jak analyze_content) z liczbą fragmentów
+        """
+        from .config import (
+            OLLAMA_CHUNK_MAX_CHARS,
+            OLLAMA_CHUNK_PROMPT_HEADER,
+            OLLAMA_PROMPTS,
+            OLLAMA_REDUCE_PROMPT,
+        )
+
+        chunks = split_transcript(turns, OLLAMA_CHUNK_MAX_CHARS)
+        if len(chunks) <= 1:
+            return self.analyze_content("\n".join(chunks), analysis_type, use_cache)
+
+        logger.info(f"Analiza fragmentami: {len(chunks)} fragmentów (typ: {analysis_type})")
+        user_template = self._user_template(analysis_type, OLLAMA_PROMPTS)
+        partials = self._analyze_many([
+            (
+                chunk,
+                analysis_type,
+                use_cache,
+                # Numer fragmentu za stałymi instrukcjami – wspólny początek promptu zostaje w cache KV
+                user_template
+                + OLLAMA_CHUNK_PROMPT_HEADER.replace("{part}", str(index)).replace("{parts}", str(len(chunks))),
+            )
+            for index, chunk in enumerate(chunks, start=1)
+        ])
+        usable = [partial for partial in partials if self._has_usable_json(partial)]
+        if not usable:
+            result = dict(partials[0])
+        else:
+            if len(usable) < len(partials):
+                logger.warning(
+                    "Analiza fragmentami: %d z %d fragmentów bez poprawnego wyniku",
+                    len(partials) - len(usable),
+                    len(partials),
+                )
+            result = self._reduce_partials(
+                [partial["parsed_result"] for partial in usable],
+                analysis_type,
+                use_cache,
+                OLLAMA_REDUCE_PROMPT,
+                OLLAMA_CHUNK_MAX_CHARS,
             )
 
-            sanitized_text = self._sanitize_transcript(text, MAX_TRANSCRIPT_LENGTH)
-            injection_matches = self._detect_prompt_injection(
-                sanitized_text, PROMPT_INJECTION_PATTERNS
+        # Sygnały prompt injection z fragmentów przenoszone na wynik końcowy
+        matches = sorted(
+            {match for partial in partials for match in partial.get("injection_matches", [])}
+            | set(result.get("injection_matches", []))
+        )
+        if matches:
+            result["injection_detected"] = True
+            result["injection_matches"] = matches
+            if isinstance(result.get("parsed_result"), dict):
+                result["parsed_result"]["integrity_alert"] = True
+        result["chunk_count"] = len(chunks)
+        result["failed_chunks"] = len(partials) - len(usable)
+        return result
+
+    def _reduce_partials(
+        self,
+        parsed_results: List[Dict[str, Any]],
+        analysis_type: str,
+        use_cache: bool,
+        reduce_template: str,
+        max_chars: int,
+    ) -> Dict[str, Any]:
+        """Łączenie analiz częściowych; przy zbyt wielu fragmentach łączy je w kilku rundach"""
+        texts = [self._partial_json(parsed, max_chars) for parsed in parsed_results]
+        while True:
+            groups = self._group_partials(texts, max_chars)
+            if len(groups) >= len(texts) > 1:
+                # Brak postępu (każda analiza ponad pół limitu) – zmniejszamy wszystkie, aby razem
+                # zmieściły się w limicie, zamiast dać je przyciąć w połowie obiektu JSON
+                budget = max(1, (max_chars - (len(parsed_results) - 1)) // len(parsed_results))
+                texts = [self._partial_json(parsed, budget) for parsed in parsed_results]
+                groups = ["\n".join(texts)]
+            if len(groups) == 1:
+                return self.analyze_content(groups[0], analysis_type, use_cache, reduce_template)
+            merged = self._analyze_many(
+                [(group, analysis_type, use_cache, reduce_template) for group in groups]
             )
-            request_id = uuid.uuid4().hex[:8].upper()
-            prompt = self._build_secure_prompt(
-                sanitized_text, analysis_type, OLLAMA_PROMPTS, OLLAMA_SYSTEM_PROMPT
+            usable = [result for result in merged if self._has_usable_json(result)]
+            if not usable:
+                return merged[0]
+            parsed_results = [result["parsed_result"] for result in usable]
+            texts = [self._partial_json(parsed, max_chars) for parsed in parsed_results]
+
+    def _analyze_many(
+        self, items: List[Tuple[str, str, bool, Optional[str]]]
+    ) -> List[Dict[str, Any]]:
+        """Równoległe analyze_content dla (tekst, typ, use_cache, szablon) z zachowaniem kolejności"""
+        from .config import OLLAMA_MAP_CONCURRENCY
+
+        workers = max(1, min(OLLAMA_MAP_CONCURRENCY, len(items)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ollama-map") as executor:
+            return list(executor.map(lambda item: self.analyze_content(*item), items))
+
+    @staticmethod
+    def _has_usable_json(result: Dict[str, Any]) -> bool:
+        parsed = result.get("parsed_result")
+        return isinstance(parsed, dict) and "parsing_error" not in parsed
+
+    @staticmethod
+    def _group_partials(texts: List[str], max_chars: int) -> List[str]:
+        """Grupuje analizy częściowe do ``max_chars`` znaków, nigdy nie dzieląc pojedynczego JSON-a"""
+        groups: List[str] = []
+        current: List[str] = []
+        current_length = 0
+        for text in texts:
+            added = len(text) + (1 if current else 0)
+            if current and current_length + added > max_chars:
+                groups.append("\n".join(current))
+                current, current_length = [], 0
+                added = len(text)
+            current.append(text)
+            current_length += added
+        if current:
+            groups.append("\n".join(current))
+        return groups
+
+    @staticmethod
+    def _partial_json(parsed: Dict[str, Any], max_chars: Optional[int] = None) -> str:
+        """JSON analizy częściowej; za długi jest zmniejszany (krótsze teksty i listy), ale pozostaje poprawny"""
+        partial = {key: value for key, value in parsed.items() if key != "validation_error"}
+        text = json.dumps(partial, ensure_ascii=False)
+        text_limit, list_limit = 1000, 50
+        while max_chars is not None and len(text) > max_chars and (text_limit > 1 or list_limit > 0):
+            text_limit, list_limit = max(1, text_limit // 2), list_limit // 2
+            text = json.dumps(_shrink_value(partial, text_limit, list_limit), ensure_ascii=False)
+        return text
+
+    def _prepare_request(
+        self, text: str, analysis_type: str, use_cache: bool, template: Optional[str] = None
+    ) -> Tuple[_AnalysisRequest, Optional[Dict[str, Any]]]:
+        """Sanityzacja, budowa promptu i sprawdzenie cache (wspólne dla klienta sync i async)"""
+        # Import konfiguracji
+        from .config import (
+            MAX_TRANSCRIPT_LENGTH,
+            OLLAMA_GENERATION_PARAMS,
+            OLLAMA_PROMPTS,
+            OLLAMA_SYSTEM_PROMPT,
+            PROMPT_INJECTION_PATTERNS,
+        )
+
+        sanitized_text = self._sanitize_transcript(text, MAX_TRANSCRIPT_LENGTH)
+        injection_matches = self._detect_prompt_injection(
+            sanitized_text, PROMPT_INJECTION_PATTERNS
+        )
+        request_id = uuid.uuid4().hex[:8].upper()
+
+        system_prompt = OLLAMA_SYSTEM_PROMPT.strip()
+
+        def build_prompt(value: str) -> str:
+            return self._build_secure_prompt(value, analysis_type, OLLAMA_PROMPTS, template)
+
+        prompt_tokens = None
+        generation_params = OLLAMA_GENERATION_PARAMS
+        if self.token_budget is not None:
+            sanitized_text, prompt, prompt_tokens = self._fit_token_budget(
+                sanitized_text, build_prompt, system_prompt
             )
-            payload_preview = self._get_payload_preview(prompt)
-            
-            # Wywołanie API Ollama
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": self.stream_responses,
-                "options": OLLAMA_GENERATION_PARAMS
-            }
-            timeout = (self.connect_timeout, self.request_timeout)
+            generation_params = dict(
+                OLLAMA_GENERATION_PARAMS, num_ctx=self.token_budget.context_size(prompt_tokens)
+            )
+        else:
+            prompt = build_prompt(sanitized_text)
+        request = _AnalysisRequest(
+            request_id=request_id,
+            analysis_type=analysis_type,
+            sanitized_text=sanitized_text,
+            injection_matches=injection_matches,
+            prompt=prompt,
+            payload_preview=self._get_payload_preview(prompt),
+            generation_params=generation_params,
+            system=system_prompt,
+            prompt_tokens=prompt_tokens,
+        )
 
-            self._emit_debug(
-                request_id,
-                "Prepared request | type=%s | model=%s | prompt_chars=%d | text_chars=%d | stream=%s",
-                analysis_type,
+        # Identyczny prompt, model i parametry – wynik z cache zamiast ponownej generacji
+        if self.cache is not None and use_cache:
+            request.cache_key = ResultCache.make_key(
                 self.model,
-                len(prompt),
+                json.dumps(OLLAMA_GENERATION_PARAMS, sort_keys=True),
+                analysis_type,
+                system_prompt,
+                prompt,
+            )
+            cached = self.cache.get(request.cache_key)
+            if cached is not None:
+                logger.info(f"Analiza z cache (typ: {analysis_type}) – pominięto zapytanie do Ollama")
+                cached["request_id"] = request_id
+                cached["cached"] = True
+                return request, cached
+
+        self._emit_debug(
+            request_id,
+            "Prepared request | type=%s | model=%s | system_chars=%d | prompt_chars=%d | prompt_tokens=%s | text_chars=%d | stream=%s",
+            analysis_type,
+            self.model,
+            len(system_prompt),
+            len(prompt),
+            prompt_tokens,
+            len(sanitized_text),
+            self.stream_responses,
+        )
+        if self.debug_logging and self.prompt_log_max_chars:
+            prompt_debug_preview = self._truncate_for_log(prompt, self.prompt_log_max_chars)
+            self._emit_debug(request_id, "Prompt preview: %s", prompt_debug_preview)
+            options_preview = json.dumps(generation_params)
+            self._emit_debug(request_id, "Generation params: %s", options_preview)
+        return request, None
+
+    def _fit_token_budget(
+        self, sanitized_text: str, build_prompt: Callable[[str], str], system_prompt: str = ""
+    ) -> Tuple[str, str, int]:
+        """Prompt (z promptem systemowym) mieszczący się w OLLAMA_MAX_NUM_CTX; w razie potrzeby przycina transkrypt"""
+        budget = self.token_budget
+        original_length = len(sanitized_text)
+        system_tokens = budget.count(system_prompt) if system_prompt else 0
+        prompt = build_prompt(sanitized_text)
+        prompt_tokens = system_tokens + budget.count(prompt)
+        for _ in range(3):
+            overflow = prompt_tokens - budget.max_prompt_tokens
+            if overflow <= 0 or not sanitized_text:
+                break
+            # Transkrypt występuje w prompcie kilka razy (dane wejściowe i szablon)
+            occurrences = max(1, prompt.count(sanitized_text))
+            drop = math.ceil(overflow * budget.chars_per_token * 1.05 / occurrences)
+            sanitized_text = sanitized_text[: max(0, len(sanitized_text) - drop)]
+            prompt = build_prompt(sanitized_text)
+            prompt_tokens = system_tokens + budget.count(prompt)
+        if len(sanitized_text) < original_length:
+            logger.warning(
+                "Prompt przekracza budżet %d tokenów (OLLAMA_MAX_NUM_CTX) – transkrypt przycięty z %d do %d znaków",
+                budget.max_prompt_tokens,
+                original_length,
                 len(sanitized_text),
-                self.stream_responses,
             )
-            if self.debug_logging and self.prompt_log_max_chars:
-                prompt_debug_preview = self._truncate_for_log(prompt, self.prompt_log_max_chars)
-                self._emit_debug(request_id, "Prompt preview: %s", prompt_debug_preview)
-                options_preview = json.dumps(OLLAMA_GENERATION_PARAMS)
-                self._emit_debug(request_id, "Generation params: %s", options_preview)
-
-            request_kwargs: Dict[str, Any] = {
-                "json": payload,
-                "timeout": timeout,
-            }
-            if self.stream_responses:
-                request_kwargs["stream"] = True
+        return sanitized_text, prompt, prompt_tokens
 
-            logger.info(f"Wysyłanie zapytania do Ollama (typ: {analysis_type})")
-            start_time = time.monotonic()
+    def _tokenize_remote(self, text: str) -> Optional[int]:
+        """Liczba tokenów z POST /api/tokenize; None gdy serwer nie obsługuje tokenizacji"""
+        endpoint = self.endpoint_pool.select()
+        try:
+            response = get_session().post(
+                f"{endpoint.url}/api/tokenize",
+                json={"model": self.model, "content": text},
+                timeout=(self.connect_timeout, 30),
+            )
+        finally:
+            self.endpoint_pool.release(endpoint)
+        if response.status_code in (404, 405, 501):
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        tokens = response.json().get("tokens")
+        return len(tokens) if isinstance(tokens, list) else None
+
+    def _record_prompt_usage(self, request: _AnalysisRequest, payload: Dict[str, Any]) -> None:
+        """Kalibracja szacowania tokenów i log czasu prefill raportowanego przez Ollama
+
+        Przy trafieniu w cache KV Ollama liczy w prompt_eval_count tylko nowe tokeny,
+        więc różnica względem długości całego promptu to ponownie użyty wspólny początek.
+        """
+        prompt_eval_count = payload.get("prompt_eval_count")
+        if not isinstance(prompt_eval_count, int):
+            return
+        if self.token_budget is not None:
+            self.token_budget.observe(len(request.system) + len(request.prompt), prompt_eval_count)
+        if not self.debug_logging:
+            return
+
+        prompt_eval_ms = payload.get("prompt_eval_duration", 0) / 1e6
+        load_ms = payload.get("load_duration", 0) / 1e6
+        reused_tokens = max(0, (request.prompt_tokens or 0) - prompt_eval_count)
+        ms_per_token = prompt_eval_ms / prompt_eval_count if prompt_eval_count else 0.0
+        self._emit_debug(
+            request.request_id,
+            "Prefill | prompt_eval_count=%d | prompt_eval_ms=%.1f | load_ms=%.1f | reused_tokens~%d | saved_prefill_ms~%.1f",
+            prompt_eval_count,
+            prompt_eval_ms,
+            load_ms,
+            reused_tokens,
+            reused_tokens * ms_per_token,
+        )
 
-            response = requests.post(self.api_url, **request_kwargs)
+    def _build_payload(self, request: _AnalysisRequest, stream: bool) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "prompt": request.prompt,
+            "stream": stream,
+            "options": request.generation_params,
+        }
+        if request.system:
+            payload["system"] = request.system
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _execute_request(self, request: _AnalysisRequest, stream: bool) -> Dict[str, Any]:
+        """Blokujące wywołanie API Ollama z ponowieniem na innym węźle po błędzie"""
+        tried: List[OllamaEndpoint] = []
+        while True:
+            endpoint = self.endpoint_pool.select(tried)
+            tried.append(endpoint)
+            start_time = time.monotonic()
             try:
-                duration = time.monotonic() - start_time
-
-                if response.status_code == 200:
-                    if self.stream_responses:
-                        result, analysis_text = self._collect_streaming_response(response, request_id)
-                    else:
-                        result = response.json()
-                        analysis_text = result.get("response", "").strip()
-                        if self.debug_logging and self.prompt_log_max_chars:
-                            response_preview = self._truncate_for_log(
-                                analysis_text, self.prompt_log_max_chars
-                            )
-                            self._emit_debug(
-                                request_id,
-                                "Response preview (%d chars): %s",
-                                len(analysis_text),
-                                response_preview,
-                            )
+                status_code, result = self._post_to_endpoint(endpoint.url, request, stream)
+            except requests.RequestException as e:
+                if self._attempt_failed(endpoint, start_time, tried, error=e):
+                    continue
+                raise
+            except Exception:
+                # Błąd przetwarzania odpowiedzi – węzeł zwalniany, aby nie zawyżać jego obciążenia
+                self.endpoint_pool.release(endpoint)
+                raise
+            if self._attempt_failed(endpoint, start_time, tried, status_code=status_code):
+                continue
+            return result
 
-                    self._emit_debug(
-                        request_id,
-                        "Request completed in %.2fs (status=%s, response_chars=%d)",
-                        duration,
-                        response.status_code,
-                        len(analysis_text),
-                    )
+    def _attempt_failed(
+        self,
+        endpoint: OllamaEndpoint,
+        start_time: float,
+        tried: List[OllamaEndpoint],
+        status_code: Optional[int] = None,
+        error: Optional[Exception] = None,
+    ) -> bool:
+        """Zwalnia węzeł po próbie; True gdy zapytanie należy ponowić na innym węźle"""
+        # 5xx (przeciążenie, błąd ładowania modelu) i 404 (brak modelu na węźle) – inny węzeł może się udać
+        failed = error is not None or status_code >= 500 or status_code == 404
+        latency = None if failed else time.monotonic() - start_time
+        self.endpoint_pool.release(endpoint, latency, failed=failed)
+        if not failed or len(tried) >= self.failover_attempts:
+            return False
+        logger.warning(
+            "Zapytanie do węzła Ollama %s nie powiodło się (%s) – ponowienie na innym węźle",
+            endpoint.url,
+            error or f"HTTP {status_code}",
+        )
+        return True
+
+    def _post_to_endpoint(
+        self, base_url: str, request: _AnalysisRequest, stream: bool
+    ) -> Tuple[int, Dict[str, Any]]:
+        request_kwargs: Dict[str, Any] = {
+            "json": self._build_payload(request, stream),
+            "timeout": (self.connect_timeout, self.request_timeout),
+        }
+        if stream:
+            request_kwargs["stream"] = True
 
-                    # Parsowanie odpowiedzi
-                    parsed_result, validation_error = self._parse_and_validate_response(
-                        analysis_text, analysis_type
+        logger.info(f"Wysyłanie zapytania do Ollama (typ: {request.analysis_type})")
+        start_time = time.monotonic()
+
+        response = get_session().post(f"{base_url}/api/generate", **request_kwargs)
+        try:
+            if response.status_code != 200:
+                return response.status_code, self._http_error_result(
+                    request, response.status_code, response.text
+                )
+
+            if stream:
+                response_payload, analysis_text = self._collect_streaming_response(
+                    response, request.request_id
+                )
+            else:
+                response_payload = response.json()
+                analysis_text = response_payload.get("response", "").strip()
+                if self.debug_logging and self.prompt_log_max_chars:
+                    response_preview = self._truncate_for_log(
+                        analysis_text, self.prompt_log_max_chars
                     )
-                    if isinstance(parsed_result, dict):
-                        if injection_matches:
-                            parsed_result["integrity_alert"] = True
-                        else:
-                            parsed_result.setdefault("integrity_alert", False)
-                    success = validation_error is None
-                    raw_response_text = analysis_text
-                    if injection_matches and sanitized_text:
-                        preview_limit = 2000
-                        transcript_preview = sanitized_text[:preview_limit]
-                        raw_response_text = (
-                            f"{analysis_text}\n\n[TRANSCRIPT_PREVIEW]\n{transcript_preview}"
-                        )
-                    
-                    if success:
-                        logger.info(f"Analiza zakończona pomyślnie (typ: {analysis_type})")
-                    else:
-                        logger.warning(
-                            "Analiza zwróciła nieprawidłowy format: %s", validation_error
-                        )
-                    return {
-                        "success": success,
-                        "analysis_type": analysis_type,
-                        "raw_response": raw_response_text,
-                        "parsed_result": parsed_result,
-                        "model_used": self.model,
-                        "injection_detected": bool(injection_matches),
-                        "injection_matches": injection_matches,
-                        "validation_error": validation_error,
-                        "request_id": request_id,
-                    }
-                else:
-                    error_preview = self._truncate_for_log(response.text, self.prompt_log_max_chars)
                     self._emit_debug(
-                        request_id,
-                        "HTTP error %s: %s",
-                        response.status_code,
-                        error_preview,
+                        request.request_id,
+                        "Response preview (%d chars): %s",
+                        len(analysis_text),
+                        response_preview,
                     )
-                    logger.error(f"Błąd API Ollama: {response.status_code} - {error_preview}")
-                    self._log_payload_preview(request_id, payload_preview)
-                    return {
-                        "success": False,
-                        "error": f"HTTP {response.status_code}: {response.text}",
-                        "analysis_type": analysis_type,
-                        "request_id": request_id,
-                    }
-            finally:
-                close_fn = getattr(response, "close", None)
-                if callable(close_fn):
-                    close_fn()
-                
-        except Exception as e:
+            self._record_prompt_usage(request, response_payload)
+
             self._emit_debug(
-                locals().get("request_id", "NO-ID"),
-                "Exception raised: %s",
-                e,
+                request.request_id,
+                "Request completed in %.2fs (status=%s, response_chars=%d)",
+                time.monotonic() - start_time,
+                response.status_code,
+                len(analysis_text),
             )
-            logger.error(f"Błąd podczas analizy treści: {e}")
-            self._log_payload_preview(
-                locals().get("request_id", "NO-ID"),
-                locals().get("payload_preview", ""),
+            return response.status_code, self._build_analysis_result(request, analysis_text)
+        finally:
+            close_fn = getattr(response, "close", None)
+            if callable(close_fn):
+                close_fn()
+
+    def _build_analysis_result(
+        self, request: _AnalysisRequest, analysis_text: str
+    ) -> Dict[str, Any]:
+        """Parsowanie i walidacja odpowiedzi modelu; udane wyniki trafiają do cache"""
+        parsed_result, validation_error = self._parse_and_validate_response(
+            analysis_text, request.analysis_type
+        )
+        if isinstance(parsed_result, dict):
+            if request.injection_matches:
+                parsed_result["integrity_alert"] = True
+            else:
+                parsed_result.setdefault("integrity_alert", False)
+        success = validation_error is None
+        raw_response_text = analysis_text
+        if request.injection_matches and request.sanitized_text:
+            preview_limit = 2000
+            transcript_preview = request.sanitized_text[:preview_limit]
+            raw_response_text = (
+                f"{analysis_text}\n\n[TRANSCRIPT_PREVIEW]\n{transcript_preview}"
             )
-            return {
-                "success": False,
-                "error": str(e),
-                "analysis_type": analysis_type,
-                "validation_error": str(e),
-                "injection_detected": bool(injection_matches) if "injection_matches" in locals() else False,
-                "injection_matches": injection_matches if "injection_matches" in locals() else [],
-                "request_id": locals().get("request_id", "NO-ID"),
-            }
+
+        if success:
+            logger.info(f"Analiza zakończona pomyślnie (typ: {request.analysis_type})")
+        else:
+            logger.warning(
+                "Analiza zwróciła nieprawidłowy format: %s", validation_error
+            )
+        analysis_result = {
+            "success": success,
+            "analysis_type": request.analysis_type,
+            "raw_response": raw_response_text,
+            "parsed_result": parsed_result,
+            "model_used": self.model,
+            "injection_detected": bool(request.injection_matches),
+            "injection_matches": request.injection_matches,
+            "validation_error": validation_error,
+            "request_id": request.request_id,
+        }
+        if success and request.cache_key is not None:
+            self.cache.put(request.cache_key, analysis_result)
+        return analysis_result
+
+    def _http_error_result(
+        self, request: _AnalysisRequest, status_code: int, body: str
+    ) -> Dict[str, Any]:
+        error_preview = self._truncate_for_log(body, self.prompt_log_max_chars)
+        self._emit_debug(
+            request.request_id,
+            "HTTP error %s: %s",
+            status_code,
+            error_preview,
+        )
+        logger.error(f"Błąd API Ollama: {status_code} - {error_preview}")
+        self._log_payload_preview(request.request_id, request.payload_preview)
+        return {
+            "success": False,
+            "error": f"HTTP {status_code}: {body}",
+            "analysis_type": request.analysis_type,
+            "request_id": request.request_id,
+        }
+
+    def _exception_result(
+        self, request: Optional[_AnalysisRequest], analysis_type: str, error: Exception
+    ) -> Dict[str, Any]:
+        request_id = request.request_id if request else "NO-ID"
+        self._emit_debug(request_id, "Exception raised: %s", error)
+        logger.error(f"Błąd podczas analizy treści: {error}")
+        self._log_payload_preview(request_id, request.payload_preview if request else "")
+        injection_matches = request.injection_matches if request else []
+        return {
+            "success": False,
+            "error": str(error),
+            "analysis_type": analysis_type,
+            "validation_error": str(error),
+            "injection_detected": bool(injection_matches),
+            "injection_matches": injection_matches,
+            "request_id": request_id,
+        }
     
     def _build_secure_prompt(
         self,
         sanitized_text: str,
         analysis_type: str,
         prompts: Dict[str, str],
-        system_prompt: str,
+        user_template: Optional[str] = None,
     ) -> str:
-        """Buduje prompt z kontekstem bezpieczeństwa i danymi wejściowymi."""
-        if analysis_type in prompts:
-            user_template = prompts[analysis_type]
-        elif analysis_type == "call_center":
-            user_template = self._create_call_center_prompt("{text}")
-        elif analysis_type == "sentiment":
-            user_template = self._create_sentiment_prompt("{text}")
-        elif analysis_type == "content_quality":
-            user_template = self._create_content_quality_prompt("{text}")
-        else:
-            user_template = self._create_general_prompt("{text}")
+        """Buduje prompt: stałe instrukcje na początku, dane wejściowe na końcu.
 
-        user_prompt = user_template.replace("{text}", sanitized_text)
+        Prompt systemowy trafia do pola "system" zapytania. Transkrypt występuje tylko
+        w sekcji [INPUT_JSON] za instrukcjami, dzięki czemu początek promptu jest taki sam
+        dla wszystkich analiz danego typu i Ollama może go wziąć z cache KV.
+        """
+        if user_template is None:
+            user_template = self._user_template(analysis_type, prompts)
+
+        user_prompt = user_template.replace("{text}", "(dane w sekcji [INPUT_JSON] poniżej)")
         return (
-            f"[SYSTEM]\n{system_prompt.strip()}\n[/SYSTEM]\n"
+            "[USER]\n"
+            f"{user_prompt.strip()}\n"
+            "[/USER]\n"
             "[INPUT_JSON]\n"
             "{\n"
             f'  "analysis_type": "{analysis_type}",\n'
             f'  "transcript": """{sanitized_text}"""\n'
             "}\n"
             "[/INPUT_JSON]\n"
-            "[USER]\n"
-            f"{user_prompt.strip()}\n"
-            "[/USER]\n"
             "Odpowiedz jedynie poprawnym JSON. Wszystkie teksty w odpowiedzi muszą być w języku polskim."
         )
 
+    def _user_template(self, analysis_type: str, prompts: Dict[str, str]) -> str:
+        """Szablon promptu użytkownika (z {text}) dla danego typu analizy"""
+        if analysis_type in prompts:
+            return prompts[analysis_type]
+        elif analysis_type == "call_center":
+            return self._create_call_center_prompt("{text}")
+        elif analysis_type == "sentiment":
+            return self._create_sentiment_prompt("{text}")
+        elif analysis_type == "content_quality":
+            return self._create_content_quality_prompt("{text}")
+        else:
+            return self._create_general_prompt("{text}")
+
     @staticmethod
     def _sanitize_transcript(text: str, max_length: int) -> str:
         """Usuwa znaki sterujące i przycina tekst."""
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Moduł z pulą serwerów Ollama
+============================
+
+Zawiera:
+- Stan węzła (zapytania w locie, średni czas odpowiedzi, zdrowie)
+- Wybór najmniej obciążonego zdrowego węzła dla zapytania
+- Okresowe sprawdzanie węzłów w tle (ta sama kontrola co test_connection)
+- Oznaczanie węzłów po błędzie, aby kolejna próba trafiła gdzie indziej
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Collection, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Waga najnowszego pomiaru w średniej kroczącej czasu odpowiedzi
+LATENCY_SMOOTHING = 0.3
+
+
+@dataclass
+class OllamaEndpoint:
+    """Węzeł Ollama ze statystykami używanymi przy wyborze"""
+
+    url: str
+    in_flight: int = 0
+    latency: float = 0.0
+    healthy: bool = True
+    failures: int = 0
+
+    @property
+    def load_score(self) -> float:
+        # Zapytania w locie ważone średnim czasem odpowiedzi; węzeł bez pomiarów dostaje pierwszeństwo
+        return (self.in_flight + 1) * self.latency
+
+
+class EndpointPool:
+    """Rozdziela zapytania między serwery Ollama i śledzi ich stan"""
+
+    def __init__(
+        self,
+        urls: List[str],
+        probe: Optional[Callable[[str], bool]] = None,
+        health_check_interval: float = 0.0,
+    ):
+        unique_urls = list(dict.fromkeys(url.rstrip("/") for url in urls if url))
+        if not unique_urls:
+            raise ValueError("Pula Ollama wymaga co najmniej jednego adresu")
+        self.endpoints = [OllamaEndpoint(url) for url in unique_urls]
+        self._probe = probe
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def select(self, exclude: Collection[OllamaEndpoint] = ()) -> Optional[OllamaEndpoint]:
+        """Najmniej obciążony zdrowy węzeł (spoza ``exclude``); zwiększa jego licznik w locie"""
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            if not candidates:
+                return None
+            # Gdy żaden węzeł nie przeszedł kontroli, próbujemy mimo to – sprawdzenie mogło być chwilowe
+            healthy = [endpoint for endpoint in candidates if endpoint.healthy] or candidates
+            endpoint = min(healthy, key=lambda item: (item.load_score, item.in_flight))
+            endpoint.in_flight += 1
+            return endpoint
+
+    def release(self, endpoint: OllamaEndpoint, latency: Optional[float] = None, failed: bool = False) -> None:
+        """Zwolnienie węzła po zapytaniu z aktualizacją czasu odpowiedzi lub stanu błędu"""
+        with self._lock:
+            endpoint.in_flight = max(0, endpoint.in_flight - 1)
+            if failed:
+                endpoint.failures += 1
+                if endpoint.healthy and len(self.endpoints) > 1:
+                    logger.warning(f"Węzeł Ollama {endpoint.url} oznaczony jako niedostępny")
+                endpoint.healthy = False
+            elif latency is not None:
+                endpoint.failures = 0
+                endpoint.healthy = True
+                if endpoint.latency:
+                    endpoint.latency += LATENCY_SMOOTHING * (latency - endpoint.latency)
+                else:
+                    endpoint.latency = latency
+
+    def set_health(self, endpoint: OllamaEndpoint, healthy: bool) -> None:
+        with self._lock:
+            if healthy and not endpoint.healthy:
+                logger.info(f"Węzeł Ollama {endpoint.url} ponownie dostępny")
+            endpoint.healthy = healthy
+
+    def check_health(self) -> bool:
+        """Jednorazowe sprawdzenie wszystkich węzłów; True jeśli którykolwiek jest zdrowy"""
+        if self._probe is None:
+            return True
+        for endpoint in self.endpoints:
+            try:
+                healthy = bool(self._probe(endpoint.url))
+            except Exception as e:
+                logger.debug(f"Sprawdzenie węzła Ollama {endpoint.url} nie powiodło się: {e}")
+                healthy = False
+            self.set_health(endpoint, healthy)
+        return any(endpoint.healthy for endpoint in self.endpoints)
+
+    def start_health_checks(self) -> None:
+        """Uruchomienie okresowego sprawdzania węzłów w tle (tylko dla kilku węzłów)"""
+        if self._probe is None or self.health_check_interval <= 0 or len(self.endpoints) < 2:
+            return
+        with self._lock:
+            if self._health_thread is not None:
+                return
+            self._stop.clear()
+            self._health_thread = threading.Thread(
+                target=self._health_loop, name="ollama-health", daemon=True
+            )
+            self._health_thread.start()
+
+    def stop_health_checks(self) -> None:
+        with self._lock:
+            thread, self._health_thread = self._health_thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _health_loop(self) -> None:
+        while not self._stop.wait(self.health_check_interval):
+            self.check_health()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Moduł z wieloetapowym pipeline przetwarzania
+============================================
+
+Zawiera:
+- Definicję etapu (nazwa, funkcja obsługi, liczba wątków, rozmiar kolejki)
+- Pipeline, w którym każdy etap ma własną kolejkę i pulę wątków
+- Przekazywanie zadań między etapami z backpressure
+
+Dzięki temu kolejny plik może być transkrybowany, gdy poprzedni czeka
+na analizę Ollama.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from .worker_pool import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PipelineStage:
+    """Pojedynczy etap pipeline"""
+
+    name: str
+    # Zwraca zadanie dla następnego etapu lub None, aby zakończyć przetwarzanie
+    handler: Callable[[Any], Optional[Any]]
+    workers: int = 1
+    queue_size: int = 0
+
+
+class StagePipeline:
+    """Pipeline, w którym każdy etap ma własną ograniczoną kolejkę i pulę wątków"""
+
+    def __init__(self, stages: List[PipelineStage], name: str = "pipeline"):
+        if not stages:
+            raise ValueError("Pipeline wymaga co najmniej jednego etapu")
+        self.name = name
+        self.stages = stages
+        self._pools = [
+            WorkerPool(stage.workers, queue_size=stage.queue_size, name=f"{name}-{stage.name}")
+            for stage in stages
+        ]
+        self._in_flight = 0
+        self._idle = threading.Condition()
+        logger.info(
+            "Pipeline '%s' uruchomiony: %s",
+            name,
+            " → ".join(f"{stage.name}×{max(1, stage.workers)}" for stage in stages),
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Liczba zadań w trakcie przetwarzania (we wszystkich etapach)"""
+        with self._idle:
+            return self._in_flight
+
+    def submit(self, job: Any, timeout: Optional[float] = None) -> bool:
+        """Dodaje zadanie do pierwszego etapu (blokuje przy pełnej kolejce)"""
+        with self._idle:
+            self._in_flight += 1
+        if not self._pools[0].submit(self._run_stage, 0, job, timeout=timeout):
+            self._job_finished()
+            return False
+        return True
+
+    def wait_idle(self) -> None:
+        """Czeka aż wszystkie przyjęte zadania przejdą przez wszystkie etapy"""
+        with self._idle:
+            while self._in_flight > 0:
+                self._idle.wait()
+
+    def shutdown(self, drain: bool = True) -> None:
+        """Zatrzymuje etapy po kolei, aby zadania z wcześniejszych etapów dotarły do kolejnych"""
+        for pool in self._pools:
+            pool.shutdown(drain=drain)
+        if not drain:
+            with self._idle:
+                self._in_flight = 0
+                self._idle.notify_all()
+
+    def _run_stage(self, index: int, job: Any) -> None:
+        stage = self.stages[index]
+        try:
+            result = stage.handler(job)
+        except Exception as e:
+            logger.error("Błąd etapu '%s' pipeline '%s': %s", stage.name, self.name, e, exc_info=True)
+            result = None
+
+        next_index = index + 1
+        if result is None or next_index >= len(self._pools):
+            self._job_finished()
+            return
+
+        # Przekazanie do kolejnego etapu – przy pełnej kolejce wątek czeka (backpressure)
+        if not self._pools[next_index].submit(self._run_stage, next_index, result):
+            logger.warning(
+                "Etap '%s' nie przyjął zadania – pipeline '%s' jest zamykany",
+                self.stages[next_index].name,
+                self.name,
+            )
+            self._job_finished()
+
+    def _job_finished(self) -> None:
+        with self._idle:
+            self._in_flight -= 1
+            if self._in_flight <= 0:
+                self._in_flight = 0
+                self._idle.notify_all()
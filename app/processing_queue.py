@@ -17,13 +17,16 @@ logger = logging.getLogger(__name__)
 
 
 def _get_audio_duration_seconds(file_path: Path) -> float:
-    """Pobiera długość nagrania audio w sekundach."""
+    """Pobiera długość nagrania audio w sekundach (tylko z nagłówka – bez dekodowania).
+
+    Dokładną długość ustawia później update_duration po jednorazowym dekodowaniu w pipeline.
+    """
     try:
-        import librosa
-        duration = librosa.get_duration(path=str(file_path))
-        return duration
+        import soundfile as sf
+        info = sf.info(str(file_path))
+        return info.frames / float(info.samplerate)
     except Exception as e:
-        logger.warning(f"Nie udało się odczytać długości audio {file_path}: {e}")
+        logger.debug(f"Brak długości w nagłówku {file_path.name} – szacowanie z rozmiaru: {e}")
         # Fallback: szacowanie na podstawie rozmiaru (przybliżenie 1MB/min dla MP3)
         size_mb = file_path.stat().st_size / (1024 * 1024)
         return max(60.0, size_mb * 60)  # minimum 1 minuta
@@ -60,6 +63,7 @@ class QueueItem:
     error: Optional[str] = None
     estimated_minutes: int = 1
     result_files: Dict[str, str] = field(default_factory=dict)
+    preprocessing: Optional[Dict] = None
 
     def _format_datetime(self, dt: Optional[datetime]) -> Optional[str]:
         """Formatuje datę do formatu RRRR-MM-DD GG:MM:SS (czas lokalny)."""
@@ -99,6 +103,7 @@ class QueueItem:
             "processing_time": self._calculate_processing_time(),
             "error": self.error,
             "result_files": self.result_files,
+            "preprocessing": self.preprocessing,
         }
 
 
@@ -137,13 +142,23 @@ class ProcessingQueue:
                 item.started_at = _utcnow()
                 item.error = None
 
-    def mark_completed(self, item_id: str, result_files: Dict[str, str]) -> None:
+    def update_duration(self, item_id: str, duration_seconds: float) -> None:
+        """Aktualizuje szacowany czas na podstawie długości zdekodowanego nagrania."""
+        with self._lock:
+            item = self._items.get(item_id)
+            if item:
+                item.estimated_minutes = max(1, math.ceil(duration_seconds / 60.0))
+
+    def mark_completed(
+        self, item_id: str, result_files: Dict[str, str], preprocessing: Optional[Dict] = None
+    ) -> None:
         with self._lock:
             item = self._items.get(item_id)
             if item:
                 item.status = "completed"
                 item.finished_at = _utcnow()
                 item.result_files = result_files
+                item.preprocessing = preprocessing
                 item.error = None
 
     def mark_failed(self, item_id: str, error_message: str) -> None:
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Moduł z trwałym cache wyników
+=============================
+
+Zawiera:
+- Cache wyników (JSON) adresowany skrótem treści i ustawień
+- Eviction LRU według czasu ostatniego użycia, limitu liczby wpisów i rozmiaru
+- Wygasanie wpisów po zadanym czasie od zapisu (TTL)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    # Wartości numpy (np. float32) w wynikach
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Nieobsługiwany typ w cache: {type(value).__name__}")
+
+
+class ResultCache:
+    """Katalog plików JSON (jeden wpis na plik) z ograniczeniem rozmiaru i czasu życia
+
+    Plik wpisu zawiera czas zapisu ("created", liczy się od niego TTL) i wartość ("value").
+    Czas modyfikacji pliku odświeżany przy trafieniu służy tylko do kolejności LRU.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_entries: int = 1000,
+        max_bytes: int = 0,
+        ttl_seconds: float = 0,
+        name: str = "cache",
+    ):
+        self.directory = Path(directory)
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.name = name
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Klucz wpisu – skrót z części (treść, model, opcje)"""
+        digest = hashlib.blake2b(digest_size=20)
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _expired(self, timestamp: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - timestamp > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Odczyt wpisu (None gdy brak lub wygasł); trafienie odświeża pozycję LRU"""
+        path = self._path(key)
+        with self._lock:
+            try:
+                now = time.time()
+                # mtime nie jest starszy od zapisu – wpis wygasły wg mtime można usunąć bez odczytu
+                expired = self._expired(path.stat().st_mtime, now)
+                if not expired:
+                    entry = json.loads(path.read_text(encoding="utf-8"))
+                    if not isinstance(entry, dict) or "created" not in entry:
+                        raise ValueError("brak czasu zapisu wpisu")
+                    expired = self._expired(float(entry["created"]), now)
+                if expired:
+                    path.unlink(missing_ok=True)
+                    self.misses += 1
+                    return None
+                value = entry["value"]
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except (OSError, ValueError) as e:
+                logger.warning("Uszkodzony wpis %s '%s': %s", self.name, path.name, e)
+                path.unlink(missing_ok=True)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Zapis wpisu (atomowa podmiana pliku) i przycięcie cache do limitów"""
+        path = self._path(key)
+        with self._lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+                fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(
+                        {"created": time.time(), "value": value}, f, ensure_ascii=False, default=_json_default
+                    )
+                os.replace(temp_path, path)
+            except (OSError, TypeError) as e:
+                logger.warning("Nie udało się zapisać wpisu %s: %s", self.name, e)
+                return
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        entries = []
+        now = time.time()
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            # Wpisy odczytywane częściej niż TTL wygasają dopiero przy odczycie (get)
+            if self._expired(stat.st_mtime, now):
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        # Najdawniej używane wpisy usuwane są jako pierwsze
+        entries.sort(key=lambda entry: entry[0])
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and (
+            (self.max_entries and len(entries) > self.max_entries)
+            or (self.max_bytes and total_bytes > self.max_bytes)
+        ):
+            _, size, path = entries.pop(0)
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            removed += 1
+        if removed:
+            logger.debug("%s: usunięto %d najdawniej używanych wpisów", self.name, removed)
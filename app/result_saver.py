@@ -126,14 +126,43 @@ class ResultSaver:
         
         return merged
     
+    def build_speaker_turns(self, transcription_data: Dict) -> List[Dict]:
+        """Wypowiedzi mówców: segmenty z przypisanym mówcą, połączone w kolejne tury"""
+        segments = transcription_data.get("segments", [])
+        speakers_data = transcription_data.get("speakers", [])
+        
+        # Przygotowanie segmentów z przypisanymi mówcami
+        segments_with_speakers = []
+        for segment in segments:
+            segment_start = segment.get("start", 0)
+            segment_end = segment.get("end", 0)
+            
+            # Znajdź mówcę dla tego segmentu
+            speaker = self.find_speaker_for_segment(segment_start, segment_end, speakers_data)
+            
+            segments_with_speakers.append({
+                "speaker": speaker,
+                "start": segment_start,
+                "end": segment_end,
+                "text": segment.get("text", "").strip()
+            })
+        
+        # Łączenie kolejnych segmentów tego samego mówcy
+        return self.merge_consecutive_speakers(segments_with_speakers)
+    
     def save_transcription_with_speakers(
         self,
         audio_file_path: Path,
         transcription_data: Dict,
         analysis_results: Optional[Dict] = None,
         timestamp: Optional[str] = None,
+        preprocessing: Optional[Dict] = None,
     ) -> str:
-        """Zapisywanie transkrypcji z informacjami o mówcach i analizą Ollama."""
+        """Zapisywanie transkrypcji z informacjami o mówcach i analizą Ollama.
+
+        preprocessing – raport AudioPreprocessor (uruchomione etapy i metryki jakości),
+        dopisywany na końcu pliku transkrypcji.
+        """
         try:
             effective_timestamp = timestamp or datetime.now().strftime("%Y%m%d%H%M%S")
             output_filename = f"{audio_file_path.stem} {effective_timestamp}.txt"
@@ -147,27 +176,7 @@ class ResultSaver:
                 f.write(f"Transkrypcja rozmowy: {audio_file_path.name}\n")
                 f.write("=" * 60 + "\n\n")
                 
-                segments = transcription_data.get("segments", [])
-                speakers_data = transcription_data.get("speakers", [])
-                
-                # Przygotowanie segmentów z przypisanymi mówcami
-                segments_with_speakers = []
-                for segment in segments:
-                    segment_start = segment.get("start", 0)
-                    segment_end = segment.get("end", 0)
-                    
-                    # Znajdź mówcę dla tego segmentu
-                    speaker = self.find_speaker_for_segment(segment_start, segment_end, speakers_data)
-                    
-                    segments_with_speakers.append({
-                        "speaker": speaker,
-                        "start": segment_start,
-                        "end": segment_end,
-                        "text": segment.get("text", "").strip()
-                    })
-                
-                # Łączenie kolejnych segmentów tego samego mówcy
-                merged_segments = self.merge_consecutive_speakers(segments_with_speakers)
+                merged_segments = self.build_speaker_turns(transcription_data)
                 
                 # Zapisanie do pliku
                 for segment in merged_segments:
@@ -201,6 +210,9 @@ class ResultSaver:
                     f.write(f"  - Liczba słów: {stats['words']}\n")
                     f.write(f"  - Średnio słów/segment: {avg_words_per_segment:.1f}\n")
                     f.write("\n")
+
+                if preprocessing:
+                    f.write(self._format_preprocessing(preprocessing))
             
             analysis_text = self._prepare_analysis_text(analysis_results, audio_file_path)
             with open(analysis_path, "w", encoding="utf-8") as f:
@@ -228,6 +240,22 @@ class ResultSaver:
             logger.error(f"Błąd podczas zapisywania transkrypcji: {e}")
             raise
     
+    @staticmethod
+    def _format_preprocessing(preprocessing: Dict) -> str:
+        """Sekcja z decyzją preprocessingu audio (etapy i metryki jakości nagrania)"""
+        lines = ["=" * 60, "PREPROCESSING AUDIO:", "=" * 60]
+        if preprocessing.get("skipped"):
+            lines.append("  - Etapy: pominięty (nagranie nie wymagało przetwarzania)")
+        else:
+            lines.append(f"  - Etapy: {', '.join(preprocessing.get('stages', []))}")
+        lines.append(f"  - Tryb adaptacyjny: {'tak' if preprocessing.get('adaptive') else 'nie'}")
+        metrics = preprocessing.get("metrics") or {}
+        if metrics:
+            lines.append("  - Metryki: " + ", ".join(f"{name}={value}" for name, value in metrics.items()))
+        if preprocessing.get("error"):
+            lines.append(f"  - Błąd: {preprocessing['error']}")
+        return "\n".join(lines) + "\n"
+
     def _prepare_analysis_text(
         self, analysis_results: Optional[Dict], audio_file_path: Path
     ) -> str:
@@ -11,13 +11,17 @@ Zawiera funkcje do:
 """
 
 import logging
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Optional, Dict, Tuple
 import torch
 import numpy as np
 from collections import defaultdict
 
+from .decoded_audio import DecodedAudio, SharedAudioHandle, release_shared_segment, shared_audio
+
 # Monkey-patch dla kompatybilności z nowszymi wersjami huggingface_hub
 # PyAnnote używa use_auth_token, ale nowsze wersje używają token
 try:
@@ -140,8 +144,14 @@ class SpeakerDiarizer:
             logger.error(f"Błąd podczas inicjalizacji rozpoznawania mówców: {e}")
             return False
     
-    def diarize_speakers(self, audio_file_path: Path) -> Optional[List[Dict]]:
-        """Rozpoznawanie mówców w pliku audio za pomocą zaawansowanego algorytmu pyannote"""
+    def diarize_speakers(
+        self, audio_file_path: Path, audio: Optional[DecodedAudio] = None
+    ) -> Optional[List[Dict]]:
+        """Rozpoznawanie mówców w pliku audio za pomocą zaawansowanego algorytmu pyannote
+
+        Jeśli przekazano ``audio`` (bufor 16 kHz), pipeline korzysta z niego zamiast
+        ponownie dekodować plik.
+        """
         if not self.initialized or not self.pipeline:
             logger.warning("Rozpoznawanie mówców nie jest zainicjalizowane")
             return None
@@ -149,9 +159,10 @@ class SpeakerDiarizer:
         try:
             logger.info(f"Rozpoznawanie mówców w pliku: {audio_file_path.name}")
             
-            # Uruchomienie diarization
+            # Uruchomienie diarization (na wspólnym buforze lub ze ścieżki)
+            pipeline_input = audio.as_pyannote_input() if audio is not None else str(audio_file_path)
             with ProgressHook() as hook:
-                diarization = self.pipeline(str(audio_file_path), hook=hook)
+                diarization = self.pipeline(pipeline_input, hook=hook)
             
             # Konwersja wyników na format JSON
             speakers_data = []
@@ -170,6 +181,107 @@ class SpeakerDiarizer:
             logger.error(f"Błąd podczas rozpoznawania mówców: {e}")
             return None
 
+# Diarizer załadowany w procesie roboczym (jeden na proces)
+_WORKER_DIARIZER: Optional[SpeakerDiarizer] = None
+
+
+def _init_diarization_worker(auth_token: Optional[str], model_name: Optional[str], num_threads: int) -> None:
+    """Inicjalizacja procesu roboczego: jednorazowe załadowanie pipeline pyannote"""
+    global _WORKER_DIARIZER
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    diarizer = SpeakerDiarizer()
+    try:
+        diarizer.initialize(auth_token, model_name=model_name)
+    except Exception as e:  # błąd w initializerze zepsułby całą pulę
+        logger.error(f"Błąd inicjalizacji procesu rozpoznawania mówców: {e}")
+    _WORKER_DIARIZER = diarizer
+
+
+def _diarization_worker_ready() -> bool:
+    return _WORKER_DIARIZER is not None and _WORKER_DIARIZER.initialized
+
+
+def _diarize_in_worker(audio_file_path: str, handle: Optional[SharedAudioHandle]) -> Optional[List[Dict]]:
+    """Rozpoznawanie mówców w procesie roboczym (bufor z pamięci współdzielonej lub plik)"""
+    if _WORKER_DIARIZER is None:
+        return None
+    if handle is None:
+        return _WORKER_DIARIZER.diarize_speakers(Path(audio_file_path))
+
+    shm, samples = handle.attach()
+    try:
+        audio = DecodedAudio(samples, handle.sample_rate, mmap_threshold_mb=0)
+        result = _WORKER_DIARIZER.diarize_speakers(Path(audio_file_path), audio=audio)
+        del audio
+        return result
+    finally:
+        del samples
+        release_shared_segment(shm)
+
+
+class ProcessSpeakerDiarizer:
+    """Rozpoznawanie mówców w osobnym procesie z modelem pyannote ładowanym raz
+
+    Dzięki temu pyannote nie konkuruje z Whisper o GIL ani o wątki PyTorch
+    w procesie głównym, a obie operacje mogą działać jednocześnie.
+    """
+
+    def __init__(self, num_threads: int = 0):
+        self.num_threads = num_threads
+        self.initialized = False
+        self._executor: Optional[ProcessPoolExecutor] = None
+        logger.info("ProcessSpeakerDiarizer zainicjalizowany")
+
+    def initialize(self, auth_token: Optional[str] = None, model_name: Optional[str] = None) -> bool:
+        """Uruchomienie procesu roboczego i załadowanie w nim pipeline pyannote"""
+        if not SPEAKER_DIARIZATION_AVAILABLE:
+            logger.warning("pyannote.audio nie jest dostępne")
+            return False
+
+        self.shutdown()
+        try:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_diarization_worker,
+                initargs=(auth_token, model_name, self.num_threads),
+            )
+            self.initialized = self._executor.submit(_diarization_worker_ready).result()
+        except Exception as e:
+            logger.error(f"Nie udało się uruchomić procesu rozpoznawania mówców: {e}")
+            self.initialized = False
+
+        if self.initialized:
+            logger.info("Rozpoznawanie mówców uruchomione w osobnym procesie")
+        else:
+            self.shutdown()
+        return self.initialized
+
+    def diarize_speakers(
+        self, audio_file_path: Path, audio: Optional[DecodedAudio] = None
+    ) -> Optional[List[Dict]]:
+        """Rozpoznawanie mówców w procesie roboczym (PCM przekazywane przez pamięć współdzieloną)"""
+        if not self.initialized or self._executor is None:
+            logger.warning("Rozpoznawanie mówców nie jest zainicjalizowane")
+            return None
+
+        try:
+            if audio is None:
+                return self._executor.submit(_diarize_in_worker, str(audio_file_path), None).result()
+            with shared_audio(audio) as handle:
+                return self._executor.submit(_diarize_in_worker, str(audio_file_path), handle).result()
+        except Exception as e:
+            logger.error(f"Błąd podczas rozpoznawania mówców w procesie roboczym: {e}")
+            return None
+
+    def shutdown(self) -> None:
+        """Zatrzymanie procesu roboczego"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self.initialized = False
+
 class AdvancedSpeakerDiarizer:
     """Zaawansowany algorytm rozpoznawania mówców na podstawie analizy segmentów Whisper"""
     
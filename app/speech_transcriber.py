@@ -8,32 +8,81 @@ Zawiera funkcje do:
 - Transkrypcji plików audio na tekst
 - Obsługi błędów i ponownych prób
 - Optymalizacji wydajności transkrypcji
+- Transkrypcji w puli procesów (jeden model na proces)
+- Pomijania ciszy (VAD) z przeliczaniem znaczników czasu
+- Równoległej transkrypcji długich nagrań we fragmentach
 """
 
+import hashlib
 import logging
+import multiprocessing
 import os
+import threading
 import time
 import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Union
+import numpy as np
 import torch
 import whisper
 from cryptography.fernet import Fernet
 
-from .config import MODEL_CACHE_DIR
+from .config import (
+    MODEL_CACHE_DIR,
+    WHISPER_BACKEND,
+    WHISPER_CHUNK_MIN_SECONDS,
+    WHISPER_CHUNK_OVERLAP_SECONDS,
+    WHISPER_CHUNK_SECONDS,
+    WHISPER_CHECKPOINT_ENABLED,
+    WHISPER_CHUNK_WORKERS,
+    WHISPER_COMPUTE_TYPE,
+    WHISPER_IN_MEMORY_AUDIO,
+    WHISPER_VAD_ENABLED,
+)
+from .chunking import plan_chunks, stitch_segments
+from .decoded_audio import TARGET_SAMPLE_RATE, SharedAudioHandle, pcm_hash, release_shared_segment, shared_audio
+from .transcriber_backends import TranscriberBackend, create_backend
+from .transcription_checkpoint import TranscriptionCheckpoint, purge_stale_checkpoints
+from .vad import SpeechTimeline, detect_speech
 
 logger = logging.getLogger(__name__)
 
 class WhisperTranscriber:
     """Transkrypcja mowy na tekst za pomocą modelu Whisper"""
     
-    def __init__(self):
-        self.model = None
-        self.device = "cpu"
-        self._fp16 = False
+    def __init__(
+        self,
+        in_memory_audio: bool = WHISPER_IN_MEMORY_AUDIO,
+        backend: Optional[TranscriberBackend] = None,
+        vad_enabled: bool = WHISPER_VAD_ENABLED,
+    ):
+        self.backend = backend or create_backend(
+            WHISPER_BACKEND, WHISPER_COMPUTE_TYPE, num_workers=max(1, WHISPER_CHUNK_WORKERS)
+        )
+        self.in_memory_audio = in_memory_audio
+        self.vad_enabled = vad_enabled
+        self.checkpoint_enabled = WHISPER_CHECKPOINT_ENABLED
+        self.model_name: Optional[str] = None
         self.encryption_key = Fernet.generate_key()
         self.cipher = Fernet(self.encryption_key)
-        logger.info("WhisperTranscriber zainicjalizowany")
+        logger.info("WhisperTranscriber zainicjalizowany (silnik: %s)", self.backend.name)
+
+    @property
+    def model(self):
+        return self.backend.model
+
+    @model.setter
+    def model(self, value) -> None:
+        self.backend.model = value
+
+    @property
+    def device(self) -> str:
+        return self.backend.device
+
+    @property
+    def _fp16(self) -> bool:
+        return self.backend.fp16
     
     def load_model(self, model_name: str = "large-v3") -> None:
         """Ładowanie modelu Whisper do pamięci"""
@@ -50,15 +99,16 @@ class WhisperTranscriber:
             else:
                 logger.info("Znaleziono model Whisper '%s' w %s", model_name, model_file)
 
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            self._fp16 = self.device != "cpu"
+            device = "cuda" if torch.cuda.is_available() else "cpu"
 
-            logger.info("Ładowanie modelu Whisper: %s (urządzenie: %s)", model_name, self.device)
-            self.model = whisper.load_model(
+            logger.info(
+                "Ładowanie modelu Whisper: %s (urządzenie: %s, silnik: %s)",
                 model_name,
-                download_root=str(model_cache_dir),
-                device=self.device,
+                device,
+                self.backend.name,
             )
+            self.backend.load(model_name, model_cache_dir, device)
+            self.model_name = model_name
             logger.info(
                 "Model Whisper '%s' przygotowany w katalogu %s",
                 model_name,
@@ -72,6 +122,155 @@ class WhisperTranscriber:
             logger.error(f"Błąd podczas ładowania modelu Whisper: {e}")
             raise
     
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    @property
+    def supports_batching(self) -> bool:
+        return self.backend.supports_batching
+
+    @property
+    def chunk_concurrency(self) -> int:
+        """Liczba fragmentów długiego nagrania transkrybowanych jednocześnie"""
+        if not self.backend.thread_safe:
+            # openai-whisper: jeden model nie może obsługiwać kilku wywołań naraz
+            return 1
+        return max(1, WHISPER_CHUNK_WORKERS)
+
+    def _should_chunk(self, audio: np.ndarray) -> bool:
+        if WHISPER_CHUNK_MIN_SECONDS <= 0:
+            return False
+        # Fragment nigdy nie może sam zakwalifikować się do ponownego podziału
+        min_seconds = max(WHISPER_CHUNK_MIN_SECONDS, WHISPER_CHUNK_SECONDS * 1.5)
+        return len(audio) / TARGET_SAMPLE_RATE > min_seconds
+
+    def _transcribe_chunked(
+        self, audio_file_path: Path, audio: np.ndarray, max_retries: int
+    ) -> Optional[Dict]:
+        """Transkrypcja długiego nagrania we fragmentach ciętych w pauzach
+
+        Każdy fragment ma własne ponowne próby, więc błąd nie restartuje całego pliku.
+        """
+        chunks = plan_chunks(audio, TARGET_SAMPLE_RATE, WHISPER_CHUNK_SECONDS, WHISPER_CHUNK_OVERLAP_SECONDS)
+        checkpoint = self._checkpoint_for(audio, chunks)
+        completed = checkpoint.load() if checkpoint else {}
+        pending = [chunk for chunk in chunks if chunk.index not in completed]
+        workers = max(1, min(self.chunk_concurrency, len(pending)))
+        logger.info(
+            "Transkrypcja %s we fragmentach: %d fragmentów (%d z checkpointu), %d jednocześnie",
+            audio_file_path.name,
+            len(chunks),
+            len(completed),
+            workers,
+        )
+
+        def transcribe_chunk(chunk):
+            result = self.transcribe_audio(audio_file_path, max_retries, audio=audio[chunk.start:chunk.end])
+            if result is not None and checkpoint:
+                checkpoint.save_chunk(chunk.index, result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunk") as executor:
+            futures = {chunk.index: executor.submit(transcribe_chunk, chunk) for chunk in pending}
+            results = [
+                completed[chunk.index] if chunk.index in completed else futures[chunk.index].result()
+                for chunk in chunks
+            ]
+
+        failed = [chunk.index for chunk, result in zip(chunks, results) if result is None]
+        if failed:
+            logger.error(
+                f"Transkrypcja {audio_file_path.name} nieudana – fragmenty bez wyniku: {failed}"
+            )
+            return None
+
+        segments = stitch_segments(chunks, [result["segments"] for result in results], TARGET_SAMPLE_RATE)
+        if checkpoint:
+            checkpoint.clear()
+        return {
+            "text": "".join(segment.get("text", "") for segment in segments).strip(),
+            "segments": segments,
+        }
+
+    def settings_fingerprint(self) -> str:
+        """Ustawienia wpływające na wynik transkrypcji (część kluczy checkpointu i cache)"""
+        compute_type = getattr(self.backend, "compute_type", "")
+        return (
+            f"{self.backend.name}|{self.model_name}|{compute_type}|pl|transcribe"
+            f"|vad={int(self.vad_enabled)}|chunk={WHISPER_CHUNK_MIN_SECONDS:g}/{WHISPER_CHUNK_SECONDS:g}"
+        )
+
+    def _checkpoint_for(self, audio: np.ndarray, chunks) -> Optional[TranscriptionCheckpoint]:
+        """Checkpoint nagrania – klucz zależy od treści PCM, modelu i ustawień transkrypcji"""
+        if not self.checkpoint_enabled:
+            return None
+        purge_stale_checkpoints()
+        settings_hash = hashlib.blake2b(self.settings_fingerprint().encode("utf-8"), digest_size=4).hexdigest()
+        key = f"{pcm_hash(audio)}-{settings_hash}"
+        return TranscriptionCheckpoint(key, chunks)
+
+    def _speech_only(self, audio: np.ndarray) -> Tuple[np.ndarray, Optional[SpeechTimeline]]:
+        """Wycięcie ciszy przez VAD; zwraca bufor z samą mową i oś czasu do przeliczeń"""
+        if not self.vad_enabled:
+            return audio, None
+        timeline = detect_speech(audio)
+        if timeline.has_speech and timeline.speech_ratio > 0.95:
+            # Prawie całe nagranie to mowa – sklejanie nic nie da
+            return audio, None
+        logger.info(
+            "VAD: do transkrypcji trafia %.0f%% nagrania (%d fragmentów mowy)",
+            timeline.speech_ratio * 100,
+            len(timeline.regions),
+        )
+        return timeline.compact(audio), timeline
+
+    def transcribe_batch(self, audios: List[np.ndarray]) -> List[Optional[Dict]]:
+        """Wsadowa transkrypcja krótkich nagrań (okna 30 s z wielu plików w jednym przebiegu)
+
+        Dla każdego nagrania zwraca ``{"text", "segments"}`` albo None, gdy któreś
+        z jego okien wymaga zwykłej transkrypcji (niska pewność dekodowania).
+        """
+        prepared = [self._speech_only(audio) for audio in audios]
+        window_size = whisper.audio.N_SAMPLES
+        windows: List[np.ndarray] = []
+        owners: List[int] = []
+        for index, (audio, timeline) in enumerate(prepared):
+            if timeline is not None and not timeline.has_speech:
+                continue
+            for offset in range(0, max(1, len(audio)), window_size):
+                windows.append(audio[offset:offset + window_size])
+                owners.append(index)
+
+        window_results = self.backend.transcribe_batch(windows, language="pl")
+
+        merged: List[Optional[Dict]] = [{"text": "", "segments": []} for _ in audios]
+        window_offsets = [0.0] * len(audios)
+        for owner, window, result in zip(owners, windows, window_results):
+            current = merged[owner]
+            offset = window_offsets[owner]
+            window_offsets[owner] = offset + len(window) / whisper.audio.SAMPLE_RATE
+            if current is None:
+                continue
+            if result is None:
+                merged[owner] = None
+                continue
+            for segment in result["segments"]:
+                segment = dict(segment)
+                segment["id"] = len(current["segments"])
+                segment["seek"] = int(offset * 100)
+                segment["start"] += offset
+                segment["end"] += offset
+                current["segments"].append(segment)
+            current["text"] += result["text"]
+
+        for result, (_, timeline) in zip(merged, prepared):
+            if result is not None:
+                result["text"] = result["text"].strip()
+                if timeline is not None:
+                    result["segments"] = timeline.remap_segments(result["segments"])
+        return merged
+
     def encrypt_file(self, file_path: Path) -> bytes:
         """Szyfrowanie pliku tymczasowego dla bezpieczeństwa"""
         with open(file_path, 'rb') as f:
@@ -84,44 +283,86 @@ class WhisperTranscriber:
         with open(output_path, 'wb') as f:
             f.write(decrypted_data)
     
-    def transcribe_audio(self, audio_file_path: Path, max_retries: int = 3) -> Optional[Dict]:
-        """Transkrypcja pliku audio na tekst z obsługą błędów"""
+    def decode_audio(self, audio_file_path: Path) -> np.ndarray:
+        """Jednorazowe dekodowanie pliku do PCM float32 (16 kHz, mono) w formacie Whisper"""
+        return whisper.load_audio(str(audio_file_path))
+
+    def _run_model(self, audio: Union[np.ndarray, str]) -> Dict[str, Any]:
+        """Wywołanie silnika transkrypcji na buforze PCM lub ścieżce do pliku"""
+        return self.backend.transcribe(audio, language="pl")  # Język polski
+
+    def _transcribe_via_temp_file(self, audio_file_path: Path, encrypted_data: bytes) -> Dict[str, Any]:
+        """Stary tryb: odszyfrowanie do pliku tymczasowego i transkrypcja ze ścieżki"""
+        safe_suffix = audio_file_path.suffix if audio_file_path.suffix else ".tmp"
+        with tempfile.NamedTemporaryFile(suffix=safe_suffix, delete=False) as temp_file:
+            temp_path = Path(temp_file.name)
+        try:
+            self.decrypt_file(encrypted_data, temp_path)
+            return self._run_model(str(temp_path))
+        finally:
+            # Usunięcie tymczasowego pliku (również po błędzie transkrypcji)
+            temp_path.unlink(missing_ok=True)
+
+    def transcribe_audio(
+        self,
+        audio_file_path: Path,
+        max_retries: int = 3,
+        audio: Optional[np.ndarray] = None,
+    ) -> Optional[Dict]:
+        """Transkrypcja pliku audio na tekst z obsługą błędów
+
+        W trybie w pamięci (``WHISPER_IN_MEMORY_AUDIO``) plik jest dekodowany tylko raz,
+        a kolejne próby korzystają z tego samego bufora PCM. Gotowy bufor można też
+        przekazać w argumencie ``audio`` – wtedy plik nie jest w ogóle czytany.
+        """
         
-        if not self.model:
+        if not self.is_loaded:
             logger.error("Model Whisper nie został załadowany")
             return None
+
+        use_memory = self.in_memory_audio or audio is not None
+        encrypted_data: Optional[bytes] = None
+        timeline: Optional[SpeechTimeline] = None
+        vad_applied = False
         
         for attempt in range(max_retries):
             try:
                 logger.info(f"Transkrypcja pliku: {audio_file_path.name} (próba {attempt + 1}/{max_retries})")
                 
-                # Szyfrowanie pliku tymczasowego
-                encrypted_data = self.encrypt_file(audio_file_path)
-                
-                # Utworzenie tymczasowego pliku do przetwarzania
-                safe_suffix = audio_file_path.suffix if audio_file_path.suffix else ".tmp"
-                with tempfile.NamedTemporaryFile(suffix=safe_suffix, delete=False) as temp_file:
-                    temp_path = Path(temp_file.name)
-                    self.decrypt_file(encrypted_data, temp_path)
-                    
-                    # Transkrypcja z modelem large-v3 dla najwyższej dokładności
-                    result = self.model.transcribe(
-                        str(temp_path),
-                        language="pl",  # Język polski
-                        task="transcribe",
-                        fp16=self._fp16,
-                    )
-                    
-                    # Usunięcie tymczasowego pliku
-                    temp_path.unlink()
+                if use_memory:
+                    if audio is None:
+                        audio = self.decode_audio(audio_file_path)
+                        logger.debug(
+                            "Zdekodowano audio do pamięci: %d próbek (%.1f MB)",
+                            len(audio),
+                            audio.nbytes / (1024 * 1024),
+                        )
+                    if not vad_applied and self._should_chunk(audio):
+                        return self._transcribe_chunked(audio_file_path, audio, max_retries)
+                    if not vad_applied:
+                        audio, timeline = self._speech_only(audio)
+                        vad_applied = True
+                    if timeline is not None and not timeline.has_speech:
+                        logger.info(f"VAD: brak mowy w nagraniu {audio_file_path.name} – pominięto transkrypcję")
+                        return {"text": "", "segments": []}
+                    result = self._run_model(audio)
+                else:
+                    # Szyfrowanie kopii pliku – wykonywane raz, ponawiane próby korzystają z kopii
+                    if encrypted_data is None:
+                        encrypted_data = self.encrypt_file(audio_file_path)
+                    result = self._transcribe_via_temp_file(audio_file_path, encrypted_data)
                 
                 transcribed_text = result["text"].strip()
                 logger.info(f"Transkrypcja zakończona pomyślnie: {audio_file_path.name}")
                 logger.info(f"Długość tekstu: {len(transcribed_text)} znaków")
                 
+                segments = result.get("segments", [])
+                if timeline is not None:
+                    segments = timeline.remap_segments(segments)
+                
                 return {
                     "text": transcribed_text,
-                    "segments": result.get("segments", [])
+                    "segments": segments
                 }
                 
             except Exception as e:
@@ -132,4 +373,142 @@ class WhisperTranscriber:
                     logger.error(f"Wszystkie próby transkrypcji nieudane dla: {audio_file_path.name}")
                     return None
         
-        return None 
\ No newline at end of file
+        return None 
+
+
+# Transkrypcja załadowana w procesie roboczym puli (jeden model na proces)
+_WORKER_TRANSCRIBER: Optional[WhisperTranscriber] = None
+_WORKER_INIT_ERROR: Optional[str] = None
+_WORKER_READY_BARRIER = None
+
+# Maksymalny czas oczekiwania procesu na załadowanie modelu w pozostałych procesach puli
+WORKER_READY_TIMEOUT = 900.0
+
+
+def _init_transcriber_worker(model_name: str, num_threads: int, ready_barrier=None) -> None:
+    """Inicjalizacja procesu roboczego: ograniczenie wątków i jednorazowe załadowanie modelu"""
+    global _WORKER_TRANSCRIBER, _WORKER_INIT_ERROR, _WORKER_READY_BARRIER
+    _WORKER_READY_BARRIER = ready_barrier
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    transcriber = WhisperTranscriber()
+    try:
+        transcriber.load_model(model_name)
+    except Exception as e:  # błąd w initializerze zepsułby całą pulę
+        _WORKER_INIT_ERROR = str(e)
+        return
+    _WORKER_TRANSCRIBER = transcriber
+
+
+def _transcriber_worker_ready() -> Optional[str]:
+    """Zwraca komunikat błędu inicjalizacji procesu lub None gdy model jest gotowy
+
+    Z barierą puli zadanie czeka, aż każdy proces odbierze swoje zadanie gotowości –
+    proces nie może obsłużyć dwóch, więc sprawdzone zostają wszystkie procesy.
+    """
+    if _WORKER_READY_BARRIER is not None:
+        try:
+            _WORKER_READY_BARRIER.wait(WORKER_READY_TIMEOUT)
+        except threading.BrokenBarrierError:
+            return "Nie wszystkie procesy puli transkrypcji uruchomiły się na czas"
+    if _WORKER_TRANSCRIBER is None:
+        return _WORKER_INIT_ERROR or "Model Whisper nie został załadowany w procesie roboczym"
+    return None
+
+
+def _transcribe_in_worker(audio: Union[SharedAudioHandle, str]) -> Dict[str, Any]:
+    """Transkrypcja w procesie roboczym (bufor z pamięci współdzielonej lub ścieżka)"""
+    if _WORKER_TRANSCRIBER is None:
+        raise RuntimeError(_transcriber_worker_ready())
+    if isinstance(audio, str):
+        return _WORKER_TRANSCRIBER._run_model(audio)
+
+    shm, samples = audio.attach()
+    try:
+        # Whisper tworzy z bufora własny tensor, więc nie trzymamy referencji do segmentu
+        return _WORKER_TRANSCRIBER._run_model(samples)
+    finally:
+        del samples
+        release_shared_segment(shm)
+
+
+class ProcessPoolTranscriber(WhisperTranscriber):
+    """Transkrypcja w puli procesów – każdy proces trzyma własny model Whisper
+
+    Zamiast jednego modelu współdzielonego przez wątki (GIL, jeden zestaw wątków
+    PyTorch) uruchamia ``num_workers`` procesów po ``threads_per_worker`` wątków.
+    PCM trafia do procesów przez pamięć współdzieloną, a logika ponownych prób
+    pozostaje w procesie głównym.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        threads_per_worker: int = 1,
+        in_memory_audio: bool = WHISPER_IN_MEMORY_AUDIO,
+    ):
+        super().__init__(in_memory_audio=in_memory_audio)
+        self.num_workers = max(1, num_workers)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def supports_batching(self) -> bool:
+        # Modele są w procesach roboczych – wsad z procesu głównego nie jest możliwy
+        return False
+
+    @property
+    def chunk_concurrency(self) -> int:
+        # Fragmenty trafiają do osobnych procesów z własnymi modelami
+        return WHISPER_CHUNK_WORKERS or self.num_workers
+
+    def load_model(self, model_name: str = "large-v3") -> None:
+        """Uruchomienie procesów roboczych i załadowanie w nich modelu Whisper"""
+        self.shutdown()
+        self.model_name = model_name
+        logger.info(
+            "Uruchamianie puli transkrypcji: %d procesów × %d wątków (model: %s)",
+            self.num_workers,
+            self.threads_per_worker,
+            model_name,
+        )
+        context = multiprocessing.get_context("spawn")
+        # Bariera przekazywana przy starcie procesów – każdy proces obsługuje dokładnie
+        # jedno zadanie gotowości, więc model ładuje się w każdym z nich przed pierwszym plikiem
+        ready_barrier = context.Barrier(self.num_workers)
+        executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=context,
+            initializer=_init_transcriber_worker,
+            initargs=(model_name, self.threads_per_worker, ready_barrier),
+        )
+        try:
+            checks = [executor.submit(_transcriber_worker_ready) for _ in range(self.num_workers)]
+            errors = [error for error in (check.result() for check in checks) if error]
+        except Exception as e:
+            errors = [str(e)]
+        if errors:
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.error(f"Błąd podczas ładowania modelu Whisper w puli procesów: {errors[0]}")
+            raise RuntimeError(errors[0])
+        self._executor = executor
+        logger.info("Pula transkrypcji gotowa")
+
+    def _run_model(self, audio: Union[np.ndarray, str]) -> Dict[str, Any]:
+        """Przekazanie zadania do wolnego procesu roboczego"""
+        if self._executor is None:
+            raise RuntimeError("Pula transkrypcji nie została uruchomiona")
+        if isinstance(audio, str):
+            return self._executor.submit(_transcribe_in_worker, audio).result()
+        with shared_audio(audio) as handle:
+            return self._executor.submit(_transcribe_in_worker, handle).result()
+
+    def shutdown(self) -> None:
+        """Zatrzymanie procesów roboczych"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Moduł z przyrostowym wykrywaniem JSON w strumieniu odpowiedzi
+=============================================================
+
+Zawiera:
+- Śledzenie głębokości nawiasów i stanu łańcuchów znaków fragment po fragmencie
+- Pomijanie sekcji rozumowania modelu (np. <think>…</think>)
+- Wykrywanie końca pierwszego kompletnego obiektu JSON najwyższego poziomu,
+  aby można było zamknąć strumień zamiast czekać na dalszy tekst modelu
+"""
+
+import json
+from typing import List, Optional, Sequence, Tuple
+
+
+class StreamingJsonTracker:
+    """Przyrostowy parser strumienia: kończy się na pierwszym poprawnym obiekcie JSON"""
+
+    def __init__(self, reasoning_tags: Sequence[str] = ()):
+        # Tagi podawane parami (otwierający, zamykający) – jak REASONING_TAGS w konfiguracji
+        self._sections: List[Tuple[str, str]] = [
+            (reasoning_tags[i].lower(), reasoning_tags[i + 1].lower())
+            for i in range(0, len(reasoning_tags) - 1, 2)
+        ]
+        self._max_tag_length = max((len(start) for start, _ in self._sections), default=1)
+        self.text = ""
+        self._pos = 0
+        self._start = -1
+        self._end = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._closing_tag: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        return self._end >= 0
+
+    @property
+    def end(self) -> int:
+        """Pozycja za ostatnim znakiem obiektu JSON (-1 dopóki obiekt nie jest kompletny)"""
+        return self._end
+
+    @property
+    def json_text(self) -> Optional[str]:
+        return self.text[self._start:self._end] if self.complete else None
+
+    def feed(self, chunk: str) -> bool:
+        """Dodaje fragment odpowiedzi; True gdy pierwszy obiekt JSON jest już kompletny"""
+        if self.complete:
+            return True
+        if not chunk:
+            return False
+        self.text += chunk
+        while self._pos < len(self.text):
+            if self._closing_tag is not None:
+                if not self._skip_reasoning():
+                    break
+            elif self._depth == 0:
+                if not self._find_object_start():
+                    break
+            elif self._scan_object():
+                return True
+        return False
+
+    def _skip_reasoning(self) -> bool:
+        index = self.text[self._pos:].lower().find(self._closing_tag)
+        if index < 0:
+            # Zamykający tag może być przecięty granicą fragmentu
+            self._pos = max(self._pos, len(self.text) - len(self._closing_tag) + 1)
+            return False
+        self._pos += index + len(self._closing_tag)
+        self._closing_tag = None
+        return True
+
+    def _find_object_start(self) -> bool:
+        remaining = self.text[self._pos:]
+        brace = remaining.find("{")
+        lowered = remaining.lower()
+        tag_index, closing_tag = -1, None
+        for start_tag, end_tag in self._sections:
+            index = lowered.find(start_tag)
+            if index >= 0 and (tag_index < 0 or index < tag_index):
+                tag_index, closing_tag = index, end_tag
+        if tag_index >= 0 and (brace < 0 or tag_index < brace):
+            self._pos += tag_index
+            self._closing_tag = closing_tag
+            return True
+        if brace < 0:
+            # Zostawiamy koniec bufora – może zawierać początek tagu rozumowania
+            self._pos = max(self._pos, len(self.text) - self._max_tag_length + 1)
+            return False
+        self._start = self._pos + brace
+        self._pos = self._start + 1
+        self._depth = 1
+        self._in_string = False
+        self._escape = False
+        return True
+
+    def _scan_object(self) -> bool:
+        text = self.text
+        for index in range(self._pos, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._close_object(index + 1)
+        self._pos = len(text)
+        return False
+
+    def _close_object(self, end: int) -> bool:
+        try:
+            parsed = json.loads(self.text[self._start:end])
+        except json.JSONDecodeError:
+            parsed = None
+        if isinstance(parsed, dict):
+            self._end = end
+            self._pos = end
+            return True
+        # Nawiasy w zwykłym tekście – szukamy kolejnego obiektu za tym nawiasem
+        self._pos = self._start + 1
+        self._start = -1
+        return False
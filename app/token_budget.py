@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Moduł z budżetem tokenów dla zapytań Ollama
+===========================================
+
+Zawiera:
+- Liczenie tokenów promptu (endpoint tokenizacji lub skalibrowane szacowanie)
+- Kalibrację liczby znaków na token na podstawie prompt_eval_count z odpowiedzi Ollama
+- Dobór num_ctx dla zapytania z ograniczonego zbioru rozmiarów
+"""
+
+import logging
+import math
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Dolna granica kalibracji – chroni przed zaniżonym prompt_eval_count przy nietypowych odpowiedziach
+MIN_CHARS_PER_TOKEN = 1.5
+
+
+class TokenBudget:
+    """Liczy tokeny promptu i dobiera num_ctx, aby prompt i odpowiedź zmieściły się w kontekście"""
+
+    def __init__(
+        self,
+        tokenize: Optional[Callable[[str], Optional[int]]] = None,
+        chars_per_token: float = 3.0,
+        min_context: int = 2048,
+        max_context: int = 16384,
+        response_tokens: int = 1024,
+    ):
+        # tokenize zwraca None, gdy serwer nie obsługuje tokenizacji – wtedy tylko szacujemy
+        self._tokenize = tokenize
+        self.chars_per_token = max(MIN_CHARS_PER_TOKEN, chars_per_token)
+        self.min_context = max(256, min_context)
+        self.max_context = max(self.min_context, max_context)
+        self.response_tokens = max(0, response_tokens)
+        self._lock = threading.Lock()
+
+    @property
+    def max_prompt_tokens(self) -> int:
+        return max(1, self.max_context - self.response_tokens)
+
+    def count(self, text: str) -> int:
+        """Liczba tokenów tekstu (dokładna z serwera lub oszacowana)"""
+        if self._tokenize is not None:
+            try:
+                tokens = self._tokenize(text)
+            except Exception as e:
+                logger.debug(f"Tokenizacja na serwerze nie powiodła się – szacowanie: {e}")
+            else:
+                if tokens is not None:
+                    return tokens
+                logger.info("Serwer Ollama nie udostępnia tokenizacji – liczba tokenów będzie szacowana")
+                self._tokenize = None
+        return self.estimate(text)
+
+    def estimate(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token) if text else 0
+
+    def observe(self, prompt_chars: int, prompt_tokens: int) -> None:
+        """Kalibracja na podstawie prompt_eval_count z odpowiedzi Ollama
+
+        Przyjmujemy tylko zaniżenie liczby znaków na token: przy ponownym użyciu
+        cache KV Ollama raportuje mniej tokenów niż ma prompt, co zawyżałoby proporcję.
+        """
+        if prompt_chars <= 0 or prompt_tokens <= 0:
+            return
+        observed = max(MIN_CHARS_PER_TOKEN, prompt_chars / prompt_tokens)
+        with self._lock:
+            if observed < self.chars_per_token:
+                logger.debug(
+                    "Kalibracja tokenów: %.2f → %.2f znaków na token",
+                    self.chars_per_token,
+                    observed,
+                )
+                self.chars_per_token = observed
+
+    def context_size(self, prompt_tokens: int) -> int:
+        """Najmniejszy rozmiar z ciągu min_context × 2^k mieszczący prompt i odpowiedź
+
+        Ollama przeładowuje model przy każdej zmianie num_ctx, więc rozmiary są
+        zaokrąglane do kilku stałych wartości zamiast dokładnej liczby tokenów.
+        """
+        needed = prompt_tokens + self.response_tokens
+        size = self.min_context
+        while size < needed and size < self.max_context:
+            size *= 2
+        return min(size, self.max_context)
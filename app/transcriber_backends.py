@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Moduł z silnikami transkrypcji
+==============================
+
+Zawiera:
+- Wspólny interfejs silnika transkrypcji (TranscriberBackend)
+- Silnik openai-whisper (PyTorch)
+- Silnik faster-whisper (CTranslate2, obliczenia int8 na CPU)
+- Wsadowe dekodowanie 30-sekundowych okien (openai-whisper)
+
+Każdy silnik zwraca wynik w formacie {"text", "segments", "language"}
+oczekiwanym przez ResultSaver i SimpleSpeakerDiarizer.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import torch
+import whisper
+
+try:
+    from faster_whisper import WhisperModel
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Progi jakości jak w whisper.transcribe – okno poniżej progu wraca do pełnej transkrypcji
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+class TranscriberBackend(ABC):
+    """Interfejs silnika transkrypcji"""
+
+    name = "base"
+    supports_batching = False
+    # Czy model można wywoływać jednocześnie z wielu wątków
+    thread_safe = False
+
+    def __init__(self):
+        self.model: Any = None
+        self.device = "cpu"
+
+    @property
+    def fp16(self) -> bool:
+        return False
+
+    @abstractmethod
+    def load(self, model_name: str, download_root: Path, device: str) -> None:
+        """Ładowanie modelu na wskazane urządzenie"""
+
+    @abstractmethod
+    def transcribe(self, audio: Union[np.ndarray, str], language: str) -> Dict[str, Any]:
+        """Transkrypcja bufora PCM (16 kHz, float32) lub pliku"""
+
+    def transcribe_batch(self, windows: List[np.ndarray], language: str) -> List[Optional[Dict[str, Any]]]:
+        """Transkrypcja wielu okien (≤ 30 s) w jednym przebiegu modelu
+
+        Zwraca wynik dla każdego okna (czasy segmentów względem początku okna)
+        lub None, jeśli okno wymaga pełnej transkrypcji (np. niska pewność).
+        """
+        raise NotImplementedError(f"Silnik {self.name} nie obsługuje dekodowania wsadowego")
+
+
+class OpenAIWhisperBackend(TranscriberBackend):
+    """Silnik openai-whisper (fp32 na CPU, fp16 na GPU)"""
+
+    name = "openai"
+    supports_batching = True
+
+    @property
+    def fp16(self) -> bool:
+        return self.device != "cpu"
+
+    def load(self, model_name: str, download_root: Path, device: str) -> None:
+        self.device = device
+        self.model = whisper.load_model(model_name, download_root=str(download_root), device=device)
+
+    def transcribe(self, audio: Union[np.ndarray, str], language: str) -> Dict[str, Any]:
+        return self.model.transcribe(
+            audio,
+            language=language,
+            task="transcribe",
+            fp16=self.fp16,
+        )
+
+    def transcribe_batch(self, windows: List[np.ndarray], language: str) -> List[Optional[Dict[str, Any]]]:
+        n_mels = self.model.dims.n_mels
+        mel = torch.stack(
+            [
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(np.asarray(window, dtype=np.float32)), n_mels=n_mels)
+                for window in windows
+            ]
+        ).to(self.model.device)
+        options = whisper.DecodingOptions(language=language, task="transcribe", fp16=self.fp16)
+        results = whisper.decode(self.model, mel, options)
+        tokenizer = whisper.tokenizer.get_tokenizer(
+            self.model.is_multilingual,
+            num_languages=self.model.num_languages,
+            language=language,
+            task="transcribe",
+        )
+
+        outputs: List[Optional[Dict[str, Any]]] = []
+        for window, result in zip(windows, results):
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                outputs.append({"text": "", "segments": []})
+                continue
+            if (
+                result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+                or result.avg_logprob < LOGPROB_THRESHOLD
+            ):
+                # Pełna transkrypcja ponowi dekodowanie z wyższą temperaturą
+                outputs.append(None)
+                continue
+            duration = len(window) / whisper.audio.SAMPLE_RATE
+            segments = split_timestamp_tokens(result.tokens, tokenizer, duration)
+            for segment in segments:
+                segment.update(
+                    {
+                        "temperature": result.temperature,
+                        "avg_logprob": result.avg_logprob,
+                        "compression_ratio": result.compression_ratio,
+                        "no_speech_prob": result.no_speech_prob,
+                    }
+                )
+            outputs.append({"text": "".join(segment["text"] for segment in segments), "segments": segments})
+        return outputs
+
+
+def split_timestamp_tokens(tokens: List[int], tokenizer, duration: float) -> List[Dict[str, Any]]:
+    """Podział tokenów z jednego okna na segmenty według tokenów czasu <|t|>"""
+    timestamp_begin = tokenizer.timestamp_begin
+    segments: List[Dict[str, Any]] = []
+    start: Optional[float] = None
+    text_tokens: List[int] = []
+
+    def emit(end: float) -> None:
+        segment_start = start if start is not None else (segments[-1]["end"] if segments else 0.0)
+        segments.append(
+            {
+                "start": segment_start,
+                "end": max(segment_start, min(end, duration)),
+                "text": tokenizer.decode(text_tokens),
+                "tokens": list(text_tokens),
+            }
+        )
+
+    for token in tokens:
+        if token >= timestamp_begin:
+            time = (token - timestamp_begin) * 0.02
+            if text_tokens:
+                emit(time)
+                text_tokens = []
+                start = None
+            else:
+                start = time
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+
+    if text_tokens:
+        emit(duration)
+    return segments
+
+
+class FasterWhisperBackend(TranscriberBackend):
+    """Silnik faster-whisper (CTranslate2) z kwantyzacją int8"""
+
+    name = "faster-whisper"
+    thread_safe = True
+
+    def __init__(self, compute_type: str = "auto", num_workers: int = 1):
+        super().__init__()
+        self.compute_type = compute_type
+        self.num_workers = max(1, num_workers)
+
+    def _resolve_compute_type(self, device: str) -> str:
+        if self.compute_type and self.compute_type != "auto":
+            return self.compute_type
+        return "int8" if device == "cpu" else "float16"
+
+    def load(self, model_name: str, download_root: Path, device: str) -> None:
+        if not FASTER_WHISPER_AVAILABLE:
+            raise RuntimeError("Pakiet faster-whisper nie jest zainstalowany")
+        self.device = device
+        compute_type = self._resolve_compute_type(device)
+        logger.info("faster-whisper: typ obliczeń %s", compute_type)
+        self.model = WhisperModel(
+            model_name,
+            device=device,
+            compute_type=compute_type,
+            download_root=str(download_root),
+            # Respektuje limit wątków ustawiony dla procesu (torch.set_num_threads)
+            cpu_threads=torch.get_num_threads(),
+            # Liczba równoległych wywołań transcribe (np. fragmentów długiego nagrania)
+            num_workers=self.num_workers,
+        )
+
+    def transcribe(self, audio: Union[np.ndarray, str], language: str) -> Dict[str, Any]:
+        segments_iter, info = self.model.transcribe(audio, language=language, task="transcribe")
+        segments = [
+            {
+                "id": segment.id,
+                "seek": segment.seek,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "tokens": list(segment.tokens),
+                "temperature": segment.temperature,
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob,
+            }
+            for segment in segments_iter
+        ]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+
+
+def create_backend(name: str, compute_type: str = "auto", num_workers: int = 1) -> TranscriberBackend:
+    """Tworzy silnik o podanej nazwie (z powrotem do openai-whisper gdy niedostępny)"""
+    normalized = (name or "openai").strip().lower().replace("_", "-")
+    if normalized in {"faster-whisper", "ctranslate2"}:
+        if FASTER_WHISPER_AVAILABLE:
+            return FasterWhisperBackend(compute_type, num_workers=num_workers)
+        logger.warning("faster-whisper nie jest dostępny – używam openai-whisper")
+    elif normalized != "openai":
+        logger.warning("Nieznany silnik transkrypcji '%s' – używam openai-whisper", name)
+    return OpenAIWhisperBackend()
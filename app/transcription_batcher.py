@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Moduł z wsadową transkrypcją krótkich nagrań
+============================================
+
+Zawiera:
+- Kolejkę żądań transkrypcji z wielu wątków pipeline
+- Zbieranie okien 30 s z kilku plików w jeden wsad (limit rozmiaru i czasu)
+- Rozdzielanie wyników wsadu z powrotem na pliki
+- Powrót do zwykłej transkrypcji dla długich nagrań i okien o niskiej pewności
+"""
+
+import logging
+import math
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional
+
+import numpy as np
+
+from .decoded_audio import TARGET_SAMPLE_RATE
+from .speech_transcriber import WhisperTranscriber
+
+logger = logging.getLogger(__name__)
+
+# Długość okna Whisper w sekundach
+WINDOW_SECONDS = 30.0
+
+# Co ile sprawdzać, czy jeszcze ktoś może dołączyć do zbieranego wsadu
+POLL_SECONDS = 0.01
+
+# Znacznik zatrzymania wątku wsadowego
+_STOP = object()
+
+
+class _BatchRequest:
+    def __init__(self, audio_file_path: Path, audio: np.ndarray):
+        self.audio_file_path = audio_file_path
+        self.audio = audio
+        self.windows = max(1, math.ceil(len(audio) / (WINDOW_SECONDS * TARGET_SAMPLE_RATE)))
+        self.result: Optional[Dict] = None
+        self.done = threading.Event()
+
+
+class TranscriptionBatcher:
+    """Zbiera krótkie nagrania z wielu wątków i transkrybuje je wspólnym wsadem"""
+
+    def __init__(
+        self,
+        transcriber: WhisperTranscriber,
+        max_batch_size: int,
+        max_wait_seconds: float = 0.2,
+        max_audio_seconds: float = WINDOW_SECONDS,
+        model_limit: Optional[Callable[[], ContextManager]] = None,
+        active_jobs: Optional[Callable[[], int]] = None,
+    ):
+        self.transcriber = transcriber
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self.max_audio_seconds = max_audio_seconds
+        # Blokada modelu – wsad i zwykłe transkrypcje nie mogą używać modelu jednocześnie
+        self._model_limit = model_limit or nullcontext
+        # Liczba zadań, które mogą wywołać transcribe (np. zadania w etapie audio);
+        # None – nie wiadomo, więc wsad zawsze czeka max_wait_seconds na kolejne pliki
+        self._active_jobs = active_jobs
+        self._single_calls = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        # Żądanie, które nie zmieściło się w poprzednim wsadzie – zaczyna kolejny (tylko wątek wsadowy)
+        self._pending: Optional[_BatchRequest] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._accepting = True
+
+    def transcribe(self, audio_file_path: Path, audio: Optional[np.ndarray] = None) -> Optional[Dict]:
+        """Transkrypcja pliku – krótkie nagrania trafiają do wsadu, pozostałe bezpośrednio do modelu"""
+        if audio is None or not self._accepts(audio) or not self._others_expected(1):
+            # Brak innych plików, które mogłyby dołączyć – bez czekania na wsad
+            return self._transcribe_single(audio_file_path, audio)
+
+        request = _BatchRequest(audio_file_path, audio)
+        with self._lock:
+            queued = self._accepting
+            if queued:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="transcribe-batch", daemon=True)
+                    self._thread.start()
+                self._queue.put(request)
+        if not queued:
+            return self._transcribe_single(audio_file_path, audio)
+        request.done.wait()
+        if request.result is None:
+            # Niska pewność lub błąd wsadu – zwykła transkrypcja z ponownymi próbami
+            return self._transcribe_single(audio_file_path, audio)
+        return request.result
+
+    def shutdown(self) -> None:
+        """Zatrzymanie wątku wsadowego (po obsłużeniu oczekujących żądań)"""
+        with self._lock:
+            self._accepting = False
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _accepts(self, audio: np.ndarray) -> bool:
+        return (
+            self._accepting
+            and self.max_batch_size > 1
+            and self.transcriber.supports_batching
+            and len(audio) / TARGET_SAMPLE_RATE <= self.max_audio_seconds
+        )
+
+    def _others_expected(self, accounted: int) -> bool:
+        """Czy poza ``accounted`` plikami (wsad lub wywołujący) ktoś jeszcze może dołączyć do wsadu"""
+        if self._active_jobs is None:
+            return True
+        with self._lock:
+            single_calls = self._single_calls
+        return self._active_jobs() - single_calls > accounted
+
+    def _transcribe_single(self, audio_file_path: Path, audio: Optional[np.ndarray]) -> Optional[Dict]:
+        with self._lock:
+            self._single_calls += 1
+        try:
+            with self._model_limit():
+                return self.transcriber.transcribe_audio(audio_file_path, audio=audio)
+        finally:
+            with self._lock:
+                self._single_calls -= 1
+
+    def _collect_batch(self, first: _BatchRequest) -> List[_BatchRequest]:
+        batch = [first]
+        windows = first.windows
+        deadline = time.monotonic() + self.max_wait_seconds
+        while windows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._queue.empty() and not self._others_expected(len(batch))):
+                break
+            if self._active_jobs is not None:
+                remaining = min(remaining, POLL_SECONDS)
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                # Zatrzymanie obsłużymy po bieżącym wsadzie
+                self._queue.put(_STOP)
+                break
+            if windows + item.windows > self.max_batch_size:
+                # Nie mieści się – zamyka bieżący wsad i rozpoczyna następny
+                self._pending = item
+                break
+            batch.append(item)
+            windows += item.windows
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            item, self._pending = self._pending, None
+            if item is None:
+                item = self._queue.get()
+            if item is _STOP:
+                return
+            self._run_batch(self._collect_batch(item))
+
+    def _run_batch(self, batch: List[_BatchRequest]) -> None:
+        try:
+            if len(batch) == 1:
+                # Pojedyncze nagranie – zwykła ścieżka z fallbackiem temperatury
+                results: List[Optional[Dict]] = [None]
+            else:
+                with self._model_limit():
+                    results = self.transcriber.transcribe_batch([request.audio for request in batch])
+                logger.info(
+                    "Transkrypcja wsadowa: %d plików (%d okien)",
+                    len(batch),
+                    sum(request.windows for request in batch),
+                )
+        except Exception as e:
+            logger.error(f"Błąd transkrypcji wsadowej – powrót do transkrypcji pojedynczej: {e}")
+            results = [None] * len(batch)
+
+        for request, result in zip(batch, results):
+            request.result = result
+            request.done.set()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Moduł z checkpointami transkrypcji
+==================================
+
+Zawiera funkcje do:
+- Zapisu ukończonych fragmentów transkrypcji do pliku pośredniego (sidecar)
+- Wznawiania transkrypcji od pierwszego brakującego fragmentu
+- Unieważniania checkpointu po zmianie modelu lub podziału na fragmenty
+- Usuwania porzuconych checkpointów
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .chunking import AudioChunk
+from .config import WHISPER_CHECKPOINT_DIR, WHISPER_CHECKPOINT_MAX_AGE_HOURS
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    # Wartości numpy (np. float32) w segmentach
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Nieobsługiwany typ w checkpoincie: {type(value).__name__}")
+
+
+class TranscriptionCheckpoint:
+    """Plik postępu transkrypcji jednego nagrania (klucz: skrót PCM + ustawienia)"""
+
+    def __init__(
+        self,
+        key: str,
+        chunks: Sequence[AudioChunk],
+        directory: Path = WHISPER_CHECKPOINT_DIR,
+    ):
+        self.key = key
+        self.directory = Path(directory)
+        self.path = self.directory / f"{key}.json"
+        self._plan = [[chunk.start, chunk.end] for chunk in chunks]
+        self._completed: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[int, Dict[str, Any]]:
+        """Wczytanie ukończonych fragmentów (pusty słownik gdy brak lub nieaktualny)"""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Uszkodzony checkpoint transkrypcji {self.path.name}: {e}")
+            return {}
+
+        if data.get("key") != self.key or data.get("plan") != self._plan:
+            logger.info("Checkpoint %s nie pasuje do bieżącego podziału – pomijam", self.path.name)
+            return {}
+
+        with self._lock:
+            self._completed = {int(index): result for index, result in data.get("chunks", {}).items()}
+            completed = dict(self._completed)
+        if completed:
+            logger.info(
+                "Wznowienie transkrypcji z checkpointu: %d/%d fragmentów gotowych",
+                len(completed),
+                len(self._plan),
+            )
+        return completed
+
+    def save_chunk(self, index: int, result: Dict[str, Any]) -> None:
+        """Zapis ukończonego fragmentu (atomowa podmiana pliku)"""
+        with self._lock:
+            self._completed[index] = {"text": result.get("text", ""), "segments": result.get("segments", [])}
+            payload = {
+                "key": self.key,
+                "plan": self._plan,
+                "updated": time.time(),
+                "chunks": {str(i): chunk for i, chunk in sorted(self._completed.items())},
+            }
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                temp_path = self.path.with_suffix(".tmp")
+                fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, ensure_ascii=False, default=_json_default)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                # Brak checkpointu nie przerywa transkrypcji
+                logger.warning(f"Nie udało się zapisać checkpointu {self.path.name}: {e}")
+
+    def clear(self) -> None:
+        """Usunięcie checkpointu po udanej transkrypcji"""
+        self.path.unlink(missing_ok=True)
+
+
+def purge_stale_checkpoints(
+    directory: Path = WHISPER_CHECKPOINT_DIR,
+    max_age_hours: float = WHISPER_CHECKPOINT_MAX_AGE_HOURS,
+) -> List[Path]:
+    """Usuwa checkpointy starsze niż ``max_age_hours`` (np. po usuniętych plikach)"""
+    directory = Path(directory)
+    if max_age_hours <= 0 or not directory.exists():
+        return []
+    cutoff = time.time() - max_age_hours * 3600
+    removed = []
+    for path in directory.glob("*.json"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed.append(path)
+        except OSError:
+            continue
+    if removed:
+        logger.info("Usunięto %d nieaktualnych checkpointów transkrypcji", len(removed))
+    return removed
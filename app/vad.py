@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Moduł wykrywania aktywności mowy (VAD)
+======================================
+
+Zawiera funkcje do:
+- Energetycznego wykrywania fragmentów z mową (ramki RMS, próg adaptacyjny)
+- Budowania osi czasu mowy (lista regionów w próbkach)
+- Wycinania ciszy przed transkrypcją
+- Przeliczania znaczników czasu segmentów na czas oryginalnego nagrania
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .config import VAD_MIN_SILENCE_MS, VAD_MIN_SPEECH_MS, VAD_PADDING_MS, VAD_THRESHOLD_DB
+
+logger = logging.getLogger(__name__)
+
+# Długość ramki analizy energii
+FRAME_MS = 30
+
+
+@dataclass
+class SpeechTimeline:
+    """Regiony mowy (w próbkach) w oryginalnym nagraniu"""
+
+    regions: List[Tuple[int, int]]
+    total_samples: int
+    sample_rate: int
+    _compact_starts: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        lengths = np.array([end - start for start, end in self.regions], dtype=np.int64)
+        self._compact_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else np.zeros(0)
+
+    @property
+    def speech_samples(self) -> int:
+        return int(sum(end - start for start, end in self.regions))
+
+    @property
+    def speech_ratio(self) -> float:
+        return self.speech_samples / self.total_samples if self.total_samples else 0.0
+
+    @property
+    def has_speech(self) -> bool:
+        return bool(self.regions)
+
+    def compact(self, samples: np.ndarray) -> np.ndarray:
+        """Sklejenie regionów mowy w jeden bufor (bez ciszy pomiędzy nimi)"""
+        if not self.regions:
+            return samples[:0]
+        return np.concatenate([samples[start:end] for start, end in self.regions])
+
+    def to_original(self, seconds: float) -> float:
+        """Przeliczenie czasu w sklejonym buforze na czas w oryginalnym nagraniu"""
+        if not self.regions:
+            return seconds
+        position = seconds * self.sample_rate
+        index = int(np.searchsorted(self._compact_starts, position, side="right")) - 1
+        index = min(max(index, 0), len(self.regions) - 1)
+        start, end = self.regions[index]
+        original = start + (position - self._compact_starts[index])
+        return float(min(max(original, start), end)) / self.sample_rate
+
+    def remap_segments(self, segments: List[Dict]) -> List[Dict]:
+        """Kopie segmentów Whisper z czasami przeliczonymi na oryginalne nagranie"""
+        remapped = []
+        for segment in segments:
+            segment = dict(segment)
+            segment["start"] = self.to_original(segment.get("start", 0.0))
+            segment["end"] = max(segment["start"], self.to_original(segment.get("end", 0.0)))
+            if segment.get("words"):
+                segment["words"] = [
+                    dict(word, start=self.to_original(word["start"]), end=self.to_original(word["end"]))
+                    for word in segment["words"]
+                ]
+            remapped.append(segment)
+        return remapped
+
+
+def _frame_levels_db(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    num_frames = len(samples) // frame_length
+    if num_frames == 0:
+        return np.zeros(0)
+    frames = samples[: num_frames * frame_length].reshape(num_frames, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """Ciągłe przedziały wartości True jako (początek, koniec) w ramkach"""
+    if not mask.any():
+        return []
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    changes = np.flatnonzero(np.diff(padded))
+    return list(zip(changes[::2], changes[1::2]))
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sample_rate: int = 16000,
+    threshold_db: float = VAD_THRESHOLD_DB,
+    min_silence_ms: int = VAD_MIN_SILENCE_MS,
+    min_speech_ms: int = VAD_MIN_SPEECH_MS,
+    padding_ms: int = VAD_PADDING_MS,
+) -> SpeechTimeline:
+    """Energetyczne VAD: zwraca oś czasu z regionami mowy
+
+    Próg to wyższa z wartości: ``threshold_db`` (dBFS) oraz poziom szumu tła
+    + 10 dB (nie więcej niż 20 dB poniżej głośnych fragmentów). Przerwy krótsze
+    niż ``min_silence_ms`` nie są wycinane, a regiony poszerzane są o ``padding_ms``.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    frame_length = max(1, int(sample_rate * FRAME_MS / 1000))
+    levels = _frame_levels_db(samples, frame_length)
+    if len(levels) == 0:
+        return SpeechTimeline([(0, len(samples))] if len(samples) else [], len(samples), sample_rate)
+
+    noise_floor = np.percentile(levels, 10)
+    loud_level = np.percentile(levels, 90)
+    threshold = max(threshold_db, min(noise_floor + 10.0, loud_level - 20.0))
+    speech = levels > threshold
+
+    # Wypełnienie krótkich przerw (oddech, pauzy między słowami)
+    min_silence_frames = max(1, int(min_silence_ms / FRAME_MS))
+    for start, end in _runs(~speech):
+        if start > 0 and end < len(speech) and end - start < min_silence_frames:
+            speech[start:end] = True
+
+    # Odrzucenie krótkich impulsów (trzaski, kliknięcia)
+    min_speech_frames = max(1, int(min_speech_ms / FRAME_MS))
+    for start, end in _runs(speech):
+        if end - start < min_speech_frames:
+            speech[start:end] = False
+
+    padding = int(sample_rate * padding_ms / 1000)
+    regions: List[Tuple[int, int]] = []
+    for start, end in _runs(speech):
+        region_start = max(0, start * frame_length - padding)
+        region_end = len(samples) if end == len(speech) else min(len(samples), end * frame_length + padding)
+        if regions and region_start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], region_end))
+        else:
+            regions.append((region_start, region_end))
+
+    timeline = SpeechTimeline(regions, len(samples), sample_rate)
+    logger.debug(
+        "VAD: %d regionów mowy, %.0f%% nagrania (próg %.1f dBFS)",
+        len(regions),
+        timeline.speech_ratio * 100,
+        threshold,
+    )
+    return timeline
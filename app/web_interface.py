@@ -5,7 +5,6 @@ Moduł z prostym interfejsem Flask do dodawania i podglądu plików.
 from __future__ import annotations
 
 import logging
-import threading
 from functools import wraps
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -113,7 +112,11 @@ def create_web_app(
                         )
                         manual_files["processed_audio"] = processed_name
                     if manual_files:
-                        processing_queue.mark_completed(queue_item.id, manual_files)
+                        processing_queue.mark_completed(
+                            queue_item.id,
+                            manual_files,
+                            preprocessing=result.get("preprocessing"),
+                        )
                 else:
                     processing_queue.mark_failed(
                         queue_item.id,
@@ -124,7 +127,16 @@ def create_web_app(
                 processing_queue.mark_failed(queue_item.id, str(exc))
 
         if asynchronous:
-            threading.Thread(target=_worker, daemon=True).start()
+            # Plik trafia do pipeline procesora – etapy same aktualizują status w kolejce
+            if not processor.submit_file(
+                queue_item.input_path,
+                queue_item_id=queue_item.id,
+                enable_preprocessing=enable_preprocessing,
+            ):
+                processing_queue.mark_failed(
+                    queue_item.id,
+                    "Kolejka przetwarzania jest zamykana – plik nie został przyjęty.",
+                )
         else:
             _worker()
 
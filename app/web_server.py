@@ -47,7 +47,10 @@ def main():
     )
 
     logger.info("Uruchamiam serwer Flask na %s:%s", WEB_HOST, WEB_PORT)
-    flask_app.run(host=WEB_HOST, port=WEB_PORT, debug=False, threaded=True)
+    try:
+        flask_app.run(host=WEB_HOST, port=WEB_PORT, debug=False, threaded=True)
+    finally:
+        processor.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Moduł z pulą wątków roboczych do przetwarzania plików
+=====================================================
+
+Zawiera:
+- Stałą pulę wątków zasilaną z ograniczonej kolejki (backpressure)
+- Łagodne zatrzymanie z dokończeniem zadań z kolejki
+- Limity równoległości dla poszczególnych etapów przetwarzania
+"""
+
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Znacznik zatrzymania wątku roboczego
+_STOP = object()
+
+
+class WorkerPool:
+    """Stała pula wątków roboczych zasilana z ograniczonej kolejki zadań"""
+
+    def __init__(self, num_workers: int, queue_size: int = 0, name: str = "worker"):
+        self.num_workers = max(1, num_workers)
+        self.name = name
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(0, queue_size))
+        self._accepting = True
+        self._state_lock = threading.Lock()
+        self._active = 0
+        self._threads: List[threading.Thread] = []
+
+        for index in range(self.num_workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"{name}-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(
+            "WorkerPool '%s' uruchomiony (wątki: %d, pojemność kolejki: %s)",
+            name,
+            self.num_workers,
+            queue_size if queue_size > 0 else "bez limitu",
+        )
+
+    @property
+    def pending(self) -> int:
+        """Liczba zadań oczekujących w kolejce"""
+        return self._queue.qsize()
+
+    @property
+    def active(self) -> int:
+        """Liczba zadań aktualnie wykonywanych"""
+        with self._state_lock:
+            return self._active
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> bool:
+        """
+        Dodaje zadanie do kolejki.
+
+        Jeśli kolejka jest pełna, wywołanie blokuje się (backpressure) – maksymalnie
+        ``timeout`` sekund. Zwraca False gdy pula jest zamykana lub minął limit czasu.
+        """
+        if not self._accepting:
+            logger.warning("WorkerPool '%s' jest zamykany – odrzucono zadanie", self.name)
+            return False
+        try:
+            self._queue.put((fn, args, kwargs), timeout=timeout)
+        except queue.Full:
+            logger.warning("Kolejka WorkerPool '%s' pełna – odrzucono zadanie", self.name)
+            return False
+        return True
+
+    def wait_idle(self) -> None:
+        """Czeka aż wszystkie zadania z kolejki zostaną wykonane"""
+        self._queue.join()
+
+    def shutdown(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        """
+        Zatrzymuje pulę.
+
+        Args:
+            drain: True – dokończ zadania z kolejki; False – porzuć oczekujące zadania
+            timeout: Maksymalny czas oczekiwania na każdy wątek
+        """
+        self._accepting = False
+        if not drain:
+            dropped = 0
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+                dropped += 1
+            if dropped:
+                logger.warning("WorkerPool '%s': porzucono %d oczekujących zadań", self.name, dropped)
+
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        logger.info("WorkerPool '%s' zatrzymany", self.name)
+
+    def _worker_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            fn, args, kwargs = item
+            with self._state_lock:
+                self._active += 1
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                logger.error("Błąd zadania w WorkerPool '%s': %s", self.name, e, exc_info=True)
+            finally:
+                with self._state_lock:
+                    self._active -= 1
+                self._queue.task_done()
+
+
+class StageLimiter:
+    """Limity równoległości dla nazwanych etapów przetwarzania"""
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = {name: max(1, limit) for name, limit in limits.items()}
+        self._semaphores = {
+            name: threading.BoundedSemaphore(limit) for name, limit in self.limits.items()
+        }
+
+    @contextmanager
+    def limit(self, stage: str) -> Iterator[None]:
+        """Blokuje do czasu zwolnienia miejsca w danym etapie (etapy bez limitu przechodzą)"""
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            yield
+            return
+        with semaphore:
+            yield
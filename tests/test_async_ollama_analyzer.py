@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app import async_ollama_analyzer
+from app.async_ollama_analyzer import AsyncOllamaAnalyzer
+from app.http_client import get_session
+
+
+class StreamingResponse(SimpleNamespace):
+    def iter_lines(self, decode_unicode=True):
+        yield from self.lines
+
+    def close(self):
+        pass
+
+
+def _streaming_response(payload: dict) -> StreamingResponse:
+    text = json.dumps(payload)
+    lines = [json.dumps({"response": text[:10], "done": False}), json.dumps({"response": text[10:], "done": True})]
+    return StreamingResponse(status_code=200, lines=lines, text="")
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    # Ścieżka bez httpx: zapytania przez wspólną sesję w puli wątków klienta
+    monkeypatch.setattr(async_ollama_analyzer, "HTTPX_AVAILABLE", False)
+    instance = AsyncOllamaAnalyzer(
+        base_url="http://fake-ollama", model="test-model", max_in_flight=2, deadline_seconds=5
+    )
+    instance.cache = None
+    yield instance
+    instance.close()
+
+
+def test_limits_requests_in_flight(monkeypatch, analyzer):
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def fake_post(url, *, json=None, timeout=None, stream=False):
+        assert stream and json["stream"]
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return _streaming_response({"summary": "ok", "key_points": [], "tone": "formal", "length_category": "short"})
+
+    monkeypatch.setattr(get_session(), "post", fake_post)
+
+    futures = [analyzer.submit(f"Tekst {i}", "general") for i in range(5)]
+    results = [future.result(timeout=5) for future in futures]
+
+    assert all(result["success"] for result in results)
+    assert results[0]["parsed_result"]["summary"] == "ok"
+    assert active["max"] == 2
+
+
+def test_deadline_returns_error_result(monkeypatch, analyzer):
+    analyzer.deadline_seconds = 0.05
+
+    def slow_post(url, *, json=None, timeout=None, stream=False):
+        time.sleep(0.3)
+        return _streaming_response({"summary": "za późno"})
+
+    monkeypatch.setattr(get_session(), "post", slow_post)
+
+    result = analyzer.analyze_content("Tekst", "general")
+
+    assert result["success"] is False
+    assert "limit czasu" in result["error"]
+
+
+def test_prepare_request_runs_off_the_event_loop(monkeypatch, analyzer):
+    threads = []
+    original_prepare = analyzer._prepare_request
+
+    def recording_prepare(*args):
+        threads.append(threading.current_thread().name)
+        return original_prepare(*args)
+
+    monkeypatch.setattr(analyzer, "_prepare_request", recording_prepare)
+    monkeypatch.setattr(
+        get_session(),
+        "post",
+        lambda url, **kwargs: _streaming_response({"summary": "ok", "key_points": [], "tone": "formal", "length_category": "short"}),
+    )
+
+    assert analyzer.analyze_content("Tekst", "general")["success"] is True
+    assert threads and threads[0] != "ollama-async"
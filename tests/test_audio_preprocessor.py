@@ -0,0 +1,217 @@
+import numpy as np
+import pytest
+
+from app.audio_preprocessor import AudioPreprocessor
+
+SR = 16000
+
+
+@pytest.fixture(autouse=True)
+def _spill_dir(tmp_path, monkeypatch):
+    # Pliki robocze preprocessingu blokami trafiają do katalogu testu, nie do cache/ repozytorium
+    from app import decoded_audio
+
+    monkeypatch.setattr(decoded_audio, "DECODED_AUDIO_SPILL_DIR", tmp_path / "spill")
+
+
+def _reference_compressor(audio, sr, ratio=2.0, threshold=0.8, attack=0.005, release=0.1):
+    """Kompresor liczony próbka po próbce (poprzednia implementacja)"""
+    frame_length = max(1, int(sr * 0.01))
+    envelope = np.zeros(len(audio))
+    for i in range(0, len(audio), frame_length):
+        envelope[i:i + frame_length] = np.sqrt(np.mean(audio[i:i + frame_length].astype(np.float64) ** 2))
+    gain = np.ones(len(audio))
+    over = envelope > threshold
+    gain[over] = (threshold + (envelope[over] - threshold) / ratio) / envelope[over]
+
+    attack_coeff = np.exp(-1.0 / (attack * sr))
+    release_coeff = np.exp(-1.0 / (release * sr))
+    smoothed = np.zeros(len(audio))
+    smoothed[0] = gain[0]
+    for i in range(1, len(audio)):
+        coeff = attack_coeff if gain[i] > smoothed[i - 1] else release_coeff
+        smoothed[i] = gain[i] + (smoothed[i - 1] - gain[i]) * coeff
+    return audio * smoothed
+
+
+def _bursts(seconds=3.0):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SR) + 37) / SR
+    level = 0.2 + 1.1 * (np.sin(2 * np.pi * 1.5 * t) > 0.3)
+    return (level * np.sign(np.sin(2 * np.pi * 200 * t)) * rng.uniform(0.8, 1.0, len(t))).astype(np.float32)
+
+
+def test_vectorized_compressor_matches_sample_loop():
+    audio = _bursts()
+    preprocessor = AudioPreprocessor(enabled=False)
+
+    for kwargs in ({}, {"threshold": 0.5, "attack": 0.05, "release": 0.01}):
+        expected = _reference_compressor(audio, SR, **kwargs)
+        result = preprocessor._apply_compressor(audio, SR, **kwargs)
+
+        assert result.shape == audio.shape
+        assert result.dtype == audio.dtype
+        np.testing.assert_allclose(result, expected, atol=1e-5)
+
+
+def test_compressor_leaves_quiet_signal_unchanged():
+    audio = (0.1 * np.sin(2 * np.pi * 300 * np.arange(SR) / SR)).astype(np.float32)
+
+    result = AudioPreprocessor(enabled=False)._apply_compressor(audio, SR)
+
+    np.testing.assert_array_equal(result, audio)
+
+
+def test_streaming_matches_in_memory_chain(tmp_path):
+    import soundfile as sf
+
+    source = tmp_path / "long.wav"
+    sf.write(str(source), _bursts(seconds=4.5), SR, subtype="FLOAT")
+    settings = dict(noise_reduce=False, streaming_min_seconds=0, block_seconds=1, adaptive=False)
+
+    in_memory = AudioPreprocessor(streaming=False, **settings)
+    streamed = AudioPreprocessor(streaming=True, **settings)
+    expected_path, _ = in_memory.process_with_buffer(source, tmp_path / "memory.wav")
+    streamed_path, buffer = streamed.process_with_buffer(source, tmp_path / "stream.wav")
+
+    assert streamed.enabled and streamed_path == tmp_path / "stream.wav"
+    assert buffer is None  # bufor 16 kHz dekoduje pipeline z zapisanego pliku
+    expected, _ = sf.read(str(expected_path))
+    result, sr = sf.read(str(streamed_path))
+    assert sr == SR
+    assert result.shape == expected.shape
+    np.testing.assert_allclose(result, expected, atol=1e-4)
+
+
+def test_streaming_with_noise_reduction_keeps_length(tmp_path):
+    import soundfile as sf
+
+    source = tmp_path / "noisy.wav"
+    rng = np.random.default_rng(1)
+    audio = _bursts(seconds=3.0) * 0.5 + 0.01 * rng.standard_normal(int(3.0 * SR) + 37).astype(np.float32)
+    sf.write(str(source), audio, SR, subtype="FLOAT")
+
+    preprocessor = AudioPreprocessor(streaming=True, streaming_min_seconds=0, block_seconds=1, adaptive=False)
+    output_path, _ = preprocessor.process_with_buffer(source, tmp_path / "out.wav")
+
+    result, _ = sf.read(str(output_path))
+    assert len(result) == len(audio)
+    assert np.isfinite(result).all()
+    assert 0.9 < np.abs(result).max() <= 0.96
+
+
+def test_chain_runs_at_target_rate(tmp_path):
+    import soundfile as sf
+
+    source_sr = 44100
+    t = np.arange(int(2.5 * source_sr)) / source_sr
+    source = tmp_path / "wide.wav"
+    sf.write(str(source), (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), source_sr, subtype="FLOAT")
+    settings = dict(noise_reduce=False, streaming_min_seconds=0, block_seconds=1, sample_rate=SR, adaptive=False)
+
+    memory_path, decoded = AudioPreprocessor(streaming=False, **settings).process_with_buffer(
+        source, tmp_path / "memory.wav"
+    )
+    stream_path, _ = AudioPreprocessor(streaming=True, **settings).process_with_buffer(
+        source, tmp_path / "stream.wav"
+    )
+
+    assert decoded.sample_rate == SR and abs(decoded.duration_seconds - 2.5) < 0.01
+    expected, memory_sr = sf.read(str(memory_path))
+    result, stream_sr = sf.read(str(stream_path))
+    assert memory_sr == stream_sr == SR
+    assert abs(len(result) - len(expected)) <= 1
+    length = min(len(result), len(expected))
+    np.testing.assert_allclose(result[:length], expected[:length], atol=1e-3)
+
+
+def test_noise_profile_is_reused_per_source(tmp_path, monkeypatch):
+    import soundfile as sf
+
+    from app.result_cache import ResultCache
+
+    rng = np.random.default_rng(2)
+    for name in ("trunk7_first.wav", "trunk7_second.wav", "other.wav"):
+        audio = _bursts(seconds=3.0) * (np.arange(int(3.0 * SR) + 37) > SR) + 0.01 * rng.standard_normal(int(3.0 * SR) + 37)
+        sf.write(str(tmp_path / name), audio.astype(np.float32), SR, subtype="FLOAT")
+    cache = ResultCache(tmp_path / "profiles")
+    preprocessor = AudioPreprocessor(
+        streaming=False, noise_profile_cache=cache, noise_source_pattern=r"^(trunk\d+)_", adaptive=False
+    )
+
+    preprocessor.process_with_buffer(tmp_path / "trunk7_first.wav", tmp_path / "out1.wav")
+    assert len(list((tmp_path / "profiles").glob("*.json"))) == 1
+
+    def fail_estimate(*args, **kwargs):
+        raise AssertionError("profil powinien pochodzić z cache")
+
+    monkeypatch.setattr(AudioPreprocessor, "_estimate_noise", staticmethod(fail_estimate))
+    noise_profiles = []
+    original_reduce = AudioPreprocessor._reduce_noise
+    monkeypatch.setattr(
+        AudioPreprocessor,
+        "_reduce_noise",
+        lambda self, audio, sr, noise=None: noise_profiles.append(noise) or original_reduce(self, audio, sr, noise),
+    )
+
+    preprocessor.process_with_buffer(tmp_path / "trunk7_second.wav", tmp_path / "out2.wav")
+    preprocessor.process_with_buffer(tmp_path / "other.wav", tmp_path / "out3.wav")
+
+    assert cache.hits == 1
+    # Najcichsze ramki: sam szum tła z pierwszej sekundy, bez mowy
+    assert noise_profiles[0] is not None and np.abs(noise_profiles[0]).max() < 0.1
+    assert noise_profiles[1] is None  # plik bez prefiksu źródła – profil z całego sygnału
+
+
+def test_clean_recording_skips_preprocessing(tmp_path):
+    import soundfile as sf
+
+    source_sr = 44100
+    t = np.arange(int(2.0 * source_sr)) / source_sr
+    source = tmp_path / "clean.wav"
+    tone = 0.5 * np.sin(2 * np.pi * 440 * t) * (np.sin(2 * np.pi * 1.5 * t) > -0.5)  # mowa z pauzami
+    sf.write(str(source), tone.astype(np.float32), source_sr, subtype="FLOAT")
+
+    path, decoded, report = AudioPreprocessor(streaming=False).process_with_report(source, tmp_path / "out.wav")
+
+    assert path == source and not (tmp_path / "out.wav").exists()
+    assert report["skipped"] and report["stages"] == []
+    assert report["metrics"]["snr_db"] > 60 and report["metrics"]["speech_level_dbfs"] > -10
+    assert decoded.sample_rate == SR and abs(decoded.duration_seconds - 2.0) < 0.01
+
+
+def test_noisy_quiet_recording_selects_stages(tmp_path):
+    import soundfile as sf
+
+    rng = np.random.default_rng(3)
+    speech = _bursts(seconds=4.5) * 0.02 * (np.arange(int(4.5 * SR) + 37) % SR > SR // 2)
+    audio = (speech + 0.003 * rng.standard_normal(len(speech))).astype(np.float32)
+    source = tmp_path / "quiet.wav"
+    sf.write(str(source), audio, SR, subtype="FLOAT")
+
+    for streaming in (False, True):
+        preprocessor = AudioPreprocessor(streaming=streaming, streaming_min_seconds=0, block_seconds=1)
+        path, _, report = preprocessor.process_with_report(source, tmp_path / f"out_{streaming}.wav")
+
+        assert path == tmp_path / f"out_{streaming}.wav"
+        assert not report["skipped"]
+        assert {"noise_reduce", "normalize", "gain"} <= set(report["stages"])
+        assert "eq" not in report["stages"]
+
+
+def test_signal_quality_ignores_noise_above_analysis_band():
+    from scipy import signal
+
+    from app.audio_preprocessor import SignalQuality
+
+    source_sr = 44100
+    t = np.arange(3 * source_sr) / source_sr
+    highpass = signal.butter(8, 12000, "highpass", fs=source_sr, output="sos")
+    hiss = 0.05 * signal.sosfilt(highpass, np.random.default_rng(4).standard_normal(len(t)))
+    audio = 0.5 * np.sin(2 * np.pi * 440 * t) * (np.sin(2 * np.pi * 1.5 * t) > -0.5) + hiss
+
+    quality = SignalQuality(source_sr)
+    quality.add(audio.astype(np.float32))
+
+    # Szum 12–22 kHz nie może wrócić do pasma analizy 0–4 kHz (aliasing)
+    assert quality.metrics()["snr_db"] > 60
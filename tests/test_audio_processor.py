@@ -0,0 +1,160 @@
+import threading
+
+import numpy as np
+
+from app.audio_processor import AudioProcessor
+from app.decoded_audio import DecodedAudio
+from app.result_cache import ResultCache
+
+
+class BlockingDiarizer:
+    def __init__(self, started):
+        self.started = started
+
+    def diarize_speakers(self, path, audio=None):
+        self.started.set()
+        return [{"speaker": "SPEAKER_00", "start": 0.0, "end": 1.0}]
+
+
+class WaitingTranscriber:
+    def __init__(self, diarization_started):
+        self.diarization_started = diarization_started
+        self.overlapped = False
+
+    def transcribe_audio(self, path, audio=None):
+        # Transkrypcja kończy się dopiero, gdy rozpoznawanie mówców już wystartowało
+        self.overlapped = self.diarization_started.wait(timeout=5)
+        return {"text": "tekst", "segments": [{"start": 0.0, "end": 1.0, "text": "tekst"}]}
+
+
+def _make_processor(tmp_path, mode):
+    processor = AudioProcessor(
+        input_folder=tmp_path / "input",
+        output_folder=tmp_path / "output",
+        enable_speaker_diarization=True,
+        enable_ollama_analysis=False,
+    )
+    processor.parallel_diarization = mode
+    processor.transcription_cache = None
+    return processor
+
+
+def test_diarization_runs_concurrently_with_transcription(tmp_path):
+    started = threading.Event()
+    processor = _make_processor(tmp_path, "thread")
+    processor.speaker_diarizer = BlockingDiarizer(started)
+    processor.transcriber = WaitingTranscriber(started)
+    decoded = DecodedAudio(np.zeros(16_000, dtype=np.float32), mmap_threshold_mb=0)
+
+    result = processor.transcribe_audio_with_speakers(tmp_path / "a.wav", decoded)
+    processor.shutdown()
+
+    assert processor.transcriber.overlapped
+    assert result["speakers"] == [{"speaker": "SPEAKER_00", "start": 0.0, "end": 1.0}]
+
+
+def test_diarization_sequential_when_disabled(tmp_path):
+    started = threading.Event()
+    processor = _make_processor(tmp_path, "off")
+    processor.speaker_diarizer = BlockingDiarizer(started)
+    transcriber = WaitingTranscriber(started)
+    processor.transcriber = transcriber
+
+    def transcribe_audio(path, audio=None):
+        assert not started.is_set()
+        return {"text": "tekst", "segments": []}
+
+    transcriber.transcribe_audio = transcribe_audio
+
+    result = processor.transcribe_audio_with_speakers(tmp_path / "a.wav")
+    processor.shutdown()
+
+    assert started.is_set()
+    assert result["speakers"]
+
+
+def test_replacing_transcriber_updates_batcher(tmp_path):
+    processor = _make_processor(tmp_path, "off")
+    transcriber = WaitingTranscriber(threading.Event())
+
+    processor.transcriber = transcriber
+
+    assert processor.transcription_batcher.transcriber is transcriber
+
+
+def test_identical_audio_is_transcribed_once(tmp_path):
+    processor = _make_processor(tmp_path, "off")
+    processor.enable_speaker_diarization = False
+    processor.transcription_cache = ResultCache(tmp_path / "cache")
+    calls = []
+
+    class CountingTranscriber:
+        supports_batching = False
+
+        def settings_fingerprint(self):
+            return "openai|base"
+
+        def transcribe_audio(self, path, audio=None):
+            calls.append(path)
+            return {"text": "tekst", "segments": [{"start": 0.0, "end": 1.0, "text": "tekst"}]}
+
+    processor.transcriber = CountingTranscriber()
+    samples = np.linspace(-0.5, 0.5, 16_000, dtype=np.float32)
+
+    first = processor.transcribe_audio_with_speakers(
+        tmp_path / "a.wav", DecodedAudio(samples.copy(), mmap_threshold_mb=0)
+    )
+    second = processor.transcribe_audio_with_speakers(
+        tmp_path / "kopia.wav", DecodedAudio(samples.copy(), mmap_threshold_mb=0)
+    )
+    processor.shutdown()
+
+    assert len(calls) == 1
+    assert second["segments"] == first["segments"]
+
+
+def test_preprocessed_audio_is_cached_by_original_input(tmp_path):
+    from app.audio_processor import ProcessingJob
+
+    processor = _make_processor(tmp_path, "off")
+    processor.enable_speaker_diarization = False
+    processor.transcription_cache = ResultCache(tmp_path / "cache")
+    calls = []
+
+    class CountingTranscriber:
+        supports_batching = False
+
+        def settings_fingerprint(self):
+            return "openai|base"
+
+        def transcribe_audio(self, path, audio=None):
+            calls.append(path)
+            return {"text": "tekst", "segments": [{"start": 0.0, "end": 1.0, "text": "tekst"}]}
+
+    class VaryingPreprocessor:
+        # Ten sam plik wejściowy, ale inny wynik (np. inny profil szumu z cache)
+        enabled = True
+
+        def __init__(self):
+            self.runs = 0
+
+        def settings_fingerprint(self):
+            return "nr|norm"
+
+        def process_with_report(self, path):
+            self.runs += 1
+            samples = np.full(16_000, 0.1 * self.runs, dtype=np.float32)
+            report = {"skipped": False, "stages": ["noise_reduce"], "input_hash": "oryginal"}
+            return path, DecodedAudio(samples, mmap_threshold_mb=0), report
+
+    processor.transcriber = CountingTranscriber()
+    processor.audio_preprocessor = VaryingPreprocessor()
+    processor.processed_folder = tmp_path / "processed"
+    for name in ("a.wav", "a_ponownie.wav"):
+        source = tmp_path / name
+        source.write_bytes(b"audio")
+        processor._stage_audio(ProcessingJob(original_path=source))
+    processor.shutdown()
+
+    assert processor.audio_preprocessor.runs == 2
+    assert len(calls) == 1
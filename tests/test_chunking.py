@@ -0,0 +1,53 @@
+import numpy as np
+
+from app.chunking import AudioChunk, plan_chunks, stitch_segments
+
+SR = 16000
+
+
+def _speech_with_pauses(blocks, pause_seconds=1.5):
+    parts = []
+    for seconds in blocks:
+        t = np.arange(int(seconds * SR)) / SR
+        parts.append((0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32))
+        parts.append(np.zeros(int(pause_seconds * SR), dtype=np.float32))
+    return np.concatenate(parts)
+
+
+def test_plan_chunks_cuts_in_pauses_without_overlap():
+    audio = _speech_with_pauses([8] * 6)
+
+    chunks = plan_chunks(audio, SR, chunk_seconds=20, overlap_seconds=2)
+
+    assert len(chunks) > 1
+    assert chunks[0].start == 0 and chunks[-1].end == len(audio)
+    for previous, current in zip(chunks, chunks[1:]):
+        # Cięcie w pauzie – fragmenty stykają się bez zakładki
+        assert previous.end == current.start == current.keep_start
+        assert np.max(np.abs(audio[current.start - 100:current.start + 100])) == 0.0
+
+
+def test_plan_chunks_uses_overlap_without_pauses():
+    t = np.arange(60 * SR) / SR
+    audio = (0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+    chunks = plan_chunks(audio, SR, chunk_seconds=20, overlap_seconds=2)
+
+    assert len(chunks) == 3
+    assert chunks[1].start == chunks[1].keep_start - 2 * SR
+    assert chunks[0].end == chunks[0].keep_end + 2 * SR
+
+
+def test_stitch_segments_offsets_and_drops_overlap_duplicates():
+    chunks = [AudioChunk(0, 0, 12 * SR, 0, 10 * SR), AudioChunk(1, 8 * SR, 20 * SR, 10 * SR, 20 * SR)]
+    first = [{"start": 0.0, "end": 5.0, "text": " raz"}, {"start": 8.5, "end": 11.0, "text": " dwa"}]
+    second = [{"start": 0.5, "end": 3.0, "text": " dwa"}, {"start": 4.0, "end": 9.0, "text": " trzy"}]
+
+    segments = stitch_segments(chunks, [first, second], SR)
+
+    assert [(seg["start"], seg["end"], seg["text"]) for seg in segments] == [
+        (0.0, 5.0, " raz"),
+        (8.5, 11.0, " dwa"),
+        (12.0, 17.0, " trzy"),
+    ]
+    assert [seg["id"] for seg in segments] == [0, 1, 2]
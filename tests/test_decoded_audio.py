@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+
+import pytest
+
+from app.decoded_audio import (
+    TARGET_SAMPLE_RATE,
+    DecodedAudio,
+    release_shared_segment,
+    shared_audio,
+)
+
+
+def test_from_array_resamples_and_downmixes():
+    stereo = np.ones((2, 8000), dtype=np.float32)
+
+    decoded = DecodedAudio.from_array(stereo, 8000, mmap_threshold_mb=0)
+
+    assert decoded.sample_rate == TARGET_SAMPLE_RATE
+    assert decoded.samples.dtype == np.float32
+    assert decoded.samples.ndim == 1
+    assert abs(decoded.duration_seconds - 1.0) < 0.01
+    assert not decoded.is_memory_mapped
+
+
+def test_large_buffer_is_memory_mapped_and_cleaned_up(tmp_path, monkeypatch):
+    from app import decoded_audio
+
+    spill_dir = tmp_path / "spill"
+    monkeypatch.setattr(decoded_audio, "DECODED_AUDIO_SPILL_DIR", spill_dir)
+    samples = np.linspace(-1.0, 1.0, 300_000, dtype=np.float32)
+
+    decoded = DecodedAudio(samples, mmap_threshold_mb=0.5)
+    mmap_path = decoded._mmap_path
+
+    assert decoded.is_memory_mapped
+    assert os.path.exists(mmap_path)
+    # Surowy PCM nagrania w katalogu aplikacji, niedostępny dla innych użytkowników
+    assert os.path.dirname(mmap_path) == str(spill_dir)
+    assert spill_dir.stat().st_mode & 0o777 == 0o700
+    assert os.stat(mmap_path).st_mode & 0o777 == 0o600
+    np.testing.assert_array_equal(decoded.samples, samples)
+
+    decoded.close()
+
+    assert not os.path.exists(mmap_path)
+    assert decoded.num_samples == 0
+
+
+def test_shared_audio_round_trip_and_unlink():
+    samples = np.linspace(-1.0, 1.0, 16_000, dtype=np.float32)
+    decoded = DecodedAudio(samples, mmap_threshold_mb=0)
+
+    with shared_audio(decoded) as handle:
+        shm, attached = handle.attach()
+        np.testing.assert_array_equal(attached, samples)
+        assert handle.sample_rate == TARGET_SAMPLE_RATE
+        del attached
+        release_shared_segment(shm)
+
+    with pytest.raises(FileNotFoundError):
+        handle.attach()
+
+
+def test_attach_does_not_register_segment_with_resource_tracker(monkeypatch):
+    from multiprocessing import resource_tracker
+
+    registered = []
+    original_register = resource_tracker.register
+
+    def recording_register(name, rtype):
+        registered.append(name)
+        original_register(name, rtype)
+
+    monkeypatch.setattr(resource_tracker, "register", recording_register)
+    samples = np.zeros(1_000, dtype=np.float32)
+
+    with shared_audio(samples) as handle:
+        created = list(registered)
+        shm, attached = handle.attach()
+        del attached
+        release_shared_segment(shm)
+
+    # Rejestracja tylko przy utworzeniu – proces roboczy nie może przejąć usuwania segmentu
+    assert registered == created
@@ -5,6 +5,7 @@ import pytest
 
 from app.audio_processor import AudioProcessor
 from app.content_analyzer import ContentAnalyzer
+from app.http_client import get_session
 
 
 class DummyHTTPResponse:
@@ -47,7 +48,7 @@ def temp_env(tmp_path, monkeypatch):
     }
     monkeypatch.setattr(
         "app.speech_transcriber.WhisperTranscriber.transcribe_audio",
-        lambda self, path: transcription_payload,
+        lambda self, path, **kwargs: transcription_payload,
     )
 
     # Disable diarization complexity
@@ -57,7 +58,7 @@ def temp_env(tmp_path, monkeypatch):
     )
     monkeypatch.setattr(
         "app.speaker_diarizer.SpeakerDiarizer.diarize_speakers",
-        lambda self, path: [],
+        lambda self, path, **kwargs: [],
     )
 
     # Patch Ollama HTTP calls
@@ -81,8 +82,8 @@ def temp_env(tmp_path, monkeypatch):
             },
         )
 
-    monkeypatch.setattr("app.ollama_analyzer.requests.get", fake_get)
-    monkeypatch.setattr("app.ollama_analyzer.requests.post", fake_post)
+    monkeypatch.setattr(get_session(), "get", fake_get)
+    monkeypatch.setattr(get_session(), "post", fake_post)
 
     yield {
         "input_dir": input_dir,
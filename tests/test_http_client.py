@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from app import http_client
+from app.config import OLLAMA_HTTP_POOL_MAXSIZE, OLLAMA_MAP_CONCURRENCY, PIPELINE_ANALYSIS_WORKERS
+
+
+def test_session_is_shared_and_pooled():
+    session = http_client.get_session()
+    assert http_client.get_session() is session
+
+    adapter = session.get_adapter("http://localhost:11434/api/generate")
+    assert adapter._pool_maxsize == OLLAMA_HTTP_POOL_MAXSIZE
+    assert adapter._pool_block is True
+
+
+def test_close_session_recreates_on_next_use():
+    session = http_client.get_session()
+    http_client.close_session()
+    assert http_client.get_session() is not session
+
+
+@pytest.mark.skipif("OLLAMA_HTTP_POOL_MAXSIZE" in os.environ, reason="rozmiar puli ustawiony w środowisku")
+def test_pool_covers_map_fan_out_and_health_checks():
+    # Każdy wątek analizy może mieć w locie OLLAMA_MAP_CONCURRENCY fragmentów; +2 na sprawdzanie dostępności
+    assert OLLAMA_HTTP_POOL_MAXSIZE >= PIPELINE_ANALYSIS_WORKERS * OLLAMA_MAP_CONCURRENCY + 2
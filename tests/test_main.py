@@ -52,6 +52,9 @@ def test_main_allows_disabled_diarization(monkeypatch):
         def stop_file_watcher(self):
             self.watcher_stopped = True
 
+        def shutdown(self):
+            self.shutdown_called = True
+
     for module in ("app.main", "app.config", "app.audio_processor"):
         if module in sys.modules:
             del sys.modules[module]
@@ -0,0 +1,105 @@
+import json as json_module
+import threading
+from types import SimpleNamespace
+
+from app.http_client import get_session
+from app.ollama_analyzer import OllamaAnalyzer, split_transcript
+
+
+def test_split_transcript_cuts_between_turns():
+    turns = ["SPEAKER_00: " + "a" * 30, "SPEAKER_01: " + "b" * 30, "SPEAKER_00: " + "c" * 30]
+
+    chunks = split_transcript(turns, 90)
+
+    assert chunks == [turns[0] + "\n" + turns[1], turns[2]]
+
+
+def test_split_transcript_splits_oversized_turn_on_sentences():
+    turn = "SPEAKER_00: Pierwsze zdanie jest tutaj. Drugie zdanie też jest tutaj."
+
+    chunks = split_transcript([turn], 45)
+
+    assert chunks == ["SPEAKER_00: Pierwsze zdanie jest tutaj.", "Drugie zdanie też jest tutaj."]
+    assert all(len(chunk) <= 45 for chunk in chunks)
+
+
+def test_long_transcript_is_mapped_and_reduced(monkeypatch):
+    monkeypatch.setattr("app.config.OLLAMA_CHUNK_MAX_CHARS", 60)
+    analyzer = OllamaAnalyzer(base_url="http://fake-ollama", model="test-model")
+    analyzer.cache = None
+    prompts = []
+    lock = threading.Lock()
+
+    def fake_post(url, *, json=None, timeout=None):
+        prompt = json["prompt"]
+        with lock:
+            prompts.append(prompt)
+        if "Częściowe analizy" in prompt:
+            payload = {"summary": "całość", "key_points": ["a", "b"], "tone": "formal", "length_category": "long"}
+        else:
+            payload = {"summary": "fragment", "key_points": ["x"], "tone": "formal", "length_category": "short"}
+        return SimpleNamespace(status_code=200, json=lambda: {"response": json_module.dumps(payload)}, text="")
+
+    monkeypatch.setattr(get_session(), "post", fake_post)
+
+    turns = [f"SPEAKER_0{i % 2}: wypowiedź numer {i} " + "x" * 20 for i in range(4)]
+    result = analyzer.analyze_long_content(turns, "general")
+
+    assert result["success"] is True
+    assert result["parsed_result"]["summary"] == "całość"
+    assert result["chunk_count"] == 4
+    assert result["failed_chunks"] == 0
+    map_prompts = [prompt for prompt in prompts if "fragment" in prompt and "Częściowe analizy" not in prompt]
+    assert len(map_prompts) == 4
+    assert any("fragment 4 z 4" in prompt for prompt in map_prompts)
+    assert sum("Częściowe analizy" in prompt for prompt in prompts) == 1
+
+
+def test_reduce_groups_whole_partials_and_shrinks_oversized_ones(monkeypatch):
+    analyzer = OllamaAnalyzer(base_url="http://fake-ollama", model="test-model")
+    reduce_inputs = []
+
+    def fake_analyze_content(text, analysis_type="general", use_cache=True, template=None):
+        reduce_inputs.append(text)
+        return {"success": True, "parsed_result": {"summary": "r"}}
+
+    monkeypatch.setattr(analyzer, "analyze_content", fake_analyze_content)
+    partials = [
+        {"summary": "s" * 500, "key_points": ["p" * 50] * 20},
+        {"summary": "krótkie"},
+        {"summary": "inne"},
+    ]
+
+    result = analyzer._reduce_partials(partials, "general", False, "{text}", 200)
+
+    assert result["parsed_result"]["summary"] == "r"
+    for text in reduce_inputs:
+        for line in text.split("\n"):
+            assert isinstance(json_module.loads(line), dict)
+    shrunk = json_module.loads(reduce_inputs[0].split("\n")[0])
+    assert len(json_module.dumps(shrunk, ensure_ascii=False)) <= 200
+    assert shrunk["summary"].startswith("sss") and shrunk["summary"].endswith("…")
+
+
+def test_reduce_without_grouping_progress_fits_all_partials_in_limit(monkeypatch):
+    analyzer = OllamaAnalyzer(base_url="http://fake-ollama", model="test-model")
+    reduce_inputs = []
+
+    def fake_analyze_content(text, analysis_type="general", use_cache=True, template=None):
+        reduce_inputs.append(text)
+        return {"success": True, "parsed_result": {"summary": "r"}}
+
+    monkeypatch.setattr(analyzer, "analyze_content", fake_analyze_content)
+    partials = [
+        {"summary": f"{index} " + "s" * 400, "key_points": ["p" * 60] * 5, "tone": "formal"}
+        for index in range(3)
+    ]
+    max_chars = 400
+    assert all(len(analyzer._partial_json(partial, max_chars)) > max_chars / 2 for partial in partials)
+
+    analyzer._reduce_partials(partials, "general", False, "{text}", max_chars)
+
+    assert len(reduce_inputs) == 1
+    assert len(reduce_inputs[0]) <= max_chars
+    lines = reduce_inputs[0].split("\n")
+    assert [json_module.loads(line)["summary"][0] for line in lines] == ["0", "1", "2"]
@@ -0,0 +1,79 @@
+import json as json_module
+from types import SimpleNamespace
+
+import requests
+
+from app.http_client import get_session
+from app.ollama_analyzer import OllamaAnalyzer
+from app.ollama_endpoints import EndpointPool
+
+
+def test_selects_least_loaded_healthy_endpoint():
+    pool = EndpointPool(["http://a:11434", "http://b:11434", "http://c:11434"])
+    a, b, c = pool.endpoints
+    a.latency, b.latency, c.latency = 1.0, 2.5, 1.0
+    c.healthy = False
+
+    first = pool.select()
+    assert first is a
+    # a ma już zapytanie w locie: (1 + 1) × 1 s < 2,5 s, ale (2 + 1) × 1 s > 2,5 s
+    assert pool.select() is a
+    assert pool.select() is b
+
+    pool.release(a, latency=3.0)
+    assert a.in_flight == 1
+    assert a.latency == 1.0 + 0.3 * (3.0 - 1.0)
+
+
+def test_health_check_restores_endpoint():
+    probed = []
+    pool = EndpointPool(["http://a:11434", "http://b:11434"], probe=lambda url: probed.append(url) or True)
+    endpoint = pool.select()
+    pool.release(endpoint, failed=True)
+    assert endpoint.healthy is False
+
+    assert pool.check_health() is True
+    assert endpoint.healthy is True
+    assert probed == ["http://a:11434", "http://b:11434"]
+
+
+def test_analysis_fails_over_to_next_endpoint(monkeypatch):
+    analyzer = OllamaAnalyzer(
+        base_url="http://a:11434", model="test-model", endpoints=["http://a:11434", "http://b:11434"]
+    )
+    analyzer.cache = None
+    analyzer.failover_attempts = 2
+    calls = []
+
+    def fake_post(url, *, json=None, timeout=None):
+        calls.append(url)
+        if url.startswith("http://a:11434"):
+            raise requests.ConnectionError("connection refused")
+        payload = {"summary": "ok", "key_points": [], "tone": "formal", "length_category": "short"}
+        return SimpleNamespace(status_code=200, json=lambda: {"response": json_module.dumps(payload)}, text="")
+
+    monkeypatch.setattr(get_session(), "post", fake_post)
+
+    result = analyzer.analyze_content("Tekst rozmowy", "general")
+
+    assert result["success"] is True
+    assert calls == ["http://a:11434/api/generate", "http://b:11434/api/generate"]
+    a, b = analyzer.endpoint_pool.endpoints
+    assert a.healthy is False and a.in_flight == 0
+    assert b.healthy is True and b.latency > 0
+
+
+def test_endpoint_is_released_after_unexpected_error(monkeypatch):
+    analyzer = OllamaAnalyzer(base_url="http://a:11434", model="test-model")
+    analyzer.cache = None
+    monkeypatch.setattr(
+        get_session(),
+        "post",
+        lambda url, *, json=None, timeout=None: SimpleNamespace(status_code=200, json=lambda: ["nie słownik"], text=""),
+    )
+
+    result = analyzer.analyze_content("Tekst rozmowy", "general")
+
+    assert result["success"] is False
+    (endpoint,) = analyzer.endpoint_pool.endpoints
+    assert endpoint.in_flight == 0
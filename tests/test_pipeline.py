@@ -0,0 +1,63 @@
+import threading
+
+from app.pipeline import PipelineStage, StagePipeline
+
+
+def test_stages_overlap_across_jobs():
+    second_job_transcribed = threading.Event()
+    events = []
+    lock = threading.Lock()
+
+    def transcribe(job):
+        with lock:
+            events.append(("transcribe", job))
+        if job == 2:
+            second_job_transcribed.set()
+        return job
+
+    def analyze(job):
+        if job == 1:
+            # Analiza pierwszego pliku czeka, aż drugi zostanie przetranskrybowany
+            assert second_job_transcribed.wait(timeout=5)
+        with lock:
+            events.append(("analyze", job))
+        return None
+
+    pipeline = StagePipeline(
+        [
+            PipelineStage("transcribe", transcribe, workers=1, queue_size=2),
+            PipelineStage("analyze", analyze, workers=1, queue_size=2),
+        ],
+        name="test",
+    )
+    assert pipeline.submit(1)
+    assert pipeline.submit(2)
+    pipeline.wait_idle()
+    pipeline.shutdown()
+
+    assert events.index(("transcribe", 2)) < events.index(("analyze", 1))
+    assert ("analyze", 2) in events
+
+
+def test_failed_stage_stops_job_and_pipeline_becomes_idle():
+    finished = []
+
+    def first(job):
+        if job == "bad":
+            raise RuntimeError("boom")
+        return job
+
+    pipeline = StagePipeline(
+        [
+            PipelineStage("first", first),
+            PipelineStage("second", finished.append),
+        ],
+        name="test",
+    )
+    pipeline.submit("bad")
+    pipeline.submit("good")
+    pipeline.wait_idle()
+
+    assert finished == ["good"]
+    assert pipeline.in_flight == 0
+    pipeline.shutdown()
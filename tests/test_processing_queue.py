@@ -24,9 +24,35 @@ def test_mark_completed_updates_status(tmp_path):
     queue.mark_completed(
         item.id,
         {"transcription": "call2 20250101010101.txt", "analysis": "call2 ANALIZA 20250101010101.txt"},
+        preprocessing={"skipped": False, "stages": ["noise_reduce"]},
     )
 
     serialized = queue.serialize()[0]
     assert serialized["status"] == "completed"
     assert serialized["result_files"]["transcription"].endswith(".txt")
+    assert serialized["preprocessing"]["stages"] == ["noise_reduce"]
 
+
+
+def test_update_duration_refines_estimate(tmp_path):
+    audio = tmp_path / "call3.mp3"
+    audio.write_bytes(b"0" * 1024)
+
+    queue = ProcessingQueue()
+    item = queue.enqueue(audio)
+    queue.update_duration(item.id, 185.0)
+
+    assert queue.serialize()[0]["estimated_minutes"] == 4
+
+
+def test_enqueue_reads_duration_from_header(tmp_path):
+    import numpy as np
+    import soundfile as sf
+
+    audio = tmp_path / "call4.wav"
+    sf.write(str(audio), np.zeros(8000 * 130, dtype=np.float32), 8000)
+
+    queue = ProcessingQueue()
+    queue.enqueue(audio)
+
+    assert queue.serialize()[0]["estimated_minutes"] == 3
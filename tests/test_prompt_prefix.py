@@ -0,0 +1,58 @@
+import json as json_module
+from types import SimpleNamespace
+
+from app.config import OLLAMA_SYSTEM_PROMPT
+from app.http_client import get_session
+from app.ollama_analyzer import OllamaAnalyzer
+
+
+def _fake_post(payloads):
+    def fake_post(url, *, json=None, timeout=None):
+        payloads.append(json)
+        response = {"summary": "ok", "key_points": [], "tone": "formal", "length_category": "short"}
+        return SimpleNamespace(
+            status_code=200,
+            json=lambda: {
+                "response": json_module.dumps(response),
+                "prompt_eval_count": 40,
+                "prompt_eval_duration": 80_000_000,
+            },
+            text="",
+        )
+
+    return fake_post
+
+
+def test_static_instructions_form_shared_prompt_prefix(monkeypatch):
+    analyzer = OllamaAnalyzer(base_url="http://fake-ollama", model="test-model")
+    analyzer.cache = None
+    analyzer.keep_alive = "30m"
+    analyzer.debug_logging = True
+    payloads = []
+    monkeypatch.setattr(get_session(), "post", _fake_post(payloads))
+
+    analyzer.analyze_content("Pierwsza rozmowa o fakturze.", "call_center")
+    analyzer.analyze_content("Druga, zupełnie inna rozmowa.", "call_center")
+
+    first, second = payloads
+    assert first["system"] == second["system"] == OLLAMA_SYSTEM_PROMPT.strip()
+    assert first["keep_alive"] == "30m"
+    assert OLLAMA_SYSTEM_PROMPT.strip() not in first["prompt"]
+
+    # Transkrypt dopiero w sekcji danych – wszystko przed nią jest wspólne
+    prefix = first["prompt"].split("[INPUT_JSON]")[0]
+    assert second["prompt"].startswith(prefix)
+    assert "fakturze" not in prefix
+    assert first["prompt"].count("Pierwsza rozmowa o fakturze.") == 1
+
+
+def test_keep_alive_is_omitted_when_not_configured(monkeypatch):
+    analyzer = OllamaAnalyzer(base_url="http://fake-ollama", model="test-model")
+    analyzer.cache = None
+    analyzer.keep_alive = None
+    payloads = []
+    monkeypatch.setattr(get_session(), "post", _fake_post(payloads))
+
+    analyzer.analyze_content("Krótka rozmowa.", "general")
+
+    assert "keep_alive" not in payloads[0]
@@ -0,0 +1,52 @@
+import json
+import os
+import time
+
+from app.result_cache import ResultCache
+
+
+def test_put_get_and_lru_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_entries=2)
+    keys = [ResultCache.make_key("audio", index) for index in range(3)]
+
+    cache.put(keys[0], {"text": "0"})
+    cache.put(keys[1], {"text": "1"})
+    past = time.time() - 100
+    os.utime(tmp_path / f"{keys[0]}.json", (past, past))
+    os.utime(tmp_path / f"{keys[1]}.json", (past - 10, past - 10))
+    # Odczyt odświeża pozycję wpisu 1 – najdawniej używany jest teraz wpis 0
+    assert cache.get(keys[1]) == {"text": "1"}
+    cache.put(keys[2], {"text": "2"})
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) == {"text": "1"}
+    assert cache.get(keys[2]) == {"text": "2"}
+
+
+def test_size_limit_and_ttl(tmp_path):
+    cache = ResultCache(tmp_path, max_entries=0, max_bytes=300, ttl_seconds=60)
+    cache.put("a", {"text": "x" * 150})
+    cache.put("b", {"text": "y" * 150})
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+    old = time.time() - 120
+    os.utime(tmp_path / "b.json", (old, old))
+    assert cache.get("b") is None
+    assert not (tmp_path / "b.json").exists()
+
+
+def test_ttl_counts_from_write_not_last_read(tmp_path):
+    cache = ResultCache(tmp_path, ttl_seconds=60)
+    cache.put("a", {"text": "x"})
+    assert cache.get("a") == {"text": "x"}
+
+    # Wpis zapisany dawno, ale odczytywany na bieżąco (świeży mtime)
+    path = tmp_path / "a.json"
+    entry = json.loads(path.read_text(encoding="utf-8"))
+    entry["created"] -= 120
+    path.write_text(json.dumps(entry), encoding="utf-8")
+
+    assert cache.get("a") is None
+    assert not path.exists()
@@ -51,3 +51,19 @@ def test_save_transcription_generates_timestamp(tmp_path):
     assert (output_dir / f"sample {generated_timestamp}.txt").exists()
     assert (output_dir / f"sample ANALIZA {generated_timestamp}.txt").exists()
 
+
+def test_save_transcription_records_preprocessing_decision(tmp_path):
+    saver = ResultSaver(tmp_path / "output")
+    audio_file = tmp_path / "sample.mp3"
+    audio_file.write_bytes(b"dummy audio content")
+
+    timestamp = saver.save_transcription_with_speakers(
+        audio_file,
+        _sample_transcription(),
+        analysis_results=None,
+        preprocessing={"adaptive": True, "skipped": True, "stages": [], "metrics": {"snr_db": 41.5}},
+    )
+
+    content = (tmp_path / "output" / f"sample {timestamp}.txt").read_text(encoding="utf-8")
+    assert "PREPROCESSING AUDIO:" in content
+    assert "pominięty" in content and "snr_db=41.5" in content
@@ -69,3 +69,240 @@ def test_load_model_prefers_cuda(monkeypatch, tmp_path):
     assert captured["device"] == "cuda"
     assert transcriber._fp16
 
+
+
+def test_transcribe_in_memory_decodes_once(monkeypatch, tmp_path):
+    env = {"MODEL_CACHE_DIR": str(tmp_path / "models"), "WHISPER_IN_MEMORY_AUDIO": "true"}
+    st_module = reload_transcriber(monkeypatch, env)
+
+    decoded = st_module.np.zeros(16000, dtype=st_module.np.float32)
+    decode_calls = []
+
+    def fake_load_audio(path):
+        decode_calls.append(path)
+        return decoded
+
+    monkeypatch.setattr(st_module.whisper, "load_audio", fake_load_audio)
+    monkeypatch.setattr(st_module.time, "sleep", lambda _: None)
+
+    received = []
+
+    class FlakyModel:
+        def transcribe(self, audio, **kwargs):
+            received.append(audio)
+            if len(received) == 1:
+                raise RuntimeError("boom")
+            return {"text": " tekst ", "segments": []}
+
+    audio_file = tmp_path / "call.wav"
+    audio_file.write_bytes(b"RIFF")
+
+    transcriber = st_module.WhisperTranscriber()
+    transcriber.model = FlakyModel()
+
+    def fail_encrypt(_):
+        raise AssertionError("tryb w pamięci nie powinien szyfrować kopii pliku")
+
+    monkeypatch.setattr(transcriber, "encrypt_file", fail_encrypt)
+
+    result = transcriber.transcribe_audio(audio_file)
+
+    assert result == {"text": "tekst", "segments": []}
+    assert decode_calls == [str(audio_file)]
+    assert all(audio is decoded for audio in received)
+    assert len(received) == 2
+
+
+def test_transcribe_legacy_mode_uses_temp_file(monkeypatch, tmp_path):
+    env = {"MODEL_CACHE_DIR": str(tmp_path / "models"), "WHISPER_IN_MEMORY_AUDIO": "false"}
+    st_module = reload_transcriber(monkeypatch, env)
+
+    received = []
+
+    class DummyModel:
+        def transcribe(self, audio, **kwargs):
+            received.append(audio)
+            assert Path(audio).read_bytes() == b"RIFF"
+            return {"text": "ok", "segments": []}
+
+    audio_file = tmp_path / "call.wav"
+    audio_file.write_bytes(b"RIFF")
+
+    transcriber = st_module.WhisperTranscriber()
+    transcriber.model = DummyModel()
+
+    result = transcriber.transcribe_audio(audio_file)
+
+    assert result["text"] == "ok"
+    assert isinstance(received[0], str)
+    assert not Path(received[0]).exists()
+
+
+def test_process_pool_transcriber_passes_pcm_through_shared_memory(monkeypatch, tmp_path):
+    env = {"MODEL_CACHE_DIR": str(tmp_path / "models"), "WHISPER_IN_MEMORY_AUDIO": "true"}
+    st_module = reload_transcriber(monkeypatch, env)
+
+    received = []
+
+    class DummyModel:
+        def transcribe(self, audio, **kwargs):
+            received.append(audio.copy())
+            return {"text": " z procesu ", "segments": []}
+
+    def fake_load_model(self, model_name="large-v3"):
+        self.model = DummyModel()
+
+    monkeypatch.setattr(st_module.WhisperTranscriber, "load_model", fake_load_model)
+    monkeypatch.setattr(st_module.torch, "set_num_threads", lambda _: None)
+    # Inicjalizacja "procesu roboczego" w bieżącym procesie
+    st_module._init_transcriber_worker("tiny", 2)
+    assert st_module._transcriber_worker_ready() is None
+
+    class InlineFuture:
+        def __init__(self, value):
+            self._value = value
+
+        def result(self):
+            return self._value
+
+    class InlineExecutor:
+        def submit(self, fn, *args):
+            return InlineFuture(fn(*args))
+
+        def shutdown(self, **kwargs):
+            pass
+
+    transcriber = st_module.ProcessPoolTranscriber(num_workers=2, threads_per_worker=2)
+    assert not transcriber.is_loaded
+    transcriber._executor = InlineExecutor()
+
+    pcm = st_module.np.linspace(-1.0, 1.0, 1600, dtype=st_module.np.float32)
+    result = transcriber.transcribe_audio(tmp_path / "call.wav", audio=pcm)
+    transcriber.shutdown()
+
+    assert result == {"text": "z procesu", "segments": []}
+    st_module.np.testing.assert_array_equal(received[0], pcm)
+    assert not transcriber.is_loaded
+
+
+def test_vad_sends_only_speech_and_remaps_segments(monkeypatch, tmp_path):
+    env = {"MODEL_CACHE_DIR": str(tmp_path / "models"), "WHISPER_IN_MEMORY_AUDIO": "true"}
+    st_module = reload_transcriber(monkeypatch, env)
+    np = st_module.np
+
+    tone = (0.3 * np.sin(2 * np.pi * 220 * np.arange(32000) / 16000)).astype(np.float32)
+    audio = np.concatenate([tone, np.zeros(16000 * 6, dtype=np.float32), tone])
+    received = []
+
+    class DummyModel:
+        def transcribe(self, audio, **kwargs):
+            received.append(len(audio))
+            return {"text": "ok", "segments": [{"start": 2.5, "end": 3.5, "text": "ok"}]}
+
+    transcriber = st_module.WhisperTranscriber(vad_enabled=True)
+    transcriber.model = DummyModel()
+
+    result = transcriber.transcribe_audio(tmp_path / "call.wav", audio=audio)
+
+    assert received[0] < len(audio) / 2
+    assert result["segments"][0]["start"] > 7.5
+
+
+def test_long_audio_is_chunked_and_failed_chunk_retried_alone(monkeypatch, tmp_path):
+    env = {"MODEL_CACHE_DIR": str(tmp_path / "models"), "WHISPER_IN_MEMORY_AUDIO": "true"}
+    st_module = reload_transcriber(monkeypatch, env)
+    np = st_module.np
+    monkeypatch.setattr(st_module, "WHISPER_CHUNK_MIN_SECONDS", 60.0)
+    monkeypatch.setattr(st_module, "WHISPER_CHUNK_SECONDS", 30.0)
+    monkeypatch.setattr(st_module.time, "sleep", lambda _: None)
+
+    t = np.arange(16000 * 100) / 16000
+    audio = (0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+    calls = []
+
+    class FlakyModel:
+        def transcribe(self, chunk, **kwargs):
+            calls.append(len(chunk))
+            if len(calls) == 2:
+                raise RuntimeError("boom")
+            return {"text": " fragment", "segments": [{"start": 5.0, "end": 6.0, "text": " fragment"}]}
+
+    transcriber = st_module.WhisperTranscriber(vad_enabled=False)
+    transcriber.checkpoint_enabled = False
+    transcriber.model = FlakyModel()
+
+    result = transcriber.transcribe_audio(tmp_path / "long.wav", audio=audio)
+
+    chunk_count = len(calls) - 1
+    assert chunk_count > 1
+    assert all(length < len(audio) for length in calls)
+    assert len(result["segments"]) == chunk_count
+    assert result["segments"][-1]["start"] > 30.0
+
+
+def test_chunk_checkpoint_resumes_after_failure(monkeypatch, tmp_path):
+    env = {"MODEL_CACHE_DIR": str(tmp_path / "models"), "WHISPER_IN_MEMORY_AUDIO": "true"}
+    st_module = reload_transcriber(monkeypatch, env)
+    np = st_module.np
+    monkeypatch.setattr(st_module, "WHISPER_CHUNK_MIN_SECONDS", 60.0)
+    monkeypatch.setattr(st_module, "WHISPER_CHUNK_SECONDS", 30.0)
+    monkeypatch.setattr(st_module.time, "sleep", lambda _: None)
+    checkpoint_dir = tmp_path / "checkpoints"
+    original_init = st_module.TranscriptionCheckpoint.__init__
+
+    def init_in_tmp(self, key, chunks, directory=None):
+        original_init(self, key, chunks, directory=checkpoint_dir)
+
+    monkeypatch.setattr(st_module.TranscriptionCheckpoint, "__init__", init_in_tmp)
+
+    t = np.arange(16000 * 100) / 16000
+    audio = (0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+    calls = []
+
+    class CrashingModel:
+        def __init__(self, fail_after):
+            self.fail_after = fail_after
+
+        def transcribe(self, chunk, **kwargs):
+            calls.append(len(chunk))
+            if len(calls) > self.fail_after:
+                raise RuntimeError("awaria")
+            return {"text": " ok", "segments": [{"start": 5.0, "end": 6.0, "text": " ok"}]}
+
+    transcriber = st_module.WhisperTranscriber(vad_enabled=False)
+    transcriber.checkpoint_enabled = True
+    transcriber.model = CrashingModel(fail_after=2)
+
+    assert transcriber.transcribe_audio(tmp_path / "long.wav", max_retries=1, audio=audio) is None
+    assert len(list(checkpoint_dir.glob("*.json"))) == 1
+
+    calls.clear()
+    transcriber.model = CrashingModel(fail_after=100)
+    result = transcriber.transcribe_audio(tmp_path / "long.wav", max_retries=1, audio=audio)
+
+    # Dwa fragmenty z checkpointu, pozostałe dwa transkrybowane ponownie
+    assert len(calls) == 2
+    assert len(result["segments"]) == 4
+    assert not list(checkpoint_dir.glob("*.json"))
+
+
+def test_worker_readiness_waits_for_every_pool_process(monkeypatch, tmp_path):
+    import threading
+
+    st_module = reload_transcriber(monkeypatch, {"MODEL_CACHE_DIR": str(tmp_path / "models")})
+    monkeypatch.setattr(st_module.WhisperTranscriber, "load_model", lambda self, model_name="large-v3": None)
+    monkeypatch.setattr(st_module.torch, "set_num_threads", lambda _: None)
+    monkeypatch.setattr(st_module, "WORKER_READY_TIMEOUT", 0.2)
+
+    # Jeden proces nie może odebrać obu zadań gotowości – bez drugiego bariera się nie otworzy
+    st_module._init_transcriber_worker("tiny", 1, threading.Barrier(2))
+    assert "Nie wszystkie procesy" in st_module._transcriber_worker_ready()
+
+    st_module._init_transcriber_worker("tiny", 1, threading.Barrier(2))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(st_module._transcriber_worker_ready())) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert results == [None, None]
@@ -0,0 +1,100 @@
+import json as json_module
+from types import SimpleNamespace
+
+from app.http_client import get_session
+from app.ollama_analyzer import OllamaAnalyzer
+from app.streaming_json import StreamingJsonTracker
+from app.token_budget import TokenBudget
+
+
+def _feed_all(tracker, chunks):
+    return [tracker.feed(chunk) for chunk in chunks]
+
+
+def test_tracks_strings_and_nesting_across_chunks():
+    tracker = StreamingJsonTracker()
+
+    states = _feed_all(tracker, ['Wynik: {"summary": "a}', '\\"b{", "data": {"x"', ": [1, 2]}", "} i jeszcze tekst"])
+
+    assert states == [False, False, False, True]
+    assert json_module.loads(tracker.json_text) == {"summary": 'a}"b{', "data": {"x": [1, 2]}}
+    assert tracker.text[: tracker.end].endswith("]}}")
+
+
+def test_skips_reasoning_sections_and_non_json_braces():
+    tracker = StreamingJsonTracker(["<think>", "</think>"])
+
+    _feed_all(tracker, ["<THI", 'NK>{"draft": 1}</th', "ink> {to nie json} ", '{"final": true}'])
+
+    assert tracker.complete
+    assert json_module.loads(tracker.json_text) == {"final": True}
+
+
+class _Stream(SimpleNamespace):
+    def iter_lines(self, decode_unicode=True):
+        for line in self.lines:
+            self.consumed += 1
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+def test_streaming_response_is_closed_after_complete_json(monkeypatch):
+    analyzer = OllamaAnalyzer(base_url="http://fake-ollama", model="test-model")
+    analyzer.cache = None
+    analyzer.stream_responses = True
+    analyzer.stream_stop_on_json = True
+    payload = json_module.dumps({"summary": "ok", "key_points": [], "tone": "formal", "length_category": "short"})
+    pieces = [payload[:15], payload[15:], " Dodatkowy komentarz", " modelu...", ""]
+    lines = [json_module.dumps({"response": piece, "done": index == len(pieces) - 1}) for index, piece in enumerate(pieces)]
+    response = _Stream(status_code=200, lines=lines, consumed=0, closed=False, text="")
+
+    def fake_post(url, *, json=None, timeout=None, stream=False):
+        assert stream
+        return response
+
+    monkeypatch.setattr(get_session(), "post", fake_post)
+
+    result = analyzer.analyze_content("Tekst rozmowy", "general")
+
+    assert result["success"] is True
+    assert result["raw_response"] == payload
+    assert response.consumed == 2
+    assert response.closed is True
+
+
+def test_prompt_stats_come_only_from_streams_finished_by_ollama(monkeypatch):
+    analyzer = OllamaAnalyzer(base_url="http://fake-ollama", model="test-model")
+    analyzer.cache = None
+    analyzer.stream_responses = True
+    analyzer.stream_stop_on_json = True
+    observed = []
+    analyzer.token_budget = TokenBudget()
+    monkeypatch.setattr(analyzer.token_budget, "observe", lambda prompt_chars, prompt_tokens: observed.append(prompt_tokens))
+    payload = json_module.dumps({"summary": "ok", "key_points": [], "tone": "formal", "length_category": "short"})
+    aborted = _Stream(
+        status_code=200,
+        lines=[json_module.dumps({"response": payload, "done": False}), json_module.dumps({"response": " komentarz", "done": False})],
+        consumed=0,
+        closed=False,
+        text="",
+    )
+    finished = _Stream(
+        status_code=200,
+        lines=[json_module.dumps({"response": payload[:-1], "done": False}), json_module.dumps({"response": "", "done": True, "prompt_eval_count": 321})],
+        consumed=0,
+        closed=False,
+        text="",
+    )
+    responses = iter([aborted, finished])
+    monkeypatch.setattr(get_session(), "post", lambda url, **kwargs: next(responses))
+
+    analyzer.analyze_content("Tekst rozmowy", "general")
+    assert aborted.consumed == 1
+    assert aborted.closed is True
+    assert observed == []
+
+    analyzer.analyze_content("Inny tekst rozmowy", "general")
+    assert finished.consumed == 2
+    assert observed == [321]
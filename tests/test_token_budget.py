@@ -0,0 +1,60 @@
+import json as json_module
+from types import SimpleNamespace
+
+from app.http_client import get_session
+from app.ollama_analyzer import OllamaAnalyzer
+from app.token_budget import TokenBudget
+
+
+def test_context_size_uses_doubling_buckets():
+    budget = TokenBudget(min_context=2048, max_context=16384, response_tokens=1024)
+
+    assert budget.context_size(500) == 2048
+    assert budget.context_size(1500) == 4096
+    assert budget.context_size(9000) == 16384
+    assert budget.context_size(50000) == 16384
+
+
+def test_calibration_only_lowers_chars_per_token():
+    budget = TokenBudget(chars_per_token=3.0)
+
+    budget.observe(prompt_chars=3000, prompt_tokens=500)  # 6 znaków/token – np. cache KV
+    assert budget.chars_per_token == 3.0
+    budget.observe(prompt_chars=2500, prompt_tokens=1000)
+    assert budget.chars_per_token == 2.5
+    assert budget.estimate("a" * 25) == 10
+
+
+def test_count_falls_back_when_tokenize_is_unsupported():
+    calls = []
+    budget = TokenBudget(tokenize=lambda text: calls.append(text) or None, chars_per_token=2.0)
+
+    assert budget.count("abcd") == 2
+    assert budget.count("abcdef") == 3
+    assert calls == ["abcd"]
+
+
+def test_request_sets_num_ctx_and_trims_to_budget(monkeypatch):
+    analyzer = OllamaAnalyzer(base_url="http://fake-ollama", model="test-model")
+    analyzer.cache = None
+    analyzer.token_budget = TokenBudget(chars_per_token=4.0, min_context=1024, max_context=2048, response_tokens=512)
+    captured = {}
+
+    def fake_post(url, *, json=None, timeout=None):
+        captured.update(json)
+        payload = {"summary": "ok", "key_points": [], "tone": "formal", "length_category": "short"}
+        return SimpleNamespace(
+            status_code=200,
+            json=lambda: {"response": json_module.dumps(payload), "prompt_eval_count": len(json["prompt"]) // 3},
+            text="",
+        )
+
+    monkeypatch.setattr(get_session(), "post", fake_post)
+
+    result = analyzer.analyze_content("słowo " * 1200, "general")
+
+    assert result["success"] is True
+    assert captured["options"]["num_ctx"] == 2048
+    assert len(captured["prompt"]) / 4.0 <= 2048 - 512
+    # Kalibracja z prompt_eval_count odpowiedzi
+    assert analyzer.token_budget.chars_per_token < 4.0
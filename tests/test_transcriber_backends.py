@@ -0,0 +1,73 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from app import transcriber_backends as tb
+
+
+def test_create_backend_falls_back_to_openai(monkeypatch):
+    monkeypatch.setattr(tb, "FASTER_WHISPER_AVAILABLE", False)
+
+    assert isinstance(tb.create_backend("faster-whisper"), tb.OpenAIWhisperBackend)
+    assert isinstance(tb.create_backend("nieznany"), tb.OpenAIWhisperBackend)
+
+
+def test_faster_whisper_backend_returns_whisper_shaped_result(monkeypatch, tmp_path):
+    captured = {}
+
+    class FakeModel:
+        def __init__(self, model_name, **kwargs):
+            captured["model_name"] = model_name
+            captured.update(kwargs)
+
+        def transcribe(self, audio, **kwargs):
+            captured["transcribe_kwargs"] = kwargs
+            segments = (
+                SimpleNamespace(
+                    id=index,
+                    seek=0,
+                    start=start,
+                    end=end,
+                    text=text,
+                    tokens=[1, 2],
+                    temperature=0.0,
+                    avg_logprob=-0.1,
+                    compression_ratio=1.0,
+                    no_speech_prob=0.01,
+                )
+                for index, (start, end, text) in enumerate([(0.0, 1.5, " Dzień dobry"), (1.5, 3.0, " w czym pomóc?")])
+            )
+            return segments, SimpleNamespace(language="pl")
+
+    monkeypatch.setattr(tb, "FASTER_WHISPER_AVAILABLE", True)
+    monkeypatch.setattr(tb, "WhisperModel", FakeModel, raising=False)
+
+    backend = tb.create_backend("faster_whisper", compute_type="auto")
+    backend.load("small", tmp_path, "cpu")
+    result = backend.transcribe(np.zeros(16000, dtype=np.float32), language="pl")
+
+    assert captured["compute_type"] == "int8"
+    assert Path(captured["download_root"]) == tmp_path
+    assert captured["transcribe_kwargs"]["language"] == "pl"
+    assert result["text"] == " Dzień dobry w czym pomóc?"
+    assert [(seg["start"], seg["end"]) for seg in result["segments"]] == [(0.0, 1.5), (1.5, 3.0)]
+    assert not backend.fp16
+
+
+def test_split_timestamp_tokens_builds_segments():
+    class FakeTokenizer:
+        timestamp_begin = 1000
+        eot = 900
+
+        def decode(self, tokens):
+            return "".join(chr(ord("a") + token) for token in tokens)
+
+    tokens = [1000, 0, 1, 1100, 1100, 2, 1250, 900]
+
+    segments = tb.split_timestamp_tokens(tokens, FakeTokenizer(), duration=30.0)
+
+    assert [(seg["start"], seg["end"], seg["text"]) for seg in segments] == [
+        (0.0, 2.0, "ab"),
+        (2.0, 5.0, "c"),
+    ]
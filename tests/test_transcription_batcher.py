@@ -0,0 +1,107 @@
+import threading
+
+import numpy as np
+
+from app.transcription_batcher import TranscriptionBatcher
+
+
+class FakeTranscriber:
+    supports_batching = True
+
+    def __init__(self, low_confidence=()):
+        self.batches = []
+        self.single_calls = []
+        self.low_confidence = set(low_confidence)
+
+    def transcribe_batch(self, audios):
+        self.batches.append(len(audios))
+        return [
+            None if int(audio[0]) in self.low_confidence else {"text": f"plik {int(audio[0])}", "segments": []}
+            for audio in audios
+        ]
+
+    def transcribe_audio(self, path, audio=None):
+        self.single_calls.append(path)
+        return {"text": f"pojedynczo {path}", "segments": []}
+
+
+def _run_concurrently(batcher, audios):
+    results = {}
+    barrier = threading.Barrier(len(audios))
+
+    def worker(index, audio):
+        barrier.wait()
+        results[index] = batcher.transcribe(f"f{index}", audio)
+
+    threads = [threading.Thread(target=worker, args=item) for item in enumerate(audios)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_short_recordings_share_one_batch_and_results_are_split_back():
+    transcriber = FakeTranscriber()
+    batcher = TranscriptionBatcher(transcriber, max_batch_size=4, max_wait_seconds=1.0)
+    audios = [np.full(16000 * 20, index, dtype=np.float32) for index in range(4)]
+
+    results = _run_concurrently(batcher, audios)
+    batcher.shutdown()
+
+    assert transcriber.batches == [4]
+    assert transcriber.single_calls == []
+    assert {index: result["text"] for index, result in results.items()} == {
+        index: f"plik {index}" for index in range(4)
+    }
+
+
+def test_low_confidence_and_long_recordings_fall_back_to_single_transcription():
+    transcriber = FakeTranscriber(low_confidence={1})
+    batcher = TranscriptionBatcher(transcriber, max_batch_size=4, max_wait_seconds=1.0)
+    audios = [np.full(16000 * 10, index, dtype=np.float32) for index in range(2)]
+
+    results = _run_concurrently(batcher, audios)
+    long_result = batcher.transcribe("dlugi", np.zeros(16000 * 120, dtype=np.float32))
+    batcher.shutdown()
+
+    assert results[0]["text"] == "plik 0"
+    assert results[1]["text"] == "pojedynczo f1"
+    assert long_result["text"] == "pojedynczo dlugi"
+
+
+def test_lone_request_skips_batch_wait_when_no_other_jobs_are_active():
+    import time
+
+    transcriber = FakeTranscriber()
+    active = {"jobs": 1}
+    batcher = TranscriptionBatcher(
+        transcriber, max_batch_size=4, max_wait_seconds=1.0, active_jobs=lambda: active["jobs"]
+    )
+
+    start = time.monotonic()
+    result = batcher.transcribe("sam", np.zeros(16000 * 5, dtype=np.float32))
+    assert time.monotonic() - start < 0.5
+    assert result["text"] == "pojedynczo sam"
+
+    active["jobs"] = 3
+    results = _run_concurrently(batcher, [np.full(16000 * 5, index, dtype=np.float32) for index in range(3)])
+    batcher.shutdown()
+
+    assert transcriber.batches == [3]
+    assert {index: result["text"] for index, result in results.items()} == {index: f"plik {index}" for index in range(3)}
+
+
+def test_request_that_does_not_fit_seeds_the_next_batch():
+    transcriber = FakeTranscriber()
+    batcher = TranscriptionBatcher(transcriber, max_batch_size=5, max_wait_seconds=1.0, max_audio_seconds=60)
+    audios = [np.full(16000 * 45, index, dtype=np.float32) for index in range(4)]
+
+    results = _run_concurrently(batcher, audios)
+    batcher.shutdown()
+
+    assert transcriber.batches == [2, 2]
+    assert transcriber.single_calls == []
+    assert {index: result["text"] for index, result in results.items()} == {
+        index: f"plik {index}" for index in range(4)
+    }
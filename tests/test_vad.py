@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.vad import detect_speech
+
+SR = 16000
+
+
+def _tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds):
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+def test_detect_speech_skips_long_silence_and_remaps_timestamps():
+    audio = np.concatenate([_tone(2.0), _silence(5.0), _tone(3.0)])
+
+    timeline = detect_speech(audio, SR, min_silence_ms=1000, padding_ms=0)
+
+    assert len(timeline.regions) == 2
+    assert 0.45 < timeline.speech_ratio < 0.55
+    compact = timeline.compact(audio)
+    assert abs(len(compact) / SR - 5.0) < 0.1
+
+    # 3 s w sklejonym buforze to 1 s drugiego fragmentu mowy → 8 s w oryginale
+    assert abs(timeline.to_original(3.0) - 8.0) < 0.1
+    segments = timeline.remap_segments([{"start": 0.5, "end": 1.5, "text": "a"}, {"start": 2.5, "end": 4.0, "text": "b"}])
+    assert abs(segments[0]["start"] - 0.5) < 0.05
+    assert abs(segments[1]["start"] - 7.5) < 0.1
+    assert abs(segments[1]["end"] - 9.0) < 0.1
+
+
+def test_short_pauses_are_kept_and_silence_has_no_speech():
+    audio = np.concatenate([_tone(1.0), _silence(0.3), _tone(1.0)])
+
+    timeline = detect_speech(audio, SR, min_silence_ms=1000)
+
+    assert len(timeline.regions) == 1
+    assert not detect_speech(_silence(3.0), SR).has_speech
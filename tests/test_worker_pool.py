@@ -0,0 +1,81 @@
+import threading
+import time
+
+from app.worker_pool import StageLimiter, WorkerPool
+
+
+def test_pool_uses_fixed_number_of_threads():
+    pool = WorkerPool(2, queue_size=4, name="test")
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0, "done": 0}
+
+    def job():
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.01)
+        with lock:
+            state["running"] -= 1
+            state["done"] += 1
+
+    threads_before = threading.active_count()
+    for _ in range(20):
+        assert pool.submit(job)
+    pool.wait_idle()
+
+    assert state["done"] == 20
+    assert state["peak"] <= 2
+    assert threading.active_count() <= threads_before
+    pool.shutdown()
+
+
+def test_submit_applies_backpressure_when_queue_full():
+    pool = WorkerPool(1, queue_size=1, name="test")
+    release = threading.Event()
+
+    assert pool.submit(release.wait)
+    # Czekamy aż wątek pobierze pierwsze zadanie, drugie zajmie całą kolejkę
+    while pool.active == 0:
+        time.sleep(0.001)
+    assert pool.submit(release.wait)
+    assert pool.submit(release.wait, timeout=0.05) is False
+
+    release.set()
+    pool.shutdown()
+
+
+def test_shutdown_drains_pending_jobs():
+    pool = WorkerPool(1, queue_size=10, name="test")
+    results = []
+    for i in range(5):
+        pool.submit(results.append, i)
+
+    pool.shutdown(drain=True)
+
+    assert results == [0, 1, 2, 3, 4]
+    assert pool.submit(results.append, 99) is False
+
+
+def test_stage_limiter_bounds_concurrency():
+    limiter = StageLimiter({"transcribe": 1})
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def job():
+        with limiter.limit("transcribe"):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+
+    threads = [threading.Thread(target=job) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state["peak"] == 1
+    with limiter.limit("unknown-stage"):
+        pass